@@ -0,0 +1,128 @@
+"""
+This script is used to benchmark the codecs of the stored messages (see `src/infra/dbs/codecs.py`)
+on realistic chat sessions: alternating user questions and assistant answers with references.
+
+For each available codec it reports:
+- the encoding time of a session (one `encode` call per message, as done by `add`);
+- the decoding time of a session (one `decode_values` call, as done by the reads);
+- the encoded size of a session;
+- with --compression, the compression ratio and the CPU time spent (de)compressing, to tune --threshold.
+
+Usage:
+    python benchmarks/bench_codecs.py --messages 200 --repeat 20
+    python benchmarks/bench_codecs.py --compression zstd --threshold 1024
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+from uuid import uuid4
+
+# Add to system path the '../' directory
+_current_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(_current_dir, "../"))
+
+from src.chatbot.chatbot_entities import ChatbotHistoryItem, MessageRole
+from src.infra.dbs.codecs import decode_values, get_codec
+from src.utils.utils import generate_utc0_millisecond_timestamp
+
+# -------------------------------
+# Constants
+# -------------------------------
+CODECS = ("json", "orjson", "msgpack")
+
+
+# -------------------------------
+# Definitions
+# -------------------------------
+def _text(words: int) -> str:
+    return " ".join(
+        "".join(random.choices(string.ascii_lowercase, k=random.randint(2, 10))) for _ in range(words)
+    )
+
+
+def _build_session(messages: int) -> list:
+    """Builds the messages of a session, as stored by the history store (`message.model_dump()`)."""
+    session = []
+    for i in range(messages):
+        if i % 2 == 0:
+            item = ChatbotHistoryItem(
+                role=MessageRole.USER,
+                content=_text(random.randint(10, 40)),
+                message_id=str(uuid4()),
+                question_id=str(uuid4()),
+                timestamp=generate_utc0_millisecond_timestamp(),
+                feedback_rating=None,
+            )
+        else:
+            item = ChatbotHistoryItem(
+                role=MessageRole.ASSISTANT,
+                content=_text(random.randint(100, 400)),
+                message_id=str(uuid4()),
+                question_id=str(uuid4()),
+                intent="question_answering",
+                reference={
+                    "sources": [
+                        {"document": f"{_text(3)}.pdf", "page": random.randint(1, 300), "score": random.random()}
+                        for _ in range(random.randint(1, 5))
+                    ]
+                },
+                timestamp=generate_utc0_millisecond_timestamp(),
+                feedback_rating=random.choice([None, 1, 5]),
+            )
+        session.append(item.model_dump())
+    return session
+
+
+def run(codec_name: str, session: list, repeat: int, compression: str = None, threshold: int = 1024) -> dict:
+    codec = get_codec(codec_name, compression=compression, compression_threshold=threshold)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encoded = [codec.encode(message) for message in session]
+    encode_s = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decoded = decode_values(encoded, stats=codec.stats)
+    decode_s = (time.perf_counter() - start) / repeat
+
+    assert decoded == session
+    result = {
+        "encode_ms": round(encode_s * 1000, 3),
+        "decode_ms": round(decode_s * 1000, 3),
+        "size_bytes": sum(len(value) for value in encoded),
+    }
+    if compression:
+        stats = codec.stats.as_dict()
+        result.update({
+            "compressed_messages": stats["compressed_values"] // repeat,
+            "ratio": round(stats["ratio"], 2),
+            "compress_ms": round(stats["compress_seconds"] / repeat * 1000, 3),
+            "decompress_ms": round(stats["decompress_seconds"] / repeat * 1000, 3),
+        })
+    return result
+
+
+# -------------------------------
+# Run benchmark
+# -------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200, help="Number of messages of the session.")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of runs averaged per codec.")
+    parser.add_argument("--compression", choices=("zstd", "lz4", "zlib"), default=None, help="Compression of the messages.")
+    parser.add_argument("--threshold", type=int, default=1024, help="Min size (bytes) of the compressed messages.")
+    args = parser.parse_args()
+
+    session = _build_session(args.messages)
+
+    for codec_name in CODECS:
+        try:
+            print(codec_name, json.dumps(run(codec_name, session, args.repeat, args.compression, args.threshold)))
+        except ValueError as e:
+            print(codec_name, f"skipped: {e}")
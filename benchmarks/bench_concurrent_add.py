@@ -0,0 +1,122 @@
+"""
+This script is used to benchmark the throughput of adding messages to the same chat session
+from concurrent writers.
+
+Compared write paths:
+- legacy: the previous read-modify-write of the whole session blob (GET + SET, two round trips, not atomic)
+- script: RedisChatHistoryHelper.add (server-side Lua script, one round trip, atomic)
+
+For each write path it reports the throughput (messages/s) and the number of messages lost
+because of concurrent writers overwriting each other.
+
+Usage:
+    python benchmarks/bench_concurrent_add.py --writers 8 --messages 500
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+# Add to system path the '../' directory
+_current_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(_current_dir, "../"))
+
+from src.config.config import REDIS_DB, REDIS_HOST, REDIS_PORT
+from src.chatbot.chatbot_entities import ChatbotHistoryItem, MessageRole
+from src.infra.dbs.redisdb import RedisChatHistoryHelper
+from src.utils.utils import generate_utc0_millisecond_timestamp
+
+# -------------------------------
+# Constants
+# -------------------------------
+BENCH_COLLECTION = "bench-chatbot-history"
+USER_ID = "bench-user"
+
+
+# -------------------------------
+# Definitions
+# -------------------------------
+def _build_message(content: str) -> ChatbotHistoryItem:
+    return ChatbotHistoryItem(
+        role=MessageRole.USER,
+        content=content,
+        message_id=str(uuid4()),
+        timestamp=generate_utc0_millisecond_timestamp(),
+        feedback_rating=None,
+    )
+
+
+def _legacy_add(helper: RedisChatHistoryHelper, message: ChatbotHistoryItem, session_id: str) -> None:
+    """Previous implementation of `add`: GET the whole session, append the message and SET it back."""
+    key = f"{helper.collection}-legacy/{USER_ID}/{session_id}"
+    session_data = helper.history_store.get(key)
+    if not session_data:
+        session_metadata = {"session_id": session_id, "user_id": USER_ID, "topic": message.content,
+                            "deleted": False, "messages": [message.model_dump()]}
+    else:
+        session_metadata = json.loads(session_data)
+        session_metadata["messages"].append(message.model_dump())
+    helper.history_store.set(key, json.dumps(session_metadata))
+
+
+def _legacy_count(helper: RedisChatHistoryHelper, session_id: str) -> int:
+    session_data = helper.history_store.get(f"{helper.collection}-legacy/{USER_ID}/{session_id}")
+    return len(json.loads(session_data)["messages"]) if session_data else 0
+
+
+def _script_add(helper: RedisChatHistoryHelper, message: ChatbotHistoryItem, session_id: str) -> None:
+    helper.add(message=message, session_id=session_id, user_id=USER_ID)
+
+
+def _script_count(helper: RedisChatHistoryHelper, session_id: str) -> int:
+    return helper.history_store.llen(helper._messages_key(helper._session_key(USER_ID, session_id)))
+
+
+def run(helper: RedisChatHistoryHelper, add_fn, count_fn, writers: int, messages: int) -> dict:
+    session_id = str(uuid4())
+    payloads = [[_build_message(f"writer {w} message {i}") for i in range(messages)] for w in range(writers)]
+
+    def _writer(writer_messages):
+        for message in writer_messages:
+            add_fn(helper, message, session_id)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as executor:
+        list(executor.map(_writer, payloads))
+    elapsed = time.perf_counter() - start
+
+    expected = writers * messages
+    stored = count_fn(helper, session_id)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "throughput_msg_s": round(expected / elapsed, 1),
+        "expected": expected,
+        "stored": stored,
+        "lost": expected - stored,
+    }
+
+
+# -------------------------------
+# Run benchmark
+# -------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8, help="Number of concurrent writers.")
+    parser.add_argument("--messages", type=int, default=500, help="Messages added by each writer.")
+    args = parser.parse_args()
+
+    helper = RedisChatHistoryHelper(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, collection=BENCH_COLLECTION)
+    # Keep the benchmark output readable
+    logging.getLogger("my_app_logger").setLevel(logging.WARNING)
+
+    try:
+        for name, add_fn, count_fn in (("legacy", _legacy_add, _legacy_count), ("script", _script_add, _script_count)):
+            print(name, json.dumps(run(helper, add_fn, count_fn, args.writers, args.messages)))
+    finally:
+        for key in helper.history_store.scan_iter(match=f"{BENCH_COLLECTION}*"):
+            helper.history_store.delete(key)
@@ -0,0 +1,123 @@
+"""
+This script is used to benchmark the encryption of the user emails into user ids (`src/utils/encryption.py`),
+per call.
+
+Compared encryption paths:
+- uncached: a fresh cipher and PKCS7 padder for every call (the original implementation)
+- cached_cipher: the cipher cached per key, without the memoization of the results
+- memoized: `encrypt_word` called again for the same emails (LRU cache hits)
+- encrypt_many: a single cipher context for the whole batch
+The decryption paths are compared the same way.
+
+Usage:
+    python benchmarks/bench_encryption.py --users 10000 --repeat 5
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+# Add to system path the '../' directory
+_current_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(_current_dir, "../"))
+
+from src.utils.encryption import (
+    clear_encryption_caches,
+    decrypt_many,
+    decrypt_word,
+    encrypt_many,
+    encrypt_word,
+)
+
+# -------------------------------
+# Constants
+# -------------------------------
+KEY = b"TwdsadsadsaGTXAgYmiGW3URKaheufL="
+
+
+# -------------------------------
+# Definitions
+# -------------------------------
+def _uncached_encrypt(emails: list) -> list:
+    encrypted_words = []
+    for email in emails:
+        encryptor = Cipher(algorithms.AES(KEY), modes.ECB(), backend=default_backend()).encryptor()
+        padder = padding.PKCS7(algorithms.AES.block_size).padder()
+        padded_word = padder.update(email.encode()) + padder.finalize()
+        encrypted_words.append(base64.b64encode(encryptor.update(padded_word) + encryptor.finalize()).decode())
+    return encrypted_words
+
+
+def _uncached_decrypt(encrypted_words: list) -> list:
+    words = []
+    for encrypted_word in encrypted_words:
+        decryptor = Cipher(algorithms.AES(KEY), modes.ECB(), backend=default_backend()).decryptor()
+        padded_word = decryptor.update(base64.b64decode(encrypted_word)) + decryptor.finalize()
+        unpadder = padding.PKCS7(algorithms.AES.block_size).unpadder()
+        words.append((unpadder.update(padded_word) + unpadder.finalize()).decode())
+    return words
+
+
+def _cached_cipher_encrypt(emails: list) -> list:
+    return [encrypt_word.__wrapped__(email, KEY) for email in emails]
+
+
+def _cached_cipher_decrypt(encrypted_words: list) -> list:
+    return [decrypt_word.__wrapped__(encrypted_word, KEY) for encrypted_word in encrypted_words]
+
+
+def _memoized_encrypt(emails: list) -> list:
+    return [encrypt_word(email, KEY) for email in emails]
+
+
+def _memoized_decrypt(encrypted_words: list) -> list:
+    return [decrypt_word(encrypted_word, KEY) for encrypted_word in encrypted_words]
+
+
+def run(fn, items: list, repeat: int, warm: bool = False) -> dict:
+    clear_encryption_caches()
+    if warm:
+        fn(items)  # Fill the LRU caches, the measured runs only hit them
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(items)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    return {
+        "batch_ms": round(elapsed * 1000, 3),
+        "per_call_us": round(elapsed / len(items) * 1e6, 3),
+    }
+
+
+# -------------------------------
+# Run benchmark
+# -------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000, help="Number of user emails.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs averaged per encryption path.")
+    args = parser.parse_args()
+
+    emails = [f"user.{i}@example.com" for i in range(args.users)]
+    encrypted_words = _uncached_encrypt(emails)
+    assert encrypt_many(emails, KEY) == encrypted_words and decrypt_many(encrypted_words, KEY) == emails
+
+    for name, fn, items, warm in (
+        ("encrypt uncached", _uncached_encrypt, emails, False),
+        ("encrypt cached_cipher", _cached_cipher_encrypt, emails, False),
+        ("encrypt memoized", _memoized_encrypt, emails, True),
+        ("encrypt encrypt_many", lambda items: encrypt_many(items, KEY), emails, False),
+        ("decrypt uncached", _uncached_decrypt, encrypted_words, False),
+        ("decrypt cached_cipher", _cached_cipher_decrypt, encrypted_words, False),
+        ("decrypt memoized", _memoized_decrypt, encrypted_words, True),
+        ("decrypt decrypt_many", lambda items: decrypt_many(items, KEY), encrypted_words, False),
+    ):
+        print(name, json.dumps(run(fn, items, args.repeat, warm=warm)))
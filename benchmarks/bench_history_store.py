@@ -0,0 +1,304 @@
+"""
+This script is used to benchmark the history store (`RedisChatHistoryHelper`) as the data grows, and to
+compare the results between two commits.
+
+Measured cases (growth curves):
+- add: latency of `add` as a single session grows to `--max-messages` messages
+- tail_read: latency of `get_history_by_session_id` reading the last `--tail-pairs` conversation pairs of the same session
+- user_read: latency of `get_history_by_user_id` for users with 1 to `--max-sessions` sessions
+- bulk_delete: latency of `delete_chat_history_by_user_id` for the same users
+
+Each curve is summarized by its growth exponent, the slope of log(latency) against log(size): ~0 for a constant
+cost (add, tail_read) and ~1 for a cost linear in the size (user_read, bulk_delete). A curve growing faster than
+expected is flagged as a regression (e.g. an `add` rewriting the whole session is O(N) per message, O(N²) for
+the session), as is any point slower than `--tolerance` times the same point of the `--baseline` report.
+The script exits with status 1 when a regression is flagged.
+
+Backends:
+- fakeredis: in-process Redis (requires the `fakeredis` package)
+- redis-server: a temporary redis-server spawned on a free port (requires the `redis-server` binary)
+- config: the Redis instance configured in the active `envs/.env.*` file (e.g. the one started by docker-compose.yml)
+
+Usage:
+    python benchmarks/bench_history_store.py --backend fakeredis --output bench.json
+    python benchmarks/bench_history_store.py --backend fakeredis --baseline bench.json
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+from uuid import uuid4
+
+# Add to system path the '../' directory
+_current_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(_current_dir, "../"))
+
+from benchmarks.bench_concurrent_add import _build_message
+from src.config.config import REDIS_DB, REDIS_HOST, REDIS_PORT
+from src.infra.dbs.redisdb import ADD_MESSAGE_SCRIPT, UPDATE_FIELD_SCRIPT, RedisChatHistoryHelper
+
+# -------------------------------
+# Constants
+# -------------------------------
+BENCH_COLLECTION = "bench-history-store"
+BACKENDS = ("fakeredis", "redis-server", "config")
+# Max growth exponent expected for each case: above it, the cost grows faster than the design allows
+MAX_GROWTH_EXPONENTS = {
+    "add": 0.3,
+    "tail_read": 0.3,
+    "user_read": 1.3,
+    "bulk_delete": 1.3,
+}
+MESSAGE_CONTENT = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4
+
+
+# -------------------------------
+# Definitions
+# -------------------------------
+def _sizes(max_size: int) -> List[int]:
+    """Returns the sizes measured along a growth curve: 1, 10, 100, ... up to (and including) `max_size`."""
+    sizes = [10 ** i for i in range(int(math.log10(max_size)) + 1)]
+    return sizes if sizes[-1] == max_size else sizes + [max_size]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def _redis_server() -> Iterator[int]:
+    """Spawns a temporary redis-server (no persistence) and yields its port."""
+    if shutil.which("redis-server") is None:
+        raise RuntimeError("The redis-server binary is not on the PATH.")
+
+    port = _free_port()
+    process = subprocess.Popen(
+        ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        import redis
+
+        client = redis.Redis(port=port)
+        for _ in range(50):
+            try:
+                client.ping()
+                break
+            except redis.ConnectionError:
+                time.sleep(0.1)
+        yield port
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@contextmanager
+def _history_store(backend: str) -> Iterator[RedisChatHistoryHelper]:
+    """Yields the history store of the benchmark on the given backend, and removes its keys afterwards."""
+    if backend == "redis-server":
+        with _redis_server() as port:
+            yield RedisChatHistoryHelper(host="127.0.0.1", port=port, db=0, collection=BENCH_COLLECTION)
+        return
+
+    helper = RedisChatHistoryHelper(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, collection=BENCH_COLLECTION)
+    if backend == "fakeredis":
+        try:
+            import fakeredis
+        except ImportError as e:
+            raise RuntimeError("The fakeredis backend requires the `fakeredis` package.") from e
+        helper.history_store = fakeredis.FakeRedis()
+        helper._add_message_script = helper.history_store.register_script(ADD_MESSAGE_SCRIPT)
+        helper._update_field_script = helper.history_store.register_script(UPDATE_FIELD_SCRIPT)
+    try:
+        yield helper
+    finally:
+        for key in helper.history_store.scan_iter(match=f"{BENCH_COLLECTION}*"):
+            helper.history_store.unlink(key)
+
+
+def _timed(fn, repeat: int) -> List[float]:
+    """Calls `fn` `repeat` times and returns the latency of each call, in microseconds."""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+
+def _point(size: int, latencies: List[float]) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "size": size,
+        "median_us": round(statistics.median(latencies), 1),
+        "p95_us": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 1),
+        "samples": len(latencies),
+    }
+
+
+def _growth_exponent(points: List[dict]) -> Optional[float]:
+    """Returns the least-squares slope of log(median latency) against log(size), or None if undefined."""
+    xs = [math.log(point["size"]) for point in points]
+    ys = [math.log(max(point["median_us"], 1e-3)) for point in points]
+    if len(xs) < 2 or len(set(xs)) < 2:
+        return None
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum((x - mean_x) ** 2 for x in xs)
+
+
+def bench_session_growth(helper: RedisChatHistoryHelper, max_messages: int, samples: int, tail_pairs: int) -> dict:
+    """Measures `add` and the tail-window reads as a single session grows."""
+    user_id, session_id = "bench-user", str(uuid4())
+    add_points, read_points = [], []
+    stored = 0
+    # Load the Lua script of `add` before the first measure
+    helper.add(_build_message(MESSAGE_CONTENT), str(uuid4()), "bench-warmup")
+    for size in [size for size in _sizes(max_messages) if size >= 10]:
+        # Grow the session up to the measured size (the last `samples` messages are the measured ones)
+        while stored < max(size - samples, 0):
+            helper.add(_build_message(MESSAGE_CONTENT), session_id, user_id)
+            stored += 1
+        measured = size - stored
+        if measured > 0:
+            add_points.append(_point(size, _timed(
+                lambda: helper.add(_build_message(MESSAGE_CONTENT), session_id, user_id), measured
+            )))
+            stored = size
+        read_points.append(_point(size, _timed(
+            lambda: helper.get_history_by_session_id(user_id, session_id, num_conversation_pairs=tail_pairs), samples
+        )))
+    return {"add": add_points, "tail_read": read_points}
+
+
+def bench_user_sessions(
+    helper: RedisChatHistoryHelper, max_sessions: int, messages_per_session: int, repeat: int
+) -> dict:
+    """Measures `get_history_by_user_id` and `delete_chat_history_by_user_id` for users with a growing number of sessions."""
+    read_points, delete_points = [], []
+    for size in _sizes(max_sessions):
+        user_id = f"bench-user-{size}"
+        for _ in range(size):
+            session_id = str(uuid4())
+            for _ in range(messages_per_session):
+                helper.add(_build_message(MESSAGE_CONTENT), session_id, user_id)
+
+        read_points.append(_point(size, _timed(lambda: helper.get_history_by_user_id(user_id), repeat)))
+        # Destructive: measured once per size
+        delete_points.append(_point(size, _timed(lambda: helper.delete_chat_history_by_user_id(user_id), 1)))
+    return {"user_read": read_points, "bulk_delete": delete_points}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=_current_dir, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def find_regressions(cases: dict, baseline: Optional[dict], tolerance: float) -> List[str]:
+    """
+    Flags the curves growing faster than expected and, if a baseline report is given, the points slower than
+    `tolerance` times the same point of the baseline.
+    """
+    regressions = []
+    for name, case in cases.items():
+        exponent = case["growth_exponent"]
+        if exponent is not None and exponent > case["max_growth_exponent"]:
+            regressions.append(
+                f"{name}: growth exponent {exponent:.2f} > {case['max_growth_exponent']} (cost grows faster than expected)"
+            )
+
+        if baseline is None or name not in baseline.get("cases", {}):
+            continue
+        baseline_points = {point["size"]: point for point in baseline["cases"][name]["points"]}
+        for point in case["points"]:
+            baseline_point = baseline_points.get(point["size"])
+            if baseline_point and point["median_us"] > tolerance * baseline_point["median_us"]:
+                regressions.append(
+                    f"{name}@{point['size']}: {point['median_us'] / baseline_point['median_us']:.2f}x slower "
+                    f"than the baseline ({baseline_point['median_us']}us -> {point['median_us']}us)"
+                )
+    return regressions
+
+
+def run(args) -> dict:
+    with _history_store(args.backend) as helper:
+        curves = bench_session_growth(helper, args.max_messages, args.samples, args.tail_pairs)
+        curves.update(bench_user_sessions(helper, args.max_sessions, args.messages_per_session, args.repeat))
+
+    cases = {}
+    for name, points in curves.items():
+        exponent = _growth_exponent(points)
+        cases[name] = {
+            "points": points,
+            "growth_exponent": None if exponent is None else round(exponent, 3),
+            "max_growth_exponent": MAX_GROWTH_EXPONENTS[name],
+        }
+    return {
+        "commit": _git_commit(),
+        "backend": args.backend,
+        "python": platform.python_version(),
+        "params": {
+            "max_messages": args.max_messages,
+            "max_sessions": args.max_sessions,
+            "messages_per_session": args.messages_per_session,
+            "samples": args.samples,
+            "repeat": args.repeat,
+            "tail_pairs": args.tail_pairs,
+        },
+        "cases": cases,
+    }
+
+
+# -------------------------------
+# Run benchmark
+# -------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=BACKENDS, default="fakeredis", help="Redis backend of the benchmark.")
+    parser.add_argument("--max-messages", type=int, default=10000, help="Size reached by the growing session.")
+    parser.add_argument("--max-sessions", type=int, default=10000, help="Max number of sessions of a user.")
+    parser.add_argument("--messages-per-session", type=int, default=2, help="Messages of each session of the users.")
+    parser.add_argument("--samples", type=int, default=50, help="Calls measured per point of the session curves.")
+    parser.add_argument("--repeat", type=int, default=3, help="Calls measured per point of the user_read curve.")
+    parser.add_argument("--tail-pairs", type=int, default=5, help="Conversation pairs read by the tail-window reads.")
+    parser.add_argument("--output", help="Path of the JSON report to write.")
+    parser.add_argument("--baseline", help="Path of a previous JSON report to compare with.")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Slowdown vs. the baseline flagged as a regression.")
+    args = parser.parse_args()
+
+    # Keep the benchmark output readable
+    logging.getLogger("my_app_logger").setLevel(logging.WARNING)
+
+    report = run(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report["regressions"] = find_regressions(report["cases"], baseline, args.tolerance)
+
+    for name, case in report["cases"].items():
+        print(name, json.dumps(case))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    for regression in report["regressions"]:
+        print("REGRESSION", regression)
+    sys.exit(1 if report["regressions"] else 0)
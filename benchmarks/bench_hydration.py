@@ -0,0 +1,91 @@
+"""
+This script is used to benchmark the hydration of a chat history (building the pydantic models from
+the message dictionaries decoded from the history store), per message.
+
+Compared hydration paths:
+- validated: `ChatbotHistoryItem(**item)` for every message (full validation, the default)
+- model_construct: `ChatbotHistoryItem.model_construct(**item)` for every message
+- trusted: `ChatbotHistory.from_trusted` (no validation, used with CHATBOT_HISTORY_TRUSTED_READS=true)
+- validate_json: `ChatbotHistory.model_validate_json` on the raw bytes of the whole session
+- lazy: `LazyChatbotHistory` view, accessing only the last conversation pair
+
+Usage:
+    python benchmarks/bench_hydration.py --messages 200 --repeat 50
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from uuid import uuid4
+
+# Add to system path the '../' directory
+_current_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(_current_dir, "../"))
+
+from benchmarks.bench_codecs import _build_session
+from src.chatbot.chatbot_entities import ChatbotHistory, ChatbotHistoryItem, LazyChatbotHistory
+
+
+# -------------------------------
+# Definitions
+# -------------------------------
+def _validated(session_id: str, session: list, raw: bytes):
+    return ChatbotHistory(session_id=session_id, history=[ChatbotHistoryItem(**item) for item in session])
+
+
+def _model_construct(session_id: str, session: list, raw: bytes):
+    return ChatbotHistory.model_construct(
+        session_id=session_id, history=[ChatbotHistoryItem.model_construct(**item) for item in session]
+    )
+
+
+def _trusted(session_id: str, session: list, raw: bytes):
+    # Fresh dictionaries, as returned by the decoding of the stored messages
+    return ChatbotHistory.from_trusted(session_id, [dict(item) for item in session])
+
+
+def _validate_json(session_id: str, session: list, raw: bytes):
+    return ChatbotHistory.model_validate_json(raw)
+
+
+def _lazy(session_id: str, session: list, raw: bytes):
+    history = LazyChatbotHistory(session_id, [dict(item) for item in session], trusted=True)
+    return history[-2:]
+
+
+def run(hydrate, session: list, repeat: int) -> dict:
+    session_id = str(uuid4())
+    raw = json.dumps({"session_id": session_id, "history": session}).encode()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        hydrate(session_id, session, raw)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    return {
+        "session_ms": round(elapsed * 1000, 3),
+        "per_message_us": round(elapsed / len(session) * 1e6, 3),
+    }
+
+
+# -------------------------------
+# Run benchmark
+# -------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200, help="Number of messages of the session.")
+    parser.add_argument("--repeat", type=int, default=50, help="Number of runs averaged per hydration path.")
+    args = parser.parse_args()
+
+    session = _build_session(args.messages)
+
+    for name, hydrate in (
+        ("validated", _validated),
+        ("model_construct", _model_construct),
+        ("trusted", _trusted),
+        ("validate_json", _validate_json),
+        ("lazy", _lazy),
+    ):
+        print(name, json.dumps(run(hydrate, session, args.repeat)))
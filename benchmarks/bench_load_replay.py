@@ -0,0 +1,330 @@
+"""
+This script is used to load test the history store through `DocumentStore`, by replaying a trace of operations
+from concurrent simulated users.
+
+The trace is a JSONL file, one operation per line (the same one-JSON-object-per-line layout as the request logs):
+    {"op": "add", "user_id": "u1", "session_id": "<uuid>", "role": "user", "content": "Hello"}
+    {"op": "get_chat_history", "user_id": "u1", "session_id": "<uuid>", "num_conversation_pairs": 5}
+    {"op": "list", "user_id": "u1", "limit": 20}
+    {"op": "update_field", "user_id": "u1", "session_id": "<uuid>", "key": "topic", "value": "Greetings"}
+    {"op": "delete", "user_id": "u1", "session_id": "<uuid>"}
+Unknown fields are ignored. Without `--trace`, a synthetic trace is generated (`--operations`, `--users` and the
+operation mix of `--mix`), and can be saved with `--write-trace` to be replayed later.
+
+The operations are partitioned by user between the workers (threads, processes or asyncio tasks), so the
+operations of a user are replayed in the order of the trace. It reports, per operation type and in total,
+the throughput and the p50/p95/p99 latencies.
+
+Backends:
+- config: the history store configured in the active `envs/.env.*` file (Redis, MongoDB or Cosmos DB)
+- fakeredis: in-process Redis (requires the `fakeredis` package; threads and asyncio modes only)
+
+Usage:
+    python benchmarks/bench_load_replay.py --operations 20000 --users 200 --mode threads --concurrency 16
+    python benchmarks/bench_load_replay.py --trace trace.jsonl --mode asyncio --concurrency 64 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Tuple
+from uuid import uuid4
+
+# Add to system path the '../' directory
+_current_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(_current_dir, "../"))
+
+from src.chatbot.chatbot_entities import MessageRole
+from src.infra.document_store import AsyncDocumentStore, DocumentStore
+
+# -------------------------------
+# Constants
+# -------------------------------
+LOAD_COLLECTION = "load-chatbot-history"
+MODES = ("threads", "processes", "asyncio")
+BACKENDS = ("config", "fakeredis")
+OPERATIONS = ("add", "get_chat_history", "list", "update_field", "delete")
+DEFAULT_MIX = "add=0.5,get_chat_history=0.3,list=0.1,update_field=0.07,delete=0.03"
+PERCENTILES = (50, 95, 99)
+MESSAGE_CONTENT = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4
+
+
+# -------------------------------
+# Trace
+# -------------------------------
+def _parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        op, weight = item.split("=")
+        if op not in OPERATIONS:
+            raise ValueError(f"Unsupported operation in the mix: {op}. Supported values: {OPERATIONS}")
+        weights[op] = float(weight)
+    return weights
+
+
+def generate_trace(operations: int, users: int, mix: Dict[str, float], seed: int = 0) -> List[dict]:
+    """
+    Generates a synthetic trace: each operation picks a user at random, and a session of that user
+    (a new one for 10% of the messages). The reads, updates and deletes target the existing sessions only.
+    """
+    rng = random.Random(seed)
+    ops, weights = list(mix), list(mix.values())
+    sessions: Dict[str, List[str]] = defaultdict(list)
+    trace = []
+    for _ in range(operations):
+        user_id = f"load-user-{rng.randrange(users)}"
+        op = rng.choices(ops, weights)[0]
+        if op != "list" and not sessions[user_id]:
+            op = "add"  # Nothing to read, update or delete yet
+
+        if op == "add":
+            if not sessions[user_id] or rng.random() < 0.1:
+                sessions[user_id].append(str(uuid4()))
+                session_id = sessions[user_id][-1]
+            else:
+                session_id = rng.choice(sessions[user_id])
+            trace.append({
+                "op": op, "user_id": user_id, "session_id": session_id,
+                "role": rng.choice([MessageRole.USER.value, MessageRole.ASSISTANT.value]), "content": MESSAGE_CONTENT,
+            })
+        elif op == "get_chat_history":
+            trace.append({
+                "op": op, "user_id": user_id, "session_id": rng.choice(sessions[user_id]), "num_conversation_pairs": 5,
+            })
+        elif op == "list":
+            trace.append({"op": op, "user_id": user_id, "limit": 20})
+        elif op == "update_field":
+            trace.append({
+                "op": op, "user_id": user_id, "session_id": rng.choice(sessions[user_id]), "key": "topic", "value": "Load test",
+            })
+        else:
+            session_id = sessions[user_id].pop(rng.randrange(len(sessions[user_id])))
+            trace.append({"op": op, "user_id": user_id, "session_id": session_id})
+    return trace
+
+
+def read_trace(path: str) -> List[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_trace(trace: List[dict], path: str) -> None:
+    with open(path, "w") as f:
+        for operation in trace:
+            f.write(json.dumps(operation) + "\n")
+
+
+def _partition(trace: List[dict], workers: int) -> List[List[dict]]:
+    """Splits the trace between the workers by user, keeping the order of the operations of each user."""
+    user_workers: Dict[str, int] = {}
+    partitions = [[] for _ in range(workers)]
+    for operation in trace:
+        worker = user_workers.setdefault(operation["user_id"], len(user_workers) % workers)
+        partitions[worker].append(operation)
+    return [partition for partition in partitions if partition]
+
+
+# -------------------------------
+# Replay
+# -------------------------------
+def _use_fakeredis(store, server) -> None:
+    """Points the Redis history store of a (sync or async) document store to an in-process fakeredis server."""
+    import fakeredis
+    from src.infra.dbs.redisdb import ADD_MESSAGE_SCRIPT, UPDATE_FIELD_SCRIPT
+
+    helper = store.history_store
+    client_class = fakeredis.FakeAsyncRedis if isinstance(store, AsyncDocumentStore) else fakeredis.FakeRedis
+    helper.history_store = client_class(server=server)
+    helper._add_message_script = helper.history_store.register_script(ADD_MESSAGE_SCRIPT)
+    helper._update_field_script = helper.history_store.register_script(UPDATE_FIELD_SCRIPT)
+    if hasattr(helper, "_recall_session_script"):
+        from src.infra.dbs.tiering import RECALL_SESSION_SCRIPT
+
+        helper._recall_session_script = helper.history_store.register_script(RECALL_SESSION_SCRIPT)
+
+
+def _call(store, operation: dict):
+    """Calls the `DocumentStore` (or `AsyncDocumentStore`) method of a trace operation."""
+    op, user_id = operation["op"], operation["user_id"]
+    if op == "add":
+        return store.add_message_to_history(
+            session_id=operation["session_id"],
+            message_id=str(uuid4()),
+            role=MessageRole(operation.get("role", MessageRole.USER.value)),
+            content=operation.get("content", ""),
+            user_id=user_id,
+        )
+    if op == "get_chat_history":
+        return store.get_chat_history(
+            user_id, operation["session_id"], num_conversation_pairs=operation.get("num_conversation_pairs")
+        )
+    if op == "list":
+        return store.list_sessions(user_id, limit=operation.get("limit", 100))
+    if op == "update_field":
+        return store.update_field(
+            key=operation.get("key", "topic"), value=operation.get("value", ""), user_id=user_id,
+            session_id=operation["session_id"],
+        )
+    if op == "delete":
+        return store.delete_chat_history_by_session_id(user_id, operation["session_id"])
+    raise ValueError(f"Unsupported operation: {op}. Supported values: {OPERATIONS}")
+
+
+def _replay(store, operations: List[dict]) -> Tuple[List[Tuple[str, float, bool]], float, float]:
+    """Replays operations one by one; returns (op, latency in seconds, failed) per operation, and the start/end times."""
+    samples = []
+    start = time.time()
+    for operation in operations:
+        op_start = time.perf_counter()
+        try:
+            _call(store, operation)
+            failed = False
+        except Exception:
+            failed = True
+        samples.append((operation["op"], time.perf_counter() - op_start, failed))
+    return samples, start, time.time()
+
+
+async def _replay_async(store: AsyncDocumentStore, operations: List[dict]) -> Tuple[List[Tuple[str, float, bool]], float, float]:
+    samples = []
+    start = time.time()
+    for operation in operations:
+        op_start = time.perf_counter()
+        try:
+            await _call(store, operation)
+            failed = False
+        except Exception:
+            failed = True
+        samples.append((operation["op"], time.perf_counter() - op_start, failed))
+    return samples, start, time.time()
+
+
+def _process_worker(operations: List[dict], collection: str):
+    logging.getLogger("my_app_logger").setLevel(logging.WARNING)
+    return _replay(DocumentStore(collection=collection), operations)
+
+
+def run_threads(partitions: List[List[dict]], collection: str, server=None) -> list:
+    store = DocumentStore(collection=collection)
+    if server is not None:
+        _use_fakeredis(store, server)
+    with ThreadPoolExecutor(max_workers=len(partitions)) as executor:
+        return list(executor.map(lambda operations: _replay(store, operations), partitions))
+
+
+def run_processes(partitions: List[List[dict]], collection: str) -> list:
+    # Each process builds its own DocumentStore (and connection pool)
+    with ProcessPoolExecutor(max_workers=len(partitions), mp_context=multiprocessing.get_context("spawn")) as executor:
+        return list(executor.map(_process_worker, partitions, [collection] * len(partitions)))
+
+
+def run_asyncio(partitions: List[List[dict]], collection: str, server=None) -> list:
+    async def _run():
+        store = AsyncDocumentStore(collection=collection)
+        if server is not None:
+            _use_fakeredis(store, server)
+        return await asyncio.gather(*[_replay_async(store, operations) for operations in partitions])
+
+    return asyncio.run(_run())
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    return sorted_values[max(0, math.ceil(percentile / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(results: list) -> Dict[str, dict]:
+    """Returns the throughput (ops/s over the whole replay) and the latencies (ms) per operation type and in total."""
+    wall_time = max(end for _, _, end in results) - min(start for _, start, _ in results)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    for samples, _, _ in results:
+        for op, latency, failed in samples:
+            for name in (op, "total"):
+                latencies[name].append(latency)
+                errors[name] += failed
+
+    report = {}
+    for name in [op for op in OPERATIONS if op in latencies] + ["total"]:
+        values = sorted(latencies[name])
+        report[name] = {
+            "count": len(values),
+            "errors": errors[name],
+            "throughput_ops_s": round(len(values) / wall_time, 1),
+            **{f"p{p}_ms": round(_percentile(values, p) * 1000, 3) for p in PERCENTILES},
+        }
+    return report
+
+
+def _cleanup(trace: List[dict], collection: str, server=None) -> None:
+    store = DocumentStore(collection=collection)
+    if server is not None:
+        _use_fakeredis(store, server)
+    for user_id in {operation["user_id"] for operation in trace}:
+        store.delete_chat_history_by_user_id(user_id)
+
+
+# -------------------------------
+# Run benchmark
+# -------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trace", help="Path of the JSONL trace to replay. Generates a synthetic trace if omitted.")
+    parser.add_argument("--write-trace", help="Path where the replayed trace is saved (JSONL).")
+    parser.add_argument("--operations", type=int, default=10000, help="Operations of the synthetic trace.")
+    parser.add_argument("--users", type=int, default=100, help="Users of the synthetic trace.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Operation weights of the synthetic trace.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic trace.")
+    parser.add_argument("--mode", choices=MODES, default="threads", help="Concurrency of the simulated users.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of threads, processes or asyncio tasks.")
+    parser.add_argument("--backend", choices=BACKENDS, default="config", help="History store backend.")
+    parser.add_argument("--collection", default=LOAD_COLLECTION, help="Collection written by the replay.")
+    parser.add_argument("--keep-data", action="store_true", help="Keep the histories written by the replay.")
+    parser.add_argument("--output", help="Path of the JSON report to write.")
+    args = parser.parse_args()
+
+    if args.backend == "fakeredis" and args.mode == "processes":
+        parser.error("The fakeredis backend lives in a single process: use the threads or asyncio mode.")
+
+    # Keep the benchmark output readable
+    logging.getLogger("my_app_logger").setLevel(logging.WARNING)
+
+    trace = read_trace(args.trace) if args.trace else generate_trace(
+        args.operations, args.users, _parse_mix(args.mix), seed=args.seed
+    )
+    if args.write_trace:
+        write_trace(trace, args.write_trace)
+
+    fake_server = None
+    if args.backend == "fakeredis":
+        import fakeredis
+
+        fake_server = fakeredis.FakeServer()
+
+    partitions = _partition(trace, args.concurrency)
+    if args.mode == "threads":
+        results = run_threads(partitions, args.collection, fake_server)
+    elif args.mode == "processes":
+        results = run_processes(partitions, args.collection)
+    else:
+        results = run_asyncio(partitions, args.collection, fake_server)
+
+    report = summarize(results)
+    for name, stats in report.items():
+        print(name, json.dumps(stats))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"mode": args.mode, "concurrency": args.concurrency, "backend": args.backend,
+                       "operations": len(trace), "report": report}, f, indent=2)
+
+    if not args.keep_data:
+        _cleanup(trace, args.collection, fake_server)
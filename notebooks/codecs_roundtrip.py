@@ -0,0 +1,62 @@
+"""
+This script is used to test the message codecs (without Redis).
+Tests performed:
+- Round trip of a message whose reference has int keys, with each installed codec, uncompressed and compressed
+- The same round trip through the batch decoding (`decode_values`), as used by the history reads
+- Messages written by each codec read back by the codecs of the other formats
+"""
+
+import os
+import sys
+
+# Add to system path the '../' directory
+_current_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(_current_dir, "../"))
+
+from src.infra.dbs.codecs import decode_value, decode_values, get_codec
+
+# -------------------------------
+# Constants
+# -------------------------------
+message = {
+    "message_id": "1",
+    "role": "assistant",
+    "content": "Test Message " * 200,  # Large enough to be compressed
+    "reference": {1: "first source", 2: {"page": 3}},
+}
+# The JSON formats write the int keys as strings (as the stdlib json does), msgpack keeps them
+expected = {
+    "json": dict(message, reference={"1": "first source", "2": {"page": 3}}),
+    "orjson": dict(message, reference={"1": "first source", "2": {"page": 3}}),
+    "msgpack": message,
+}
+
+
+def _get_codec(name: str, compression=None):
+    try:
+        return get_codec(name, compression=compression)
+    except ValueError as e:  # The library of the codec is not installed
+        print(f"Skipped {name}: {e}")
+        return None
+
+
+# -------------------------------
+# Round trip of each codec
+# -------------------------------
+encoded = []
+for name in ("json", "orjson", "msgpack"):
+    for compression in (None, "zlib"):
+        codec = _get_codec(name, compression)
+        if codec is None:
+            continue
+        raw = codec.encode(message)
+        assert decode_value(raw) == expected[name], (name, compression)
+        assert decode_values([raw, raw]) == [expected[name]] * 2, (name, compression)
+        encoded.append((name, raw))
+
+
+# -------------------------------
+# Mixed codecs
+# -------------------------------
+assert decode_values([raw for _, raw in encoded]) == [expected[name] for name, _ in encoded]
+print("Codecs: all checks passed.")
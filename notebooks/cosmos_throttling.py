@@ -0,0 +1,150 @@
+"""
+This script is used to test the Cosmos DB (API for MongoDB) history store against a local stub,
+without a Cosmos DB account.
+
+The stub (built on `mongomock`, `pip install mongomock`) simulates:
+- throttling: every `THROTTLE_EVERY`-th request fails with error 16500 and a `RetryAfterMs` hint;
+- request charges: `getLastRequestStatistics` returns a fixed RU charge per request, and is throttled too.
+
+Tests performed:
+- Add messages while being throttled (no message lost)
+- Retrieve chat history by session ID
+- Delete chat history by user ID in RU-paced batches
+- The request charge tracking stays enabled when `getLastRequestStatistics` is throttled
+- Report the throttled requests and the consumed RU per operation
+"""
+
+import os
+import sys
+from uuid import uuid4
+
+import mongomock
+from pymongo.errors import OperationFailure
+
+# Add to system path the '../' directory
+_current_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(_current_dir, "../"))
+
+from src.infra.dbs.cosmosdb_by_mongodb import THROTTLING_ERROR_CODE, CosmosMongoChatHistoryHelper
+from src.infra.document_store import _build_history_item
+from src.chatbot.chatbot_entities import MessageRole
+
+# -------------------------------
+# Constants
+# -------------------------------
+THROTTLE_EVERY = 3
+RETRY_AFTER_MS = 20
+REQUEST_CHARGE = 5.0
+
+
+# -------------------------------
+# Local Cosmos DB stub
+# -------------------------------
+class ThrottlingCollection:
+    """Proxy of a mongomock collection that throttles every `THROTTLE_EVERY`-th request."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self._requests = 0
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if not callable(attribute):
+            return attribute
+
+        def _request(*args, **kwargs):
+            self._requests += 1
+            if self._requests % THROTTLE_EVERY == 0:
+                raise OperationFailure(
+                    f"Request rate is large. RetryAfterMs={RETRY_AFTER_MS}", code=THROTTLING_ERROR_CODE
+                )
+            return attribute(*args, **kwargs)
+
+        return _request
+
+
+class CosmosStubDatabase:
+    def __init__(self, database):
+        self._database = database
+        self._collections = {}
+        self._statistics_requests = 0
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = ThrottlingCollection(self._database[name])
+        return self._collections[name]
+
+    def __getattr__(self, name):
+        return getattr(self._database, name)
+
+    def command(self, command, *args, **kwargs):
+        if "getLastRequestStatistics" in command:
+            self._statistics_requests += 1
+            if self._statistics_requests % THROTTLE_EVERY == 0:
+                raise OperationFailure(
+                    f"Request rate is large. RetryAfterMs={RETRY_AFTER_MS}", code=THROTTLING_ERROR_CODE
+                )
+            return {"CommandName": "stub", "RequestCharge": REQUEST_CHARGE}
+        if command.get("customAction") == "CreateCollection":
+            self._database.create_collection(command["collection"])
+            return {"ok": 1}
+        return self._database.command(command, *args, **kwargs)
+
+
+class CosmosStubClient:
+    def __init__(self):
+        self._client = mongomock.MongoClient()
+        self._databases = {}
+
+    def __getitem__(self, name):
+        if name not in self._databases:
+            self._databases[name] = CosmosStubDatabase(self._client[name])
+        return self._databases[name]
+
+
+# -------------------------------
+# Initializations
+# -------------------------------
+history_store = CosmosMongoChatHistoryHelper(
+    connection_string=None,
+    database="stub-chatbot",
+    collection="stub-chatbot-history",
+    client=CosmosStubClient(),
+    ru_budget_per_second=100,
+    delete_batch_size=4,
+)
+user_id = "stub-user"
+
+
+# -------------------------------
+# Add messages while being throttled
+# -------------------------------
+session_ids = [str(uuid4()) for _ in range(5)]
+n_msgs_to_add = 4
+
+for session_id in session_ids:
+    for i in range(n_msgs_to_add):
+        message = _build_history_item(message_id=str(uuid4()), role=MessageRole.USER, content=f"Test Message {i}")
+        history_store.add(message=message, session_id=session_id, user_id=user_id)
+
+
+# -------------------------------
+# Retrieve chat history by session ID
+# -------------------------------
+chat_history = history_store.get_history_by_session_id(user_id=user_id, session_id=session_ids[0])
+assert len(chat_history.history) == n_msgs_to_add
+
+
+# -------------------------------
+# Delete chat history by user ID
+# -------------------------------
+deleted_count = history_store.delete_chat_history_by_user_id(user_id)
+assert deleted_count == len(session_ids)
+assert history_store.track_request_charge
+
+
+# -------------------------------
+# Report
+# -------------------------------
+print("Throttled requests:", dict(history_store.throttled_requests))
+print("Request charges (RU):", history_store.get_request_charges())
@@ -85,7 +85,7 @@ chat_history = document_store.get_chat_history(
     session_id=session_id,
     # num_conversation_pairs=3
     )
-chat_history.dict()
+chat_history.model_dump()
 
 # -------------------------------
 # Retrieve chat history by user ID
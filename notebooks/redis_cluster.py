@@ -0,0 +1,129 @@
+"""
+This script is used to test the Redis history stores in cluster mode, against a local Redis Cluster: the one started
+with `docker compose --profile cluster up redis-cluster` (ports 7000-7002), or any node given with
+`REDIS_CLUSTER_HOST` / `REDIS_CLUSTER_PORT`.
+
+Tests performed:
+- Add messages for several users (the keys of each user are in a single slot, the users are spread over the nodes)
+- Retrieve chat history by session ID and by user ID
+- List the sessions of a user
+- Delete chat history by session ID
+- Delete chat history by user ID
+- Rebuild the session indexes (scan of every primary node in parallel)
+- Delete all chat histories (every primary node in parallel)
+- The same operations with the async history store
+"""
+
+import asyncio
+import os
+import sys
+from collections import defaultdict
+from uuid import uuid4
+
+from redis.cluster import key_slot
+
+# Add to system path the '../' directory
+_current_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(_current_dir, "../"))
+
+from src.infra.dbs.redisdb import RedisChatHistoryHelper
+from src.infra.dbs.redisdb_async import AsyncRedisChatHistoryHelper
+from src.infra.document_store import _build_history_item
+from src.chatbot.chatbot_entities import MessageRole
+
+# -------------------------------
+# Constants
+# -------------------------------
+CLUSTER_HOST = os.getenv("REDIS_CLUSTER_HOST", "localhost")
+CLUSTER_PORT = int(os.getenv("REDIS_CLUSTER_PORT", "7000"))
+COLLECTION = "cluster-chatbot-history"
+
+n_users = 20
+n_sessions_per_user = 3
+n_msgs_to_add = 4
+
+# -------------------------------
+# Initializations
+# -------------------------------
+history_store = RedisChatHistoryHelper(
+    host=CLUSTER_HOST, port=CLUSTER_PORT, db=0, collection=COLLECTION, cluster=True, delete_batch_size=2
+)
+user_ids = [f"cluster-user-{i}" for i in range(n_users)]
+sessions = {user_id: [str(uuid4()) for _ in range(n_sessions_per_user)] for user_id in user_ids}
+
+
+def _build_message(i: int):
+    return _build_history_item(message_id=str(uuid4()), role=MessageRole.USER, content=f"Test Message {i}")
+
+
+# -------------------------------
+# Add messages for several users
+# -------------------------------
+for user_id, session_ids in sessions.items():
+    for session_id in session_ids:
+        for i in range(n_msgs_to_add):
+            history_store.add(message=_build_message(i), session_id=session_id, user_id=user_id)
+
+users_per_node = defaultdict(int)
+for user_id, session_ids in sessions.items():
+    user_keys = [history_store._user_index_key(user_id)]
+    for session_id in session_ids:
+        session_key = history_store._session_key(user_id, session_id)
+        user_keys += [session_key, history_store._messages_key(session_key)]
+    assert len({key_slot(key.encode()) for key in user_keys}) == 1
+    users_per_node[history_store.history_store.get_node_from_key(user_keys[0]).name] += 1
+print("Users per node:", dict(users_per_node))
+
+
+# -------------------------------
+# Retrieve chat history by session ID and by user ID
+# -------------------------------
+user_id = user_ids[0]
+chat_history = history_store.get_history_by_session_id(user_id=user_id, session_id=sessions[user_id][0])
+assert len(chat_history.history) == n_msgs_to_add
+
+user_history = history_store.get_history_by_user_id(user_id)
+assert len(user_history) == n_sessions_per_user
+
+
+# -------------------------------
+# List the sessions of a user
+# -------------------------------
+page = history_store.list_sessions(user_id, limit=2)
+assert len(page.sessions) == 2 and page.next_cursor is not None
+
+
+# -------------------------------
+# Delete chat history by session ID / by user ID
+# -------------------------------
+assert history_store.delete_chat_history_by_session_id(user_id, sessions[user_id][0]) is True
+assert history_store.delete_chat_history_by_user_id(user_id) == n_sessions_per_user - 1
+
+
+# -------------------------------
+# Rebuild the session indexes / delete all chat histories
+# -------------------------------
+assert history_store.rebuild_session_index() == (n_users - 1) * n_sessions_per_user
+assert history_store.delete_all_chats() == (n_users - 1) * n_sessions_per_user
+
+
+# -------------------------------
+# Async history store
+# -------------------------------
+async def _test_async_history_store() -> None:
+    async_history_store = AsyncRedisChatHistoryHelper(
+        host=CLUSTER_HOST, port=CLUSTER_PORT, db=0, collection=COLLECTION, cluster=True
+    )
+    for user_id, session_ids in sessions.items():
+        for session_id in session_ids:
+            await async_history_store.add(message=_build_message(0), session_id=session_id, user_id=user_id)
+
+    user_id = user_ids[0]
+    assert len(await async_history_store.get_history_by_user_id(user_id)) == n_sessions_per_user
+    assert await async_history_store.delete_chat_history_by_session_id(user_id, sessions[user_id][0]) is True
+    assert await async_history_store.delete_all_chats() == n_users * n_sessions_per_user - 1
+    await async_history_store.aclose()
+
+
+asyncio.run(_test_async_history_store())
+print("Cluster mode: all checks passed.")
@@ -0,0 +1,71 @@
+"""
+This script is used to test the trusted hydration of the chat history items (`ChatbotHistoryItem.from_trusted`),
+which builds the items without validation (`CHATBOT_HISTORY_TRUSTED_READS=true`).
+Tests performed:
+- The trusted items are equal to the validated items
+- `model_fields_set` and `model_dump(exclude_unset=True)` match the validated items
+- `model_copy` (with an update, and deep) does not modify the original item
+- Items stored before a field was added get the default value of the field
+"""
+
+import os
+import sys
+
+# Add to system path the '../' directory
+_current_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(_current_dir, "../"))
+
+from src.chatbot.chatbot_entities import _FAST_CONSTRUCT, ChatbotHistoryItem
+
+# -------------------------------
+# Constants
+# -------------------------------
+stored_item = {
+    "role": "assistant",
+    "content": "Test Message",
+    "message_id": "1",
+    "question_id": "0",
+    "intent": None,
+    "reference": {"source": "doc.pdf"},
+    "timestamp": 1700000000000,
+    "feedback_rating": None,
+}
+print("Fast path enabled:", _FAST_CONSTRUCT)
+
+
+# -------------------------------
+# Trusted items are equal to the validated items
+# -------------------------------
+validated = ChatbotHistoryItem(**stored_item)
+trusted = ChatbotHistoryItem.from_trusted(dict(stored_item))
+assert trusted == validated
+assert trusted.model_dump() == validated.model_dump()
+
+
+# -------------------------------
+# Fields set
+# -------------------------------
+assert trusted.model_fields_set == validated.model_fields_set
+assert trusted.model_dump(exclude_unset=True) == validated.model_dump(exclude_unset=True)
+
+
+# -------------------------------
+# Copies
+# -------------------------------
+updated = trusted.model_copy(update={"feedback_rating": 1})
+assert updated.feedback_rating == 1 and trusted.feedback_rating is None
+assert updated.model_fields_set == trusted.model_fields_set | {"feedback_rating"}
+
+copied = trusted.model_copy(deep=True)
+copied.reference["source"] = "other.pdf"
+assert trusted.reference == {"source": "doc.pdf"}
+
+
+# -------------------------------
+# Items stored before a field was added
+# -------------------------------
+old_item = {key: value for key, value in stored_item.items() if key != "question_id"}
+trusted = ChatbotHistoryItem.from_trusted(dict(old_item))
+assert trusted.question_id is None
+assert trusted.model_dump(exclude_unset=True) == ChatbotHistoryItem(**old_item).model_dump(exclude_unset=True)
+print("Trusted hydration: all checks passed.")
@@ -0,0 +1,34 @@
+"""
+This script is used to demote the idle chat sessions from Redis to the cold store once (e.g. from a cron job),
+and to report the Redis memory it freed.
+
+It requires the hot/cold tiering to be enabled (`TIERING_ENABLED=true`). It is safe to run it while the history
+store is in use: the sessions modified during their demotion are read again.
+"""
+
+import os
+import sys
+
+# Add to system path the '../' directory
+_current_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(_current_dir, "../"))
+
+from src.infra.document_store import DocumentStore
+from src.infra.dbs.tiering import TieredRedisChatHistoryHelper
+
+# -------------------------------
+# Initializations
+# -------------------------------
+document_store = DocumentStore()
+
+
+# -------------------------------
+# Demote the idle sessions
+# -------------------------------
+if __name__ == "__main__":
+    if not isinstance(document_store.history_store, TieredRedisChatHistoryHelper):
+        sys.exit("The hot/cold tiering is disabled: set TIERING_ENABLED=true.")
+
+    report = document_store.history_store.demote_idle_sessions()
+    print("Demotion:", report)
+    print("Tiering:", document_store.history_store.tiering_stats())
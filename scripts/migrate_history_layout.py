@@ -0,0 +1,28 @@
+"""
+This script is used to migrate the chat histories stored with the legacy Redis layout
+(one JSON string per session) to the hash + list layout used by RedisChatHistoryHelper.
+It must be run before deploying the hash + list layout (see the README).
+
+It is safe to run it multiple times: sessions already stored with the new layout are skipped.
+"""
+
+import os
+import sys
+
+# Add to system path the '../' directory
+_current_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(_current_dir, "../"))
+
+from src.infra.document_store import DocumentStore
+
+# -------------------------------
+# Initializations
+# -------------------------------
+document_store = DocumentStore()
+
+
+# -------------------------------
+# Migrate legacy sessions
+# -------------------------------
+if __name__ == "__main__":
+    document_store.history_store.migrate_legacy_sessions()
@@ -0,0 +1,28 @@
+"""
+This script is used to rebuild the per user session indexes (`{collection}/{user_id}/sessions`)
+from the chat histories stored in Redis.
+
+It has to be run once for the sessions written before the indexes existed; afterwards the indexes
+are kept up to date by the history store itself.
+"""
+
+import os
+import sys
+
+# Add to system path the '../' directory
+_current_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(_current_dir, "../"))
+
+from src.infra.document_store import DocumentStore
+
+# -------------------------------
+# Initializations
+# -------------------------------
+document_store = DocumentStore()
+
+
+# -------------------------------
+# Rebuild the session indexes
+# -------------------------------
+if __name__ == "__main__":
+    document_store.history_store.rebuild_session_index()
@@ -0,0 +1,28 @@
+"""
+This script is used to rewrite the chat history messages stored in Redis with the configured codec
+(`REDIS_CODEC`), e.g. after changing the codec or to convert the legacy (headerless) JSON messages.
+
+It is optional: the history store reads every format. It is safe to run it multiple times and while
+the history store is in use: sessions already encoded with the configured codec are skipped.
+"""
+
+import os
+import sys
+
+# Add to system path the '../' directory
+_current_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(_current_dir, "../"))
+
+from src.infra.document_store import DocumentStore
+
+# -------------------------------
+# Initializations
+# -------------------------------
+document_store = DocumentStore()
+
+
+# -------------------------------
+# Re-encode the sessions
+# -------------------------------
+if __name__ == "__main__":
+    document_store.history_store.reencode_sessions()
@@ -1,8 +1,9 @@
 """Module containing chatbot related entities"""
 
 import uuid
+from collections.abc import Sequence
 from enum import Enum
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from pydantic import BaseModel
 
@@ -70,6 +71,65 @@ class ChatbotHistoryItem(BaseModel):
     timestamp: int | None
     feedback_rating: int | None
 
+    @classmethod
+    def from_trusted(cls, item: dict) -> "ChatbotHistoryItem":
+        """
+        Builds the item from a dictionary written by `model_dump` (e.g. read back from the history store), without validation.
+
+        The dictionary is used as the instance `__dict__`, as `model_construct` does, but without its per-field
+        loop: `model_construct` costs more than validating the item (see `benchmarks/bench_hydration.py`).
+        Every instance attribute that `model_construct` sets is set too (`__pydantic_fields_set__`, `__pydantic_extra__`,
+        `__pydantic_private__`), and at import the result is checked against `model_construct` (`model_dump`,
+        `model_dump(exclude_unset=True)`, `model_copy`): if the installed pydantic builds instances differently,
+        `model_construct` is always used. It is also used for the dictionaries that do not hold exactly the fields
+        of the model (e.g. items stored before a field was added), as it fills the defaults.
+
+        Args:
+            item (dict): The trusted item data. It is owned by the returned instance afterwards.
+
+        Returns:
+            ChatbotHistoryItem: The item.
+        """
+        if not _FAST_CONSTRUCT or item.keys() != cls.model_fields.keys():
+            return cls.model_construct(**item)
+        return _construct_trusted(cls, item)
+
+
+def _construct_trusted(cls: type, item: dict) -> BaseModel:
+    """Builds an instance of the model from its complete field values, setting the attributes `model_construct` sets."""
+    instance = cls.__new__(cls)
+    object.__setattr__(instance, "__dict__", item)
+    object.__setattr__(instance, "__pydantic_fields_set__", set(item))
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
+
+
+def _fast_construct_matches() -> bool:
+    """Returns True if `_construct_trusted` builds the same items as `model_construct` with the installed pydantic."""
+    item = {
+        "role": "user", "content": "content", "message_id": "1", "question_id": None, "intent": None,
+        "reference": {"source": 1}, "timestamp": 1, "feedback_rating": None,
+    }
+    try:
+        fast = _construct_trusted(ChatbotHistoryItem, dict(item))
+        constructed = ChatbotHistoryItem.model_construct(**item)
+        return (
+            fast == constructed
+            and fast.model_fields_set == constructed.model_fields_set
+            and fast.model_dump() == constructed.model_dump()
+            and fast.model_dump(exclude_unset=True) == constructed.model_dump(exclude_unset=True)
+            and fast.model_copy(update={"feedback_rating": 1}).model_dump()
+            == constructed.model_copy(update={"feedback_rating": 1}).model_dump()
+            and fast.model_copy(deep=True) == constructed
+        )
+    except Exception:
+        return False
+
+
+# The fast path of `ChatbotHistoryItem.from_trusted` relies on pydantic internals: it is used only if it matches
+_FAST_CONSTRUCT = _fast_construct_matches()
+
 
 class ChatbotHistory(BaseModel):
     """
@@ -85,6 +145,126 @@ class ChatbotHistory(BaseModel):
     session_id: uuid.UUID
     history: list[ChatbotHistoryItem]
 
+    @classmethod
+    def from_trusted(cls, session_id: Union[uuid.UUID, str], items: List[dict]) -> "ChatbotHistory":
+        """
+        Builds the history from the message dictionaries written by `model_dump`, without validation
+        (see `ChatbotHistoryItem.from_trusted`).
+
+        Args:
+            session_id (Union[uuid.UUID, str]): The UUID of the conversation.
+            items (List[dict]): The trusted message data.
+
+        Returns:
+            ChatbotHistory: The history.
+        """
+        return cls.model_construct(
+            session_id=session_id if isinstance(session_id, uuid.UUID) else uuid.UUID(str(session_id)),
+            history=[ChatbotHistoryItem.from_trusted(item) for item in items],
+        )
+
+
+class ChatbotSessionSummary(BaseModel):
+    """
+    Pydantic model for representing the metadata of a conversation, without its messages (e.g. for a list of sessions).
+
+    Attributes:
+        session_id (uuid.UUID): A UUID for the conversation.
+        topic (str): The topic of the conversation.
+        deleted (bool): Whether the conversation is flagged as deleted.
+        message_count (int): The number of exchanged messages.
+        last_activity (int | None): UNIX millisecond-granular timestamp of the last message.
+    """
+
+    session_id: uuid.UUID
+    topic: str = ""
+    deleted: bool = False
+    message_count: int = 0
+    last_activity: int | None = None
+
+
+class ChatbotSessionPage(BaseModel):
+    """
+    Pydantic model for representing a page of conversation summaries.
+
+    Attributes:
+        sessions (List[ChatbotSessionSummary]): The conversation summaries, most recently active first.
+        next_cursor (str | None): The cursor of the next page, or None if it is the last page.
+    """
+
+    sessions: list[ChatbotSessionSummary]
+    next_cursor: str | None = None
+
+
+class LazyChatbotHistory(Sequence):
+    """
+    Read-only view of a whole conversation that builds each ChatbotHistoryItem only when it is accessed.
+
+    Useful when only a few messages of a long history are used (e.g. the last ones): the other messages
+    stay plain dictionaries. The view is a sequence of ChatbotHistoryItem objects and, like ChatbotHistory,
+    exposes `session_id` and `history`.
+
+    Args:
+        session_id (Union[uuid.UUID, str]): The UUID of the conversation.
+        items (List[dict]): The message data.
+        trusted (bool): If True, the items are built without validation (see `ChatbotHistoryItem.from_trusted`).
+    """
+    def __init__(self, session_id: Union[uuid.UUID, str], items: List[dict], trusted: bool = False):
+        self.session_id = session_id if isinstance(session_id, uuid.UUID) else uuid.UUID(str(session_id))
+        self._items = items
+        self._history: List[Optional[ChatbotHistoryItem]] = [None] * len(items)
+        self._trusted = trusted
+
+    def _item(self, index: int) -> ChatbotHistoryItem:
+        if self._history[index] is None:
+            item = self._items[index]
+            self._history[index] = (
+                ChatbotHistoryItem.from_trusted(item) if self._trusted else ChatbotHistoryItem(**item)
+            )
+        return self._history[index]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._item(i) for i in range(*index.indices(len(self._items)))]
+        return self._item(index)
+
+    @property
+    def history(self) -> List[ChatbotHistoryItem]:
+        """Builds (if not done yet) and returns every message."""
+        return self[:]
+
+    def materialize(self) -> ChatbotHistory:
+        """Returns the equivalent ChatbotHistory, building every message."""
+        return ChatbotHistory.model_construct(session_id=self.session_id, history=self.history)
+
+
+def build_chatbot_history(
+    session_id: Union[uuid.UUID, str],
+    items: List[dict],
+    trusted: bool = False,
+    lazy: bool = False,
+) -> Union[ChatbotHistory, LazyChatbotHistory]:
+    """
+    Builds a chatbot history from the message dictionaries read from a history store.
+
+    Args:
+        session_id (Union[uuid.UUID, str]): The UUID of the conversation.
+        items (List[dict]): The message data.
+        trusted (bool): If True, the data was written by the application (`model_dump`) and is not validated again.
+        lazy (bool): If True, returns a LazyChatbotHistory view, building the messages when they are accessed.
+
+    Returns:
+        Union[ChatbotHistory, LazyChatbotHistory]: The chatbot history.
+    """
+    if lazy:
+        return LazyChatbotHistory(session_id=session_id, items=items, trusted=trusted)
+    if trusted:
+        return ChatbotHistory.from_trusted(session_id=session_id, items=items)
+    return ChatbotHistory(session_id=session_id, history=[ChatbotHistoryItem(**item) for item in items])
+
 
 class ChatbotRequestDetailed(BaseModel):
     """
@@ -12,6 +12,9 @@ from src.config import CONFIG
 LOGGER_LEVEL = CONFIG["logging.logging_level"]
 LOGGER_LEVEL_PDFMINER = CONFIG["logging.logging_level_pdfminer"]
 LOGGER_LEVEL_PYMONGO = CONFIG["logging.logging_level_pymongo"]
+LOGGER_QUEUE_ENABLED = CONFIG["logging.queue_enabled"]
+LOGGER_SAMPLE_RATE_INFO = CONFIG["logging.sample_rate_info"]
+LOGGER_SAMPLE_RATE_DEBUG = CONFIG["logging.sample_rate_debug"]
 
 # ----------------------------------------------
 # Utils
@@ -24,6 +27,7 @@ ENCRYPTION_KEY = str.encode(CONFIG["utils.encryption_key"])
 CHATBOT_HISTORY_DB_TYPE = CONFIG["db_types.chatbot_history_db"]
 DOCUMENT_STORE_DB_TYPE = CONFIG["db_types.document_store_db"]
 VECTOR_STORE_DB_TYPE = CONFIG["db_types.vector_store_db"]
+CHATBOT_HISTORY_TRUSTED_READS = CONFIG["db_types.chatbot_history_trusted_reads"]
 
 # ----------------------------------------------
 # Redis
@@ -33,9 +37,72 @@ REDIS_HOST = CONFIG["redis.host"]
 REDIS_PORT = CONFIG["redis.port"]
 REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}"
 REDIS_DB = CONFIG["redis.db"]
+REDIS_CLUSTER_ENABLED = CONFIG["redis.cluster_enabled"]
 REDIS_INDEX_NAME = CONFIG["redis.index_name"]
 REDIS_PARENT_INDEX_NAME = CONFIG["redis.parent_index_name"]
 REDIS_COLLECTION_NAME = CONFIG["redis.chatbot_history_collection"]
+REDIS_SCAN_COUNT = CONFIG["redis.scan_count"]
+REDIS_DELETE_BATCH_SIZE = CONFIG["redis.delete_batch_size"]
+REDIS_CODEC = CONFIG["redis.codec"]
+REDIS_COMPRESSION = CONFIG["redis.compression"]
+REDIS_COMPRESSION_THRESHOLD = CONFIG["redis.compression_threshold"]
+REDIS_CLIENT_CACHE_ENABLED = CONFIG["redis.client_cache_enabled"]
+REDIS_CLIENT_CACHE_MAX_SIZE = CONFIG["redis.client_cache_max_size"]
+REDIS_CLIENT_TRACKING_MODE = CONFIG["redis.client_tracking_mode"]
+REDIS_MAX_MESSAGES_PER_SESSION = CONFIG["redis.max_messages_per_session"]
+REDIS_MAX_CONNECTIONS = CONFIG["redis.max_connections"]
+REDIS_POOL_BLOCKING = CONFIG["redis.pool_blocking"]
+REDIS_POOL_TIMEOUT = CONFIG["redis.pool_timeout"]
+REDIS_SOCKET_TIMEOUT = CONFIG["redis.socket_timeout"]
+REDIS_SOCKET_CONNECT_TIMEOUT = CONFIG["redis.socket_connect_timeout"]
+REDIS_SOCKET_KEEPALIVE = CONFIG["redis.socket_keepalive"]
+REDIS_HEALTH_CHECK_INTERVAL = CONFIG["redis.health_check_interval"]
+REDIS_RETRIES = CONFIG["redis.retries"]
+REDIS_RETRY_BACKOFF_BASE = CONFIG["redis.retry_backoff_base"]
+REDIS_RETRY_BACKOFF_CAP = CONFIG["redis.retry_backoff_cap"]
+
+# ----------------------------------------------
+# MongoDB
+# ----------------------------------------------
+MONGODB_CONNECTION_STRING = CONFIG["mongodb.connection_string"]
+MONGODB_DATABASE_NAME = CONFIG["mongodb.database"]
+MONGODB_COLLECTION_NAME = CONFIG["mongodb.chatbot_history_collection"]
+
+# ----------------------------------------------
+# Cosmos DB (API for MongoDB)
+# ----------------------------------------------
+COSMOS_CONNECTION_STRING = CONFIG["cosmos.connection_string"]
+COSMOS_DATABASE_NAME = CONFIG["cosmos.database"]
+COSMOS_COLLECTION_NAME = CONFIG["cosmos.chatbot_history_collection"]
+COSMOS_MAX_RETRIES = CONFIG["cosmos.max_retries"]
+COSMOS_MAX_RETRY_WAIT_MS = CONFIG["cosmos.max_retry_wait_ms"]
+COSMOS_RU_BUDGET_PER_SECOND = CONFIG["cosmos.ru_budget_per_second"]
+COSMOS_DELETE_BATCH_SIZE = CONFIG["cosmos.delete_batch_size"]
+COSMOS_TRACK_REQUEST_CHARGE = CONFIG["cosmos.track_request_charge"]
+
+# ----------------------------------------------
+# Hot/cold tiering (Redis)
+# ----------------------------------------------
+TIERING_ENABLED = CONFIG["tiering.enabled"]
+TIERING_COLD_STORE_PATH = CONFIG["tiering.cold_store_path"]
+TIERING_IDLE_SECONDS = CONFIG["tiering.idle_seconds"]
+TIERING_DEMOTION_RATE = CONFIG["tiering.demotion_rate"]
+TIERING_DEMOTION_INTERVAL_SECONDS = CONFIG["tiering.demotion_interval_seconds"]
+
+
+# ----------------------------------------------
+# History cache (in-process)
+# ----------------------------------------------
+HISTORY_CACHE_ENABLED = CONFIG["history_cache.enabled"]
+HISTORY_CACHE_MAX_ENTRIES = CONFIG["history_cache.max_entries"]
+HISTORY_CACHE_MAX_BYTES = CONFIG["history_cache.max_bytes"]
+HISTORY_CACHE_TTL_SECONDS = CONFIG["history_cache.ttl_seconds"]
+
+
+# ----------------------------------------------
+# Metrics (history store)
+# ----------------------------------------------
+METRICS_ENABLED = CONFIG["metrics.enabled"]
 
 
 # ----------------------------------------------
@@ -43,5 +110,7 @@ REDIS_COLLECTION_NAME = CONFIG["redis.chatbot_history_collection"]
 # ----------------------------------------------
 CHATBOT_HISTORY_COLLECTION_NAME = (
     REDIS_COLLECTION_NAME if CHATBOT_HISTORY_DB_TYPE == "redis"
+    else MONGODB_COLLECTION_NAME if CHATBOT_HISTORY_DB_TYPE == "mongodb"
+    else COSMOS_COLLECTION_NAME if CHATBOT_HISTORY_DB_TYPE == "cosmos"
     else None
 )
\ No newline at end of file
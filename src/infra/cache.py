@@ -0,0 +1,206 @@
+"""Module containing the in-process cache of the chatbot histories"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+from src.chatbot.chatbot_entities import ChatbotHistory
+
+# -------------------------------
+# Constants
+# -------------------------------
+_ITEM_OVERHEAD_BYTES = 256  # Rough per-message overhead of the pydantic model (fields, dict, object headers)
+_GENERATION_STRIPES = 1024  # Number of invalidation counters (the sessions and the users are hashed over them)
+
+
+def estimate_history_size(history: ChatbotHistory) -> int:
+    """
+    Cheaply estimates the memory footprint (bytes) of a chatbot history, without serializing it.
+
+    Args:
+        history (ChatbotHistory): The chatbot history.
+
+    Returns:
+        int: The estimated size in bytes.
+    """
+    size = 0
+    for item in history.history:
+        size += _ITEM_OVERHEAD_BYTES + len(item.content)
+        if item.reference:
+            size += len(str(item.reference))
+    return size
+
+
+class HistoryCache:
+    """
+    Thread-safe read-through cache of chatbot histories, with LRU eviction and a TTL.
+
+    The cache is bounded both by number of entries and by (estimated) bytes. Entries are indexed by
+    (user_id, session_id), so that every window cached for a session can be invalidated at once.
+
+    Every invalidation bumps a generation counter of the session (or of the user, or of the whole cache).
+    A reader captures the generation before reading the store and passes it to `set`: if a write invalidated the
+    session meanwhile, the history it read may be stale and is not cached. The counters are striped (a fixed number
+    of counters, the sessions hashed over them), so an unrelated invalidation may rarely skip a `set`, never
+    cache a stale history.
+
+    Args:
+        max_entries (int): The maximum number of cached histories.
+        max_bytes (int): The maximum estimated size of the cached histories.
+        ttl_seconds (float): The time to live of an entry, in seconds.
+
+    Attributes:
+        hits (int): The number of lookups served from the cache.
+        misses (int): The number of lookups not found (or expired) in the cache.
+        evictions (int): The number of entries evicted to honour the bounds.
+    """
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, ChatbotHistory]]" = OrderedDict()
+        self._session_keys: Dict[Tuple[str, str], Set[Hashable]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._epoch = 0  # Bumped by `clear`
+        self._user_generations = [0] * _GENERATION_STRIPES
+        self._session_generations = [0] * _GENERATION_STRIPES
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _session(key: Hashable) -> Tuple[str, str]:
+        """Returns the (user_id, session_id) a cache key belongs to (the first two items of the key)."""
+        return str(key[0]), str(key[1])
+
+    def _remove(self, key: Hashable) -> None:
+        """Removes an entry (the lock must be held)."""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        session = self._session(key)
+        session_keys = self._session_keys.get(session)
+        if session_keys is not None:
+            session_keys.discard(key)
+            if not session_keys:
+                del self._session_keys[session]
+
+    @staticmethod
+    def _stripe(item: Hashable) -> int:
+        """Returns the index of the generation counter of a user id or of a (user_id, session_id) pair."""
+        return hash(item) % _GENERATION_STRIPES
+
+    def _generation(self, session: Tuple[str, str]) -> Tuple[int, int, int]:
+        """Returns the generation of the session (the lock must be held)."""
+        return (
+            self._epoch,
+            self._user_generations[self._stripe(session[0])],
+            self._session_generations[self._stripe(session)],
+        )
+
+    def generation(self, key: Hashable) -> Tuple[int, int, int]:
+        """
+        Returns the current generation of the session of the key, to be captured before reading the store
+        and passed to `set`.
+
+        Args:
+            key (Hashable): A tuple starting with (user_id, session_id).
+        """
+        with self._lock:
+            return self._generation(self._session(key))
+
+    def get(self, key: Hashable) -> Optional[ChatbotHistory]:
+        """
+        Returns the cached history of the key, if present and not expired.
+
+        Args:
+            key (Hashable): A tuple starting with (user_id, session_id).
+
+        Returns:
+            Optional[ChatbotHistory]: The cached history, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key: Hashable, history: ChatbotHistory, generation: Optional[Tuple[int, int, int]] = None) -> None:
+        """
+        Caches the history of the key, evicting the least recently used entries if the bounds are exceeded.
+
+        Args:
+            key (Hashable): A tuple starting with (user_id, session_id).
+            history (ChatbotHistory): The history to cache.
+            generation (Optional[Tuple[int, int, int]]): The generation of the session captured before the history
+                                                         was read (see `generation`). If the session was invalidated
+                                                         since, the history is not cached.
+        """
+        size = estimate_history_size(history)
+        if size > self.max_bytes:
+            return  # Never cache an entry that alone exceeds the bound
+
+        with self._lock:
+            if generation is not None and generation != self._generation(self._session(key)):
+                return  # Invalidated by a write while the history was read: it may be stale
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, history)
+            self._session_keys.setdefault(self._session(key), set()).add(key)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_session(self, user_id: str, session_id: str) -> None:
+        """Drops every entry of the session."""
+        with self._lock:
+            self._session_generations[self._stripe((str(user_id), str(session_id)))] += 1
+            for key in list(self._session_keys.get((str(user_id), str(session_id)), ())):
+                self._remove(key)
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drops every entry of the user."""
+        with self._lock:
+            self._user_generations[self._stripe(str(user_id))] += 1
+            for session in [session for session in self._session_keys if session[0] == str(user_id)]:
+                for key in list(self._session_keys.get(session, ())):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        """Drops every entry."""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._session_keys.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Returns the statistics of the cache.
+
+        Returns:
+            dict: hits, misses, hit_rate, evictions, entries and (estimated) bytes.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
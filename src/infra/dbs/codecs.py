@@ -0,0 +1,389 @@
+"""
+This script is used to (de)serialize the values stored by the history helpers.
+
+Every encoded value starts with a 4 bytes header, followed by the serialized payload:
+    - MAGIC (1 byte):          0xC1, a byte that can neither start a JSON document (invalid UTF-8) nor be
+                               produced by msgpack ("never used"), so headed values are told apart from
+                               the legacy (headerless) JSON values;
+    - FORMAT_VERSION (1 byte): the version of the on-disk format;
+    - FORMAT (1 byte):         the serialization format of the payload (see `FORMAT_JSON`, `FORMAT_MSGPACK`);
+    - COMPRESSION (1 byte):    the compression of the payload (see `COMPRESSIONS`), 0 if not compressed.
+
+Values without the header are legacy JSON values: they are still decoded, whatever the configured codec,
+so that data written with different codecs (or before the header existed) can be read side by side.
+Values of the format version 1 have a 3 bytes header (no compression byte) and are still decoded.
+
+Payloads of at least `compression_threshold` bytes are compressed with the configured compression
+("zstd", "lz4" or "zlib"; zlib, from the standard library, is used if the library of the configured one
+is not installed), unless compressing does not make them smaller.
+
+Supported codecs:
+    - "json":    stdlib `json` (JSON format);
+    - "orjson":  `orjson` (JSON format, `poetry install -E orjson`);
+    - "msgpack": `msgpack` (msgpack format, `poetry install -E msgpack`).
+The codecs writing the same format read each other's values.
+"""
+
+import json
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.logging.logger import logger
+
+try:
+    import orjson
+except ImportError:  # Optional dependency, required by the "orjson" codec only
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optional dependency, required by the "msgpack" codec (and to read msgpack values) only
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency, required by the "zstd" compression only
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # Optional dependency, required by the "lz4" compression only
+    lz4_frame = None
+
+
+# -------------------------------
+# Constants
+# -------------------------------
+MAGIC = 0xC1
+FORMAT_VERSION = 2
+FORMAT_JSON = 1
+FORMAT_MSGPACK = 2
+HEADER_SIZES = {1: 3, 2: 4}  # Header size of each format version
+COMPRESSION_NONE = 0
+COMPRESSIONS = {"zlib": 1, "zstd": 2, "lz4": 3}
+DEFAULT_CODEC = "json"
+DEFAULT_COMPRESSION_THRESHOLD = 1024  # Bytes
+
+
+class CompressionStats:
+    """
+    Thread-safe counters of the compression work of a codec, used to tune the compression threshold.
+
+    Attributes:
+        compressed_values (int): The number of values compressed (and stored compressed).
+        skipped_values (int): The number of values above the threshold that compression did not make smaller.
+        raw_bytes (int): The size of the compressed values, before compression.
+        compressed_bytes (int): The size of the compressed values, after compression.
+        compress_seconds (float): The CPU time spent compressing (compressed and skipped values).
+        decompressed_values (int): The number of values decompressed.
+        decompress_seconds (float): The CPU time spent decompressing.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.compressed_values = 0
+        self.skipped_values = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.compress_seconds = 0.0
+        self.decompressed_values = 0
+        self.decompress_seconds = 0.0
+
+    def record_compression(self, raw_size: int, compressed_size: Optional[int], seconds: float) -> None:
+        """Records a compression; `compressed_size` is None if the value was stored uncompressed."""
+        with self._lock:
+            self.compress_seconds += seconds
+            if compressed_size is None:
+                self.skipped_values += 1
+                return
+            self.compressed_values += 1
+            self.raw_bytes += raw_size
+            self.compressed_bytes += compressed_size
+
+    def record_decompression(self, count: int, seconds: float) -> None:
+        """Records the decompression of `count` values."""
+        with self._lock:
+            self.decompressed_values += count
+            self.decompress_seconds += seconds
+
+    def as_dict(self) -> dict:
+        """
+        Returns the statistics.
+
+        Returns:
+            dict: The counters, plus the compression ratio (raw / compressed size of the compressed values).
+        """
+        with self._lock:
+            return {
+                "compressed_values": self.compressed_values,
+                "skipped_values": self.skipped_values,
+                "raw_bytes": self.raw_bytes,
+                "compressed_bytes": self.compressed_bytes,
+                "ratio": self.raw_bytes / self.compressed_bytes if self.compressed_bytes else 0.0,
+                "compress_seconds": self.compress_seconds,
+                "decompressed_values": self.decompressed_values,
+                "decompress_seconds": self.decompress_seconds,
+            }
+
+
+# -------------------------------
+# Compressions
+# -------------------------------
+def _zstd_compress(payload: bytes) -> bytes:
+    return zstandard.ZstdCompressor().compress(payload)
+
+
+def _zstd_decompress(payload: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(payload)
+
+
+_COMPRESS: Dict[int, Callable[[bytes], bytes]] = {
+    COMPRESSIONS["zlib"]: zlib.compress,
+    COMPRESSIONS["zstd"]: _zstd_compress,
+    COMPRESSIONS["lz4"]: lambda payload: lz4_frame.compress(payload),
+}
+
+_DECOMPRESS: Dict[int, Callable[[bytes], bytes]] = {
+    COMPRESSIONS["zlib"]: zlib.decompress,
+    COMPRESSIONS["zstd"]: _zstd_decompress,
+    COMPRESSIONS["lz4"]: lambda payload: lz4_frame.decompress(payload),
+}
+
+_COMPRESSION_AVAILABLE = {
+    COMPRESSIONS["zlib"]: True,
+    COMPRESSIONS["zstd"]: zstandard is not None,
+    COMPRESSIONS["lz4"]: lz4_frame is not None,
+}
+
+
+def _decompress(compression: int, payload: bytes) -> bytes:
+    if not _COMPRESSION_AVAILABLE.get(compression, False):
+        raise ValueError(f"A value compressed with an unavailable compression ({compression}) was found.")
+    return _DECOMPRESS[compression](payload)
+
+
+class Codec:
+    """
+    Serializer of the stored values, writing the versioned header in front of each payload.
+    Values are decoded with `decode_value` / `decode_values`, whatever the codec that encoded them.
+
+    Args:
+        name (str): The name of the codec.
+        format (int): The serialization format written by the codec.
+        dumps (Callable[[Any], bytes]): Serializes a value into a payload.
+        compression (Optional[str]): "zstd", "lz4" or "zlib". None disables the compression.
+        compression_threshold (int): The min size (bytes) of the payloads to compress.
+
+    Attributes:
+        header (bytes): The header written in front of every uncompressed value encoded by the codec.
+        stats (CompressionStats): The compression work done by the codec (and by the decoding calls it is given to).
+    """
+    def __init__(
+        self,
+        name: str,
+        format: int,
+        dumps: Callable[[Any], bytes],
+        compression: Optional[str] = None,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+    ):
+        self.name = name
+        self.format = format
+        self.header = bytes((MAGIC, FORMAT_VERSION, format, COMPRESSION_NONE))
+        self.compression_threshold = compression_threshold
+        self.stats = CompressionStats()
+        self._dumps = dumps
+
+        self.compression = None
+        if compression:
+            if compression not in COMPRESSIONS:
+                raise ValueError(f"Unsupported compression: {compression}. Supported values: {tuple(COMPRESSIONS)}")
+            if not _COMPRESSION_AVAILABLE[COMPRESSIONS[compression]]:
+                logger.warning(f"The {compression} compression is not installed, falling back to zlib.")
+                compression = "zlib"
+            self.compression = compression
+        self._compressed_header = (
+            bytes((MAGIC, FORMAT_VERSION, format, COMPRESSIONS[self.compression])) if self.compression else None
+        )
+
+    def is_encoded(self, raw: bytes) -> bool:
+        """Returns True if the stored value is written as the codec would write it (format version, format and compression)."""
+        if raw[:3] != self.header[:3] or len(raw) < 4:
+            return False
+        return raw[3] in (COMPRESSION_NONE, COMPRESSIONS[self.compression] if self.compression else COMPRESSION_NONE)
+
+    def encode(self, value: Any) -> bytes:
+        """Serializes the value, compresses it if it is large enough, and prepends the header."""
+        payload = self._dumps(value)
+        if self.compression is None or len(payload) < self.compression_threshold:
+            return self.header + payload
+
+        start = time.thread_time()
+        compressed = _COMPRESS[COMPRESSIONS[self.compression]](payload)
+        elapsed = time.thread_time() - start
+
+        if len(compressed) >= len(payload):
+            self.stats.record_compression(len(payload), None, elapsed)
+            return self.header + payload
+        self.stats.record_compression(len(payload), len(compressed), elapsed)
+        return self._compressed_header + compressed
+
+    def __repr__(self) -> str:
+        return f"Codec(name={self.name!r})"
+
+
+# -------------------------------
+# Format readers
+# -------------------------------
+def _json_loads(payload: bytes) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN/Infinity, accepted by the stdlib json only
+    return json.loads(payload)
+
+
+def _msgpack_loads(payload: bytes) -> Any:
+    if msgpack is None:
+        raise ValueError("A msgpack encoded value was found, but msgpack is not installed (`poetry install -E msgpack`).")
+    return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+
+_LOADS: Dict[int, Callable[[bytes], Any]] = {
+    FORMAT_JSON: _json_loads,
+    FORMAT_MSGPACK: _msgpack_loads,
+}
+
+
+def _parse(raw: bytes) -> Tuple[int, int, bytes]:
+    """
+    Splits a stored value into its format, its compression and its payload, checking its format version.
+    Legacy (headerless) values are uncompressed JSON.
+    """
+    if not raw or raw[0] != MAGIC:
+        return FORMAT_JSON, COMPRESSION_NONE, raw
+    if raw[1] not in HEADER_SIZES:
+        raise ValueError(f"Unsupported format version: {raw[1]}.")
+    if raw[2] not in _LOADS:
+        raise ValueError(f"Unsupported format: {raw[2]}.")
+    compression = raw[3] if raw[1] >= 2 else COMPRESSION_NONE
+    return raw[2], compression, raw[HEADER_SIZES[raw[1]]:]
+
+
+def _parse_all(raws: List[bytes], stats: Optional[CompressionStats]) -> List[Tuple[int, bytes]]:
+    """Returns the format and the (decompressed) payload of each stored value."""
+    parsed = []
+    decompressed_count = 0
+    start = time.thread_time()
+    for raw in raws:
+        if isinstance(raw, str):
+            raw = raw.encode()
+        format, compression, payload = _parse(raw)
+        if compression != COMPRESSION_NONE:
+            payload = _decompress(compression, payload)
+            decompressed_count += 1
+        parsed.append((format, payload))
+    if stats is not None and decompressed_count:
+        stats.record_decompression(decompressed_count, time.thread_time() - start)
+    return parsed
+
+
+def decode_value(raw: bytes, stats: Optional[CompressionStats] = None) -> Any:
+    """
+    Decodes a value written by any codec, or a legacy (headerless) JSON value.
+
+    Args:
+        raw (bytes): The stored value.
+        stats (Optional[CompressionStats]): If provided, records the decompression work.
+
+    Returns:
+        Any: The decoded value.
+
+    Raises:
+        ValueError: If the value was written with an unknown format (version), or with a format or
+                    a compression whose library is not installed.
+    """
+    format, payload = _parse_all([raw], stats)[0]
+    return _LOADS[format](payload)
+
+
+def decode_values(raws: List[bytes], stats: Optional[CompressionStats] = None) -> List[Any]:
+    """
+    Decodes a list of values written by any codec.
+
+    When every value is JSON (headed or legacy), the payloads are joined and decoded with a single call,
+    and when every value is msgpack, they are decoded by a single streaming unpacker. Lists mixing
+    formats are decoded value by value.
+
+    Args:
+        raws (List[bytes]): The stored values.
+        stats (Optional[CompressionStats]): If provided, records the decompression work.
+
+    Returns:
+        List[Any]: The decoded values.
+    """
+    if not raws:
+        return []
+
+    parsed = _parse_all(raws, stats)
+    formats = {format for format, _ in parsed}
+    if formats == {FORMAT_JSON}:
+        return _json_loads(b"[" + b",".join(payload for _, payload in parsed) + b"]")
+    if formats == {FORMAT_MSGPACK} and msgpack is not None:
+        unpacker = msgpack.Unpacker(raw=False, strict_map_key=False)
+        unpacker.feed(b"".join(payload for _, payload in parsed))
+        return list(unpacker)
+    return [_LOADS[format](payload) for format, payload in parsed]
+
+
+# -------------------------------
+# Codecs
+# -------------------------------
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value).encode()
+
+
+def get_codec(
+    name: str = DEFAULT_CODEC,
+    compression: Optional[str] = None,
+    compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+) -> Codec:
+    """
+    Returns the codec of the given name.
+
+    Args:
+        name (str): "json", "orjson" or "msgpack".
+        compression (Optional[str]): "zstd", "lz4" or "zlib". None disables the compression.
+        compression_threshold (int): The min size (bytes) of the payloads to compress.
+
+    Returns:
+        Codec: The codec.
+
+    Raises:
+        ValueError: If the codec is unknown, or if its library is not installed.
+    """
+    if name == "json":
+        dumps = _json_dumps
+        format = FORMAT_JSON
+    elif name == "orjson":
+        if orjson is None:
+            raise ValueError("The orjson codec requires orjson (`poetry install -E orjson`).")
+        # Non-str keys (e.g. int keys of the metadata) are converted to str, as the stdlib json does
+        dumps = lambda value: orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        format = FORMAT_JSON
+    elif name == "msgpack":
+        if msgpack is None:
+            raise ValueError("The msgpack codec requires msgpack (`poetry install -E msgpack`).")
+        dumps = lambda value: msgpack.packb(value, use_bin_type=True)
+        format = FORMAT_MSGPACK
+    else:
+        raise ValueError(f"Unsupported codec: {name}. Supported values: ('json', 'orjson', 'msgpack')")
+
+    return Codec(
+        name=name,
+        format=format,
+        dumps=dumps,
+        compression=compression,
+        compression_threshold=compression_threshold,
+    )
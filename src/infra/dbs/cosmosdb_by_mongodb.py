@@ -1 +1,240 @@
-"""This feature is not developed yet."""
\ No newline at end of file
+"""
+This script is used to create Azure Cosmos DB (API for MongoDB) helpers for db.
+
+It reuses the MongoDB layout and operations (see `MongoChatHistoryHelper`) and adds what matters on Cosmos:
+- the collection is partitioned (sharded) by `user_id`, so every session and user lookup targets a single partition;
+- throttled requests (error 16500 / HTTP 429) are retried, waiting for the `RetryAfterMs` hint sent by the server;
+- the request charge (RU) of each operation is recorded;
+- bulk deletes are split in batches paced to stay within a request-unit budget.
+"""
+
+import re
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional
+
+from pymongo import DeleteOne, MongoClient
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+
+from src.logging.logger import logger
+from src.infra.metrics import MetricsSink
+from src.infra.dbs.mongodb import MongoChatHistoryHelper
+
+
+# -------------------------------
+# Constants
+# -------------------------------
+THROTTLING_ERROR_CODE = 16500  # Cosmos DB "TooManyRequests" (HTTP 429)
+COMMAND_NOT_FOUND_ERROR_CODE = 59  # The server does not support the command (e.g. getLastRequestStatistics on MongoDB)
+RETRY_AFTER_PATTERN = re.compile(r"RetryAfterMs=(\d+)")
+DEFAULT_MAX_RETRIES = 9
+DEFAULT_MAX_RETRY_WAIT_MS = 30000
+DEFAULT_RU_BUDGET_PER_SECOND = 400.0
+DEFAULT_DELETE_BATCH_SIZE = 100
+PARTITION_KEY = "user_id"
+
+
+class CosmosMongoChatHistoryHelper(MongoChatHistoryHelper):
+    def __init__(
+        self,
+        connection_string: Optional[str],
+        database: str,
+        collection: str,
+        client: Optional[MongoClient] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        max_retry_wait_ms: int = DEFAULT_MAX_RETRY_WAIT_MS,
+        ru_budget_per_second: Optional[float] = DEFAULT_RU_BUDGET_PER_SECOND,
+        delete_batch_size: int = DEFAULT_DELETE_BATCH_SIZE,
+        track_request_charge: bool = True,
+        trusted_reads: bool = False,
+        metrics: Optional[MetricsSink] = None,
+    ):
+        self.max_retries = max_retries  # Max number of retries of a throttled request
+        self.max_retry_wait_ms = max_retry_wait_ms  # Max total time spent waiting for a throttled request
+        self.ru_budget_per_second = ru_budget_per_second  # RU/s that bulk operations may consume (None: unpaced)
+        self.delete_batch_size = delete_batch_size  # Max number of sessions deleted per bulk request
+        self.track_request_charge = track_request_charge
+        self.request_charges: Dict[str, float] = defaultdict(float)  # Total RU consumed per operation
+        self.throttled_requests: Dict[str, int] = defaultdict(int)  # Number of throttled requests per operation
+        super().__init__(
+            connection_string=connection_string,
+            database=database,
+            collection=collection,
+            client=client,
+            trusted_reads=trusted_reads,
+            metrics=metrics,
+        )
+
+    # -------------------------------
+    # Throttling and request charge
+    # -------------------------------
+    @staticmethod
+    def _is_throttled(error: OperationFailure) -> bool:
+        """Returns True if the error is a Cosmos DB throttling (rate limiting) error."""
+        if error.code == THROTTLING_ERROR_CODE:
+            return True
+        if isinstance(error, BulkWriteError):
+            return any(
+                write_error.get("code") == THROTTLING_ERROR_CODE
+                for write_error in error.details.get("writeErrors", [])
+            )
+        return "TooManyRequests" in str(error) or "Request rate is large" in str(error)
+
+    @staticmethod
+    def _retry_after_ms(error: OperationFailure, attempt: int) -> int:
+        """Returns the delay requested by the server (RetryAfterMs), or an exponential backoff if it is missing."""
+        match = RETRY_AFTER_PATTERN.search(str(error.details or error))
+        if match:
+            return int(match.group(1))
+        return min(2 ** attempt * 100, 5000)
+
+    def _last_request_charge(self) -> Optional[float]:
+        """
+        Returns the request charge (RU) of the last request, using the Cosmos DB `getLastRequestStatistics` command.
+
+        Note: the statistics are those of the last request sent on the pooled connection used by the command,
+        so with concurrent callers the value is best effort.
+
+        The tracking is disabled only if the server does not support the command. A throttled or transient failure
+        only skips the charge of this request (the batch is then not paced), the next requests are tracked again.
+        """
+        try:
+            statistics = self.client[self.database].command({"getLastRequestStatistics": 1})
+            return float(statistics.get("RequestCharge", 0.0))
+        except OperationFailure as e:
+            if e.code == COMMAND_NOT_FOUND_ERROR_CODE or "no such command" in str(e):
+                # Not supported by the server (e.g. plain MongoDB): stop asking for it
+                logger.warning(f"Request charge tracking disabled, getLastRequestStatistics is not supported: {e}")
+                self.track_request_charge = False
+            else:
+                logger.warning(f"Request charge skipped, getLastRequestStatistics failed: {e}")
+            return None
+        except PyMongoError as e:
+            logger.warning(f"Request charge skipped, getLastRequestStatistics failed: {e}")
+            return None
+
+    def _execute(self, operation: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Executes a database operation, retrying it while it is throttled and recording its request charge.
+
+        Args:
+            operation (str): The name of the operation, used for logging and accounting.
+            fn (Callable[..., Any]): The pymongo method to call.
+
+        Returns:
+            Any: The result of the call.
+
+        Raises:
+            OperationFailure: If the operation fails for any other reason than throttling, or if it is
+                              still throttled after `max_retries` retries or `max_retry_wait_ms` of waiting.
+        """
+        waited_ms = 0
+        attempt = 0
+
+        while True:
+            try:
+                result = fn(*args, **kwargs)
+                break
+            except OperationFailure as e:
+                if not self._is_throttled(e):
+                    raise
+
+                self.throttled_requests[operation] += 1
+                retry_after_ms = self._retry_after_ms(e, attempt)
+                if attempt >= self.max_retries or waited_ms + retry_after_ms > self.max_retry_wait_ms:
+                    logger.error(f"Operation {operation} still throttled after {attempt} retries ({waited_ms}ms).")
+                    raise
+
+                logger.warning(f"Operation {operation} throttled, retrying in {retry_after_ms}ms.")
+                time.sleep(retry_after_ms / 1000)
+                waited_ms += retry_after_ms
+                attempt += 1
+
+        if self.track_request_charge:
+            request_charge = self._last_request_charge()
+            if request_charge is not None:
+                self.request_charges[operation] += request_charge
+                logger.debug(f"Operation {operation} consumed {request_charge} RU.")
+
+        return result
+
+    def _pace(self, request_charge: float, started_at: float) -> None:
+        """Sleeps long enough for a request of the given charge to stay within `ru_budget_per_second`."""
+        if not self.ru_budget_per_second or request_charge <= 0:
+            return
+        remaining = request_charge / self.ru_budget_per_second - (time.monotonic() - started_at)
+        if remaining > 0:
+            time.sleep(remaining)
+
+    # -------------------------------
+    # Collection setup
+    # -------------------------------
+    def _create_indexes(self) -> None:
+        """Creates (if missing) the collection partitioned by user_id, then the compound index."""
+        database = self.client[self.database]
+
+        if self.collection not in self._execute("list_collection_names", database.list_collection_names):
+            try:
+                self._execute(
+                    "create_collection",
+                    database.command,
+                    {"customAction": "CreateCollection", "collection": self.collection, "shardKey": PARTITION_KEY},
+                )
+                logger.info(f"Created collection {self.collection} partitioned by {PARTITION_KEY}.")
+            except OperationFailure as e:
+                # Not a Cosmos DB server (the collection is then created implicitly by the index)
+                logger.warning(f"Could not create the partitioned collection {self.collection}: {e}")
+
+        super()._create_indexes()
+
+    # -------------------------------
+    # Bulk operations
+    # -------------------------------
+    def _delete_many(self, filter: dict) -> int:
+        """
+        Deletes all the sessions matching the filter, in bulk requests of `delete_batch_size` sessions.
+
+        Each request targets the sessions by `_id` and partition key, and the batches are paced so that
+        the consumed RU stay within `ru_budget_per_second`, instead of a single (throttled) `delete_many`.
+
+        Args:
+            filter (dict): The filter of the sessions to delete.
+
+        Returns:
+            int: The number of deleted sessions.
+        """
+        deleted_count = 0
+        projection = {"_id": 1, PARTITION_KEY: 1}
+
+        while True:
+            documents = self._execute(
+                "find",
+                lambda: list(self.history_store.find(filter, projection).limit(self.delete_batch_size)),
+            )
+            if not documents:
+                break
+
+            started_at = time.monotonic()
+            charge_before = self.request_charges["bulk_delete"]
+
+            self._execute(
+                "bulk_delete",
+                self.history_store.bulk_write,
+                [DeleteOne({"_id": document["_id"], PARTITION_KEY: document.get(PARTITION_KEY)}) for document in documents],
+                ordered=False,
+            )
+            # Once the request succeeded, every session of the batch is gone (DeleteOne retries are idempotent)
+            deleted_count += len(documents)
+
+            self._pace(self.request_charges["bulk_delete"] - charge_before, started_at)
+
+        return deleted_count
+
+    def get_request_charges(self) -> Dict[str, float]:
+        """
+        Returns the total request charge (RU) consumed so far by each operation.
+
+        Returns:
+            Dict[str, float]: The consumed RU, per operation name.
+        """
+        return dict(self.request_charges)
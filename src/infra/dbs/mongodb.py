@@ -1 +1,453 @@
-"""This feature is not developed yet."""
\ No newline at end of file
+"""
+This script is used to create MongoDB helpers for db.
+
+Storage layout: one document per chat session, identified by (user_id, session_id):
+    {
+        "user_id": str, "session_id": str, "topic": str, "deleted": bool,
+        "message_count": int, "last_activity": int,
+        "messages": [message, ...]
+    }
+"""
+
+from uuid import UUID
+from typing import Any, Callable, Iterator, Optional, Tuple, Union, List
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, MongoClient
+from pymongo.collection import Collection
+
+from src.logging.logger import logger
+from src.infra.metrics import MetricsSink, instrument_operations
+from src.chatbot.chatbot_entities import (
+    ChatbotHistory,
+    ChatbotHistoryItem,
+    ChatbotSessionPage,
+    ChatbotSessionSummary,
+    LazyChatbotHistory,
+    build_chatbot_history,
+)
+
+
+# -------------------------------
+# Constants
+# -------------------------------
+DEFAULT_PAGE_SIZE = 100
+
+
+class MongoChatHistoryHelper:
+    def __init__(
+        self,
+        connection_string: Optional[str],
+        database: str,
+        collection: str,
+        client: Optional[MongoClient] = None,
+        trusted_reads: bool = False,
+        metrics: Optional[MetricsSink] = None,
+    ):
+        self.database = database
+        self.collection = collection
+        # A client can be injected (e.g. `mongomock.MongoClient()` for local tests)
+        self.client = client if client is not None else MongoClient(connection_string)
+        self.history_store: Collection = self.client[self.database][self.collection]
+        # The messages were written by the helper (`model_dump`): build them without validating them again
+        self.trusted_reads = trusted_reads
+        self._create_indexes()
+        # With a metrics sink, the latency of every operation is recorded (see `src/infra/metrics.py`)
+        self.metrics = metrics
+        if metrics is not None:
+            instrument_operations(self, metrics)
+
+    def _execute(self, operation: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Executes a database operation. Every request sent by the helper goes through this method,
+        so that subclasses can wrap them (e.g. retries, request accounting).
+
+        Args:
+            operation (str): The name of the operation, used for logging and accounting.
+            fn (Callable[..., Any]): The pymongo method to call.
+
+        Returns:
+            Any: The result of the call.
+        """
+        return fn(*args, **kwargs)
+
+    def _create_indexes(self) -> None:
+        """
+        Creates (if missing) the compound index used by every session and user lookup, and the ones used
+        to paginate over the sessions of a user (by creation and by last activity).
+        """
+        self._execute(
+            "create_index",
+            self.history_store.create_index,
+            [("user_id", ASCENDING), ("session_id", ASCENDING)],
+            unique=True,
+            name="user_id_session_id",
+        )
+        self._execute(
+            "create_index",
+            self.history_store.create_index,
+            [("user_id", ASCENDING), ("_id", ASCENDING)],
+            name="user_id__id",
+        )
+        self._execute(
+            "create_index",
+            self.history_store.create_index,
+            [("user_id", ASCENDING), ("last_activity", DESCENDING), ("_id", DESCENDING)],
+            name="user_id_last_activity__id",
+        )
+
+    @staticmethod
+    def _session_filter(user_id: Optional[str], session_id: Union[UUID, str]) -> dict:
+        """Returns the filter matching a single session document."""
+        return {"user_id": user_id, "session_id": str(session_id)}
+
+    def add(
+        self,
+        message: ChatbotHistoryItem,
+        session_id: str,
+        user_id: Optional[str] = None,
+    ) -> None:
+        """
+        Adds a new message to the session document identified by session_id. If the document does not
+        exist, it is created (upsert) with the given session_id, user_id, and topic based on the content
+        of the first message.
+
+        The message is appended with `$push`, the metadata is set with `$setOnInsert` and the message count
+        and last activity are maintained with `$inc` / `$max`, in a single atomic update: the existing history
+        is never read nor rewritten.
+
+        Args:
+            message (ChatbotHistoryItem): The message to be added to the session.
+            session_id (str): The unique identifier for the session.
+            user_id (Optional[str]): An optional user identifier to be included in the session.
+
+        Returns:
+            None: The function does not return a value but logs the action performed.
+        """
+        message_data = message.model_dump()
+
+        result = self._execute(
+            "add",
+            self.history_store.update_one,
+            self._session_filter(user_id, session_id),
+            {
+                "$push": {"messages": message_data},
+                "$setOnInsert": {"topic": message_data.get("content", ""), "deleted": False},
+                "$inc": {"message_count": 1},
+                "$max": {"last_activity": message_data.get("timestamp") or 0},
+            },
+            upsert=True,
+        )
+
+        if result.upserted_id is not None:
+            logger.info(f"Inserted new session for session_id: {session_id}.")
+        else:
+            logger.info(f"Updated existing session for session_id: {session_id}.")
+
+    def get_history_by_session_id(
+        self,
+        user_id: str,
+        session_id: Union[UUID, str],
+        num_conversation_pairs: Optional[int] = None,
+        lazy: bool = False,
+    ) -> Optional[Union[ChatbotHistory, LazyChatbotHistory]]:
+        """
+        Retrieves the chatbot history for a specific session ID from MongoDB.
+
+        If num_conversation_pairs is provided, only the last N conversation pairs (2 messages per pair)
+        are returned by the server (`$slice` projection).
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            session_id (Union[UUID, str]): The unique identifier of the chatbot session.
+            num_conversation_pairs (Optional[int]): The number of conversation pairs to retrieve. Defaults to None (all messages).
+            lazy (bool): If True, returns a LazyChatbotHistory view that builds the messages when they are accessed.
+
+        Returns:
+            Optional[Union[ChatbotHistory, LazyChatbotHistory]]: The chatbot history for the given session ID, if available.
+        """
+        projection = {"_id": 0, "messages": 1}
+        if num_conversation_pairs is not None and num_conversation_pairs > 0:
+            projection["messages"] = {"$slice": -num_conversation_pairs * 2}
+
+        session_data = self._execute(
+            "get_history_by_session_id",
+            self.history_store.find_one,
+            self._session_filter(user_id, session_id),
+            projection,
+        )
+
+        if not session_data:
+            logger.info(f"No history found for session_id: {session_id}.")
+            return None
+
+        return build_chatbot_history(
+            session_id=session_id,
+            items=session_data.get("messages", []),
+            trusted=self.trusted_reads,
+            lazy=lazy,
+        )
+
+    def get_history_by_user_id(self, user_id: str) -> Optional[List[dict]]:
+        """
+        Retrieves the full chatbot history for a specific user ID from MongoDB.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+
+        Returns:
+            Optional[List[dict]]: A list of session dictionaries for the given user ID, if available.
+        """
+        user_sessions = self._execute(
+            "get_history_by_user_id",
+            lambda: list(self.history_store.find({"user_id": user_id}, {"_id": 0})),
+        )
+
+        if not user_sessions:
+            logger.info(f"No history found for user_id: {user_id}.")
+            return None
+
+        return user_sessions
+
+    def iter_history_by_user_id(
+        self,
+        user_id: str,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+    ) -> Iterator[Tuple[List[dict], Optional[str]]]:
+        """
+        Iterates over the sessions of a user, page by page, ordered by creation (`_id`), so that only one page
+        of sessions is held in memory at a time.
+
+        Each page comes with the cursor of the next page (None after the last page), which can be passed
+        back later (e.g. by an API client) to resume the iteration.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            page_size (int): The max number of sessions per page.
+            fields (Optional[List[str]]): If provided, only these fields of the sessions are read
+                                          (e.g. ["session_id", "topic"] for the metadata only; "messages" for the messages).
+            cursor (Optional[str]): The cursor returned with a previous page, to resume after it.
+
+        Yields:
+            Tuple[List[dict], Optional[str]]: A page of session dictionaries, and the cursor of the next page.
+        """
+        projection = {field: 1 for field in fields} if fields is not None else None
+
+        while True:
+            query = {"user_id": user_id}
+            if cursor:
+                query["_id"] = {"$gt": ObjectId(cursor)}
+
+            # One extra document tells whether another page follows
+            sessions = self._execute(
+                "iter_history_by_user_id",
+                lambda: list(self.history_store.find(query, projection).sort("_id", ASCENDING).limit(page_size + 1)),
+            )
+            if not sessions:
+                return
+
+            has_more = len(sessions) > page_size
+            sessions = sessions[:page_size]
+            cursor = str(sessions[-1]["_id"])
+            for session in sessions:
+                del session["_id"]
+
+            yield sessions, cursor if has_more else None
+            if not has_more:
+                return
+
+    def list_sessions(
+        self,
+        user_id: str,
+        include_deleted: bool = False,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> ChatbotSessionPage:
+        """
+        Lists the sessions of a user, most recently active first, without reading their messages.
+
+        The summaries are served from the session metadata (topic, deleted, message count and last activity,
+        kept up to date by `add` and `update_field`) through the (user_id, last_activity, _id) index, so the cost
+        depends only on the page size.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            include_deleted (bool): If True, the sessions flagged as deleted are listed too.
+            limit (int): The max number of sessions of the page.
+            cursor (Optional[str]): The cursor returned with a previous page, to resume after it.
+
+        Returns:
+            ChatbotSessionPage: The session summaries, and the cursor of the next page (None after the last page).
+        """
+        query = {"user_id": user_id}
+        if not include_deleted:
+            query["deleted"] = {"$ne": True}
+        if cursor:
+            last_activity, after_id = cursor.split(":", 1)
+            last_activity, after_id = int(last_activity), ObjectId(after_id)
+            query["$or"] = [
+                {"last_activity": {"$lt": last_activity}},
+                {"last_activity": last_activity, "_id": {"$lt": after_id}},
+            ]
+
+        # One extra document tells whether another page follows
+        projection = {"session_id": 1, "topic": 1, "deleted": 1, "message_count": 1, "last_activity": 1}
+        sessions = self._execute(
+            "list_sessions",
+            lambda: list(
+                self.history_store.find(query, projection)
+                .sort([("last_activity", DESCENDING), ("_id", DESCENDING)])
+                .limit(limit + 1)
+            ),
+        )
+
+        has_more = len(sessions) > limit
+        sessions = sessions[:limit]
+        next_cursor = None
+        if has_more:
+            next_cursor = f"{sessions[-1].get('last_activity') or 0}:{sessions[-1]['_id']}"
+
+        return ChatbotSessionPage(
+            sessions=[
+                ChatbotSessionSummary(**{key: value for key, value in session.items() if key != "_id"})
+                for session in sessions
+            ],
+            next_cursor=next_cursor,
+        )
+
+    def update_field(self, key: str, value: str, user_id: str, session_id: str) -> None:
+        """
+        Updates a specific field (not part of the 'messages' list) of an existing session identified by session_id.
+
+        Args:
+            key (str): The field name to be updated.
+            value (str): The new value to set for the specified field.
+            user_id (str): The unique identifier of the user.
+            session_id (str): The unique identifier for the session.
+
+        Returns:
+            None: The function does not return a value, but logs a message indicating whether the session was updated.
+        """
+        result = self._execute(
+            "update_field",
+            self.history_store.update_one,
+            self._session_filter(user_id, session_id),
+            {"$set": {key: value}},
+        )
+
+        if result.matched_count == 0:
+            logger.warning(f"No session found for session_id: {session_id}.")
+            return
+
+        logger.info(f"Updated {key} for session_id {session_id} to '{value}'.")
+
+    def _delete_many(self, filter: dict) -> int:
+        """Deletes all the sessions matching the filter and returns how many were deleted."""
+        return self._execute("delete_many", self.history_store.delete_many, filter).deleted_count
+
+    def delete_chat_history_by_session_id(self, user_id: str, session_id: str) -> Optional[bool]:
+        """
+        Deletes a specific session from MongoDB using the session ID.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            session_id (str): The unique identifier of the session to be deleted.
+
+        Returns:
+            Optional[bool]: True if the session was deleted successfully,
+                            False if the session was not found,
+                            None if an error occurred during deletion.
+        """
+        try:
+            result = self._execute(
+                "delete_chat_history_by_session_id",
+                self.history_store.delete_one,
+                self._session_filter(user_id, session_id),
+            )
+
+            if result.deleted_count > 0:
+                logger.info(f"Session with session_id {session_id} deleted successfully.")
+                return True
+            else:
+                logger.info(f"No session found with session_id {session_id}.")
+                return False
+        except Exception as e:
+            logger.error(f"An error occurred while deleting the session: {e}")
+            return None
+
+    def delete_chat_history_by_user_id(self, user_id: str) -> Optional[int]:
+        """
+        Deletes all sessions associated with a specific user_id in MongoDB (bulk `delete_many`).
+
+        Args:
+            user_id (str): The unique identifier of the user whose sessions are to be deleted.
+
+        Returns:
+            Optional[int]: The number of sessions deleted, or None if an error occurred during deletion.
+        """
+        try:
+            deleted_count = self._delete_many({"user_id": user_id})
+
+            if deleted_count > 0:
+                logger.info(f"Deleted {deleted_count} sessions for user_id {user_id}.")
+            else:
+                logger.info(f"No sessions found for user_id {user_id}.")
+            return deleted_count
+        except Exception as e:
+            logger.error(f"An error occurred while deleting sessions for user_id {user_id}: {e}")
+            return None
+
+    def delete_all_chats(self) -> Optional[int]:
+        """
+        Deletes all chat sessions of the collection (bulk `delete_many`).
+
+        Args:
+            None
+
+        Returns:
+            Optional[int]: The number of sessions deleted, or None if an error occurred during deletion.
+        """
+        try:
+            deleted_count = self._delete_many({})
+
+            if deleted_count > 0:
+                logger.info(f"Deleted {deleted_count} chat sessions.")
+            else:
+                logger.info("No chat sessions found.")
+            return deleted_count
+        except Exception as e:
+            logger.error(f"An error occurred while deleting all chat sessions: {e}")
+            return None
+
+    def drop_all_entries(self, flush_async: bool = False) -> Optional[int]:
+        """
+        Drop all entries (documents of every collection) from the database.
+
+        Args:
+            flush_async (bool): Not used by MongoDB (collections are always dropped by the server),
+                                kept for compatibility with the other history stores.
+
+        Returns:
+            Optional[int]: The number of entries deleted, or None if an error occurred during deletion.
+        """
+        try:
+            database = self.client[self.database]
+            deleted_count = 0
+
+            for collection_name in self._execute("list_collection_names", database.list_collection_names):
+                deleted_count += self._execute("count", database[collection_name].estimated_document_count)
+                self._execute("drop_collection", database.drop_collection, collection_name)
+
+            # The history collection is used right after, recreate its index
+            self._create_indexes()
+
+            if deleted_count > 0:
+                logger.info(f"Dropped {deleted_count} entries from the store.")
+            else:
+                logger.info("No entries found to drop.")
+            return deleted_count
+        except Exception as e:
+            logger.error(f"An error occurred while dropping entries from the store: {e}")
+            return None
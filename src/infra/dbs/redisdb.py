@@ -1,26 +1,914 @@
 """
 This script is used to create Redis helpers for db.
+
+Storage layout (per chat session):
+    - `{collection}/{user_id}/{session_id}`          -> HASH with the session metadata
+                                                        (session_id, user_id, topic, deleted,
+                                                        message_count, last_activity, ...).
+                                                        Every field value is JSON encoded.
+    - `{collection}/{user_id}/{session_id}/messages` -> LIST with one encoded message per element
+                                                        (versioned header + payload, see `codecs.py`).
+
+Per user index:
+    - `{collection}/{user_id}/sessions`              -> ZSET of the session ids of the user,
+                                                        scored by the timestamp of their last message.
+
+If a TTL is configured, every key expires after `ttl` seconds without activity (sliding expiration):
+the expiration is restarted by each write and each read of the session.
+
+In cluster mode, the user id of the keys is wrapped in braces (a hash tag, only it is hashed): all the keys of a user
+are in the same slot, so the operations on a user are pipelined (and scripted) on a single node.
 """
 
 import json
+import time
 import redis
+from concurrent.futures import ThreadPoolExecutor
+from redis.backoff import EqualJitterBackoff
+from redis.cache import CacheConfig
+from redis.cluster import RedisCluster
+from redis.connection import CacheProxyConnection
+from redis.retry import Retry
 from uuid import UUID
-from typing import Optional, Union, List
+from typing import Callable, Iterable, Iterator, Optional, Tuple, TypeVar, Union, List
+
+from src.logging.logger import logger, sampled_logger
+from src.infra.metrics import (
+    InstrumentedConnection,
+    MetricsSink,
+    instrument_connection_pool,
+    instrument_operations,
+    record_serialization,
+)
+from src.infra.dbs.codecs import (
+    DEFAULT_CODEC,
+    DEFAULT_COMPRESSION_THRESHOLD,
+    decode_value,
+    decode_values,
+    get_codec,
+)
+from src.chatbot.chatbot_entities import (
+    ChatbotHistory,
+    ChatbotHistoryItem,
+    ChatbotSessionPage,
+    ChatbotSessionSummary,
+    LazyChatbotHistory,
+    build_chatbot_history,
+)
+
+
+# -------------------------------
+# Constants
+# -------------------------------
+MESSAGES_KEY_SUFFIX = "/messages"
+USER_INDEX_KEY_SUFFIX = "/sessions"
+DEFAULT_SCAN_COUNT = 1000
+DEFAULT_DELETE_BATCH_SIZE = 500
+DEFAULT_PAGE_SIZE = 100
+SESSION_SUMMARY_FIELDS = ["session_id", "topic", "deleted", "message_count", "last_activity"]
+CLIENT_TRACKING_MODES = ("default", "bcast")
+ARCHIVED_FIELD = "archived"  # Set on the sessions whose messages were moved to a cold store (see `tiering.py`)
+DEFAULT_BLOCKING_MAX_CONNECTIONS = 50  # Size of a blocking pool without an explicit max number of connections
+DEFAULT_POOL_TIMEOUT = 20  # Max wait (seconds) for a free connection of a blocking pool
+DEFAULT_RETRY_BACKOFF_BASE = 0.05  # Backoff (seconds) before the first retry, doubled on each retry
+DEFAULT_RETRY_BACKOFF_CAP = 2.0  # Max backoff (seconds) between two retries
+LEGACY_SESSION_ERROR = "LEGACY_SESSION"  # Error of ADD_MESSAGE_SCRIPT on a session stored with the legacy layout
+
+T = TypeVar("T")
+
+# Atomically creates the session metadata (only when the session does not exist), appends the message
+# (dropping the oldest ones beyond the max number of messages), updates the message count and the last activity
+# of the session, and its last activity in the user index, then restarts the expiration of the keys.
+# The messages of an archived session are in the cold store: its message count is incremented instead.
+# A session stored with the legacy layout (a JSON string) is left untouched and an error is returned: it must be
+# migrated (see `RedisChatHistoryHelper.migrate_legacy_sessions`) before any message is added to it.
+# KEYS[1]: session metadata hash, KEYS[2]: messages list, KEYS[3]: user index
+# ARGV[1]: encoded message, ARGV[2]: session id, ARGV[3]: message timestamp,
+# ARGV[4]: TTL in seconds (0: no expiration), ARGV[5]: max number of messages (0: unbounded),
+# ARGV[6..n]: metadata field/value pairs used when the session is created
+# Returns: {1 if the session was created else 0, length of the messages list}
+ADD_MESSAGE_SCRIPT = """
+if redis.call('TYPE', KEYS[1]).ok == 'string' then
+    return redis.error_reply('LEGACY_SESSION The session is stored with the legacy layout')
+end
+local created = 0
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 6))
+    created = 1
+end
+local length = redis.call('RPUSH', KEYS[2], ARGV[1])
+local max_messages = tonumber(ARGV[5])
+if max_messages > 0 and length > max_messages then
+    redis.call('LTRIM', KEYS[2], -max_messages, -1)
+    length = max_messages
+end
+if redis.call('HEXISTS', KEYS[1], 'archived') == 1 then
+    redis.call('HINCRBY', KEYS[1], 'message_count', 1)
+    redis.call('HSET', KEYS[1], 'last_activity', ARGV[3])
+else
+    redis.call('HSET', KEYS[1], 'message_count', length, 'last_activity', ARGV[3])
+end
+redis.call('ZADD', KEYS[3], ARGV[3], ARGV[2])
+local ttl = tonumber(ARGV[4])
+if ttl > 0 then
+    for _, key in ipairs(KEYS) do
+        redis.call('EXPIRE', key, ttl)
+    end
+end
+return {created, length}
+"""
 
-from src.logging.logger import logger
-from src.chatbot.chatbot_entities import ChatbotHistory, ChatbotHistoryItem
+# Atomically updates a metadata field of an existing session (a missing session is not recreated, even partially)
+# and restarts the expiration of the keys.
+# KEYS[1]: session metadata hash, KEYS[2]: messages list, KEYS[3]: user index
+# ARGV[1]: field, ARGV[2]: JSON encoded value, ARGV[3]: TTL in seconds (0: no expiration)
+# Returns: 1 if the session was updated, 0 if it does not exist
+UPDATE_FIELD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+local ttl = tonumber(ARGV[3])
+if ttl > 0 then
+    for _, key in ipairs(KEYS) do
+        redis.call('EXPIRE', key, ttl)
+    end
+end
+return 1
+"""
 
 
-class RedisChatHistoryHelper:
-    def __init__(self, host, port, db, collection):
+class BroadcastCacheProxyConnection(CacheProxyConnection):
+    """
+    Client-side caching connection that enables CLIENT TRACKING in broadcasting mode (BCAST) for the given
+    key prefixes, instead of the default mode (the server remembers every key read by the connection).
+
+    In broadcasting mode the server keeps no per-key state: it pushes an invalidation for every modified key
+    matching one of the prefixes, whether or not the connection has read it.
+    """
+    def __init__(self, conn, cache, pool_lock, prefixes: List[str]):
+        self._prefixes = prefixes
+        super().__init__(conn, cache, pool_lock)
+
+    def _enable_tracking_callback(self, conn) -> None:
+        prefix_args = [item for prefix in self._prefixes for item in ("PREFIX", prefix)]
+        conn.send_command("CLIENT", "TRACKING", "ON", "BCAST", *prefix_args)
+        conn.read_response()
+        conn._parser.set_invalidation_push_handler(self._on_invalidation_callback)
+
+
+class BroadcastTrackingConnectionPool(redis.ConnectionPool):
+    """Connection pool whose client-side caching connections track the keys in broadcasting mode."""
+    def __init__(self, *args, tracking_prefixes: List[str], **kwargs):
+        self.tracking_prefixes = tracking_prefixes
+        super().__init__(*args, **kwargs)
+
+    def make_connection(self):
+        connection = super().make_connection()
+        if isinstance(connection, CacheProxyConnection):
+            connection = BroadcastCacheProxyConnection(
+                connection._conn, self.cache, self._lock, self.tracking_prefixes
+            )
+        return connection
+
+
+class BlockingBroadcastTrackingConnectionPool(BroadcastTrackingConnectionPool, redis.BlockingConnectionPool):
+    """Blocking variant of `BroadcastTrackingConnectionPool` (callers wait for a free connection)."""
+
+
+class RedisChatHistoryBase:
+    """
+    Connection-agnostic part of the Redis chat history helpers.
+
+    Holds the configuration, the key scheme and the (de)serialization of the stored sessions, so that
+    the synchronous (`RedisChatHistoryHelper`) and the asynchronous (`AsyncRedisChatHistoryHelper`) helpers
+    read and write exactly the same data. It does not perform any I/O.
+
+    The messages are written with the configured codec ("json", "orjson" or "msgpack") and read whatever
+    the codec that wrote them, legacy (headerless) JSON messages included. Large messages (e.g. assistant
+    messages with their references) can be compressed, transparently for the readers.
+
+    The working set can be bounded: with `ttl`, the sessions idle for more than `ttl` seconds expire (the expiration
+    is restarted by every write and read, in the same round trip), and with `max_messages_per_session`, only the last
+    messages of each session are kept (trimmed by the server when a message is added).
+
+    With a `metrics` sink, every operation is instrumented (latency, round trips, commands, keys, bytes and
+    serialization time, see `src/infra/metrics.py`), as well as the utilization of the connection pool.
+
+    The connection pool is bounded by `max_connections` (unbounded by default). With `pool_blocking`, a caller
+    waits up to `pool_timeout` seconds for a free connection instead of failing when the pool is exhausted, so
+    a load spike queues up in the process instead of opening a storm of connections. The sockets can time out
+    (`socket_timeout`, `socket_connect_timeout`), use TCP keepalive, and the idle connections are checked with
+    a PING after `health_check_interval` seconds. The commands failing on a connection error (e.g. during a
+    failover) are retried up to `retries` times, after an exponential backoff with jitter between
+    `retry_backoff_base` and `retry_backoff_cap` seconds. The timeouts are not retried, as a command that
+    timed out may have been executed.
+
+    With `cluster`, the helpers connect to a Redis Cluster (`host`/`port` is any node of the cluster, `db` must be 0).
+    The user id of the keys is a hash tag, so the keys of a user share a slot and the user-level operations stay
+    pipelined on a single node, while the collection-wide operations (e.g. `delete_all_chats`) scan the primary nodes
+    in parallel. As the keys are named differently, the data written in cluster mode and in single-node mode are not
+    shared. `max_connections` bounds the connections to each node, and the pools are not blocking.
+    """
+    def __init__(
+        self,
+        host,
+        port,
+        db,
+        collection,
+        scan_count: int = DEFAULT_SCAN_COUNT,
+        delete_batch_size: int = DEFAULT_DELETE_BATCH_SIZE,
+        codec: str = DEFAULT_CODEC,
+        compression: Optional[str] = None,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+        trusted_reads: bool = False,
+        ttl: Optional[int] = None,
+        max_messages_per_session: Optional[int] = None,
+        metrics: Optional[MetricsSink] = None,
+        max_connections: Optional[int] = None,
+        pool_blocking: bool = False,
+        pool_timeout: Optional[float] = DEFAULT_POOL_TIMEOUT,
+        socket_timeout: Optional[float] = None,
+        socket_connect_timeout: Optional[float] = None,
+        socket_keepalive: bool = False,
+        health_check_interval: int = 0,
+        retries: int = 0,
+        retry_backoff_base: float = DEFAULT_RETRY_BACKOFF_BASE,
+        retry_backoff_cap: float = DEFAULT_RETRY_BACKOFF_CAP,
+        cluster: bool = False,
+    ):
+        if cluster and db:
+            raise ValueError(f"Redis Cluster supports only the database 0, got: {db}")
         self.host = host
         self.port = port
         self.db = db
         self.collection = collection
-        self.history_store = redis.Redis(
-            connection_pool=redis.ConnectionPool(host=self.host, port=self.port, db=self.db)
+        self.scan_count = scan_count  # COUNT hint of every SCAN call (keys examined per page)
+        self.delete_batch_size = delete_batch_size  # Max number of sessions unlinked per round trip
+        # Serializer of the messages, compressing those of at least `compression_threshold` bytes
+        self.codec = get_codec(codec, compression=compression, compression_threshold=compression_threshold)
+        # The messages were written by the helpers (`model_dump`): build them without validating them again
+        self.trusted_reads = trusted_reads
+        self.ttl = ttl or None  # Sliding expiration of the sessions, in seconds (None: never expire)
+        self.max_messages_per_session = max_messages_per_session or None  # Oldest messages trimmed beyond it
+        self.metrics = metrics  # Destination of the instrumentation (None: not instrumented)
+        # Connection management (see the class docstring)
+        self.max_connections = max_connections or None
+        self.pool_blocking = pool_blocking
+        self.pool_timeout = pool_timeout
+        self.socket_timeout = socket_timeout or None
+        self.socket_connect_timeout = socket_connect_timeout or None
+        self.socket_keepalive = socket_keepalive
+        self.health_check_interval = health_check_interval or 0
+        self.retries = retries or 0
+        self.retry_backoff_base = retry_backoff_base
+        self.retry_backoff_cap = retry_backoff_cap
+        self.cluster = cluster  # Redis Cluster: the keys of each user are hash tagged to share a slot
+
+    # -------------------------------
+    # Keys and (de)serialization helpers
+    # -------------------------------
+    def _user_tag(self, user_id: Optional[str]) -> str:
+        """
+        Returns the user id part of the keys: in cluster mode, a hash tag (`{user_id}`), so that only the user id
+        is hashed and all the keys of the user are in the same slot.
+        """
+        return f"{{{user_id}}}" if self.cluster else f"{user_id}"
+
+    def _session_key(self, user_id: Optional[str], session_id: Union[UUID, str]) -> str:
+        """Returns the key of the session metadata hash."""
+        return f"{self.collection}/{self._user_tag(user_id)}/{session_id}"
+
+    @staticmethod
+    def _messages_key(session_key: Union[bytes, str]) -> str:
+        """Returns the key of the messages list that belongs to the given session metadata key."""
+        if isinstance(session_key, bytes):
+            session_key = session_key.decode()
+        return f"{session_key}{MESSAGES_KEY_SUFFIX}"
+
+    def _user_index_key(self, user_id: Optional[str]) -> str:
+        """Returns the key of the index holding the session ids of the user."""
+        return f"{self.collection}/{self._user_tag(user_id)}{USER_INDEX_KEY_SUFFIX}"
+
+    def _refresh_ttl(self, pipeline, user_id: Optional[str], session_id: Union[UUID, str]) -> None:
+        """
+        Queues on the pipeline the EXPIRE commands that restart the sliding expiration of the session and of the
+        user index, so that it costs no extra round trip. Does nothing if no TTL is configured.
+        """
+        if not self.ttl:
+            return
+        session_key = self._session_key(user_id, session_id)
+        pipeline.expire(session_key, self.ttl)
+        pipeline.expire(self._messages_key(session_key), self.ttl)
+        pipeline.expire(self._user_index_key(user_id), self.ttl)
+
+    def _queue_legacy_migration(self, pipeline, key: Union[bytes, str], session_data: bytes) -> None:
+        """
+        Queues on the (transactional) pipeline the commands that rewrite a session stored with the legacy layout
+        (a single JSON string holding the metadata and all the messages) with the hash + list layout.
+
+        The messages list is replaced, not appended to: a list left by a failed write to the legacy session is dropped.
+        """
+        session_metadata = json.loads(session_data)
+        messages = session_metadata.pop("messages", [])
+        last_activity = (messages[-1].get("timestamp") or 0) if messages else 0
+        session_metadata.update({"message_count": len(messages), "last_activity": last_activity})
+
+        pipeline.delete(key, self._messages_key(key))
+        pipeline.hset(key, mapping=self._encode_metadata(session_metadata))
+        if messages:
+            pipeline.rpush(self._messages_key(key), *[self.codec.encode(item) for item in messages])
+        pipeline.zadd(
+            self._user_index_key(session_metadata.get("user_id")),
+            {str(session_metadata.get("session_id")): last_activity},
+        )
+        self._refresh_ttl(pipeline, session_metadata.get("user_id"), session_metadata.get("session_id"))
+
+    @staticmethod
+    def _encode_metadata(metadata: dict) -> dict:
+        """JSON encodes every value of the session metadata, so that it can be stored as a Redis hash."""
+        return {field: json.dumps(value) for field, value in metadata.items()}
+
+    @staticmethod
+    def _decode_metadata(raw_metadata: dict) -> dict:
+        """Decodes a Redis hash (as returned by HGETALL) into the session metadata dictionary."""
+        return {
+            (field.decode() if isinstance(field, bytes) else field): json.loads(value)
+            for field, value in raw_metadata.items()
+        }
+
+    def _decode_messages(self, raw_messages: List[bytes]) -> List[dict]:
+        """Decodes a list of encoded messages (in a single call when they share the same format)."""
+        if self.metrics is None:
+            return decode_values(raw_messages, stats=self.codec.stats)
+
+        start = time.perf_counter()
+        messages = decode_values(raw_messages, stats=self.codec.stats)
+        record_serialization(self.metrics, "decode", time.perf_counter() - start)
+        return messages
+
+    def _connection_pool_kwargs(self, connection_class, retry_class) -> dict:
+        """
+        Returns the arguments of the connection pool: the size, timeouts, keepalive, health checks and retries of the
+        connections, and the instrumented connections if a metrics sink is set.
+
+        Args:
+            connection_class: The instrumented connection class (sync or asyncio).
+            retry_class: The `Retry` class (sync or asyncio).
+        """
+        kwargs = {
+            "host": self.host,
+            "port": self.port,
+            "db": self.db,
+            "socket_timeout": self.socket_timeout,
+            "socket_connect_timeout": self.socket_connect_timeout,
+            "socket_keepalive": self.socket_keepalive,
+            "health_check_interval": self.health_check_interval,
+        }
+        if self.max_connections or self.pool_blocking:
+            kwargs["max_connections"] = self.max_connections or DEFAULT_BLOCKING_MAX_CONNECTIONS
+        if self.pool_blocking:
+            kwargs["timeout"] = self.pool_timeout
+        if self.retries:
+            kwargs["retry"] = self._retry(retry_class)
+            kwargs["retry_on_error"] = [redis.ConnectionError]
+        if self.metrics is not None:
+            kwargs.update(connection_class=connection_class, metrics=self.metrics)
+        return kwargs
+
+    def _cluster_kwargs(self, retry_class) -> dict:
+        """
+        Returns the arguments of the cluster client: the startup node, and the size (per node), timeouts, keepalive
+        and retries of the connections. The connections are not instrumented (only the operations are).
+
+        Args:
+            retry_class: The `Retry` class (sync or asyncio).
+        """
+        kwargs = {
+            "host": self.host,
+            "port": self.port,
+            "socket_timeout": self.socket_timeout,
+            "socket_connect_timeout": self.socket_connect_timeout,
+            "socket_keepalive": self.socket_keepalive,
+        }
+        if self.max_connections:
+            kwargs["max_connections"] = self.max_connections
+        if self.retries:
+            kwargs["retry"] = self._retry(retry_class)
+        return kwargs
+
+    def _retry(self, retry_class):
+        """
+        Returns the retry policy of the connections: exponential backoff with jitter, on connection errors only
+        (OSError: raised by the connection attempts before being wrapped), as a command that timed out may have
+        been executed.
+        """
+        return retry_class(
+            EqualJitterBackoff(cap=self.retry_backoff_cap, base=self.retry_backoff_base),
+            self.retries,
+            supported_errors=(redis.ConnectionError, OSError),
+        )
+
+    @staticmethod
+    def _chunks(items: Iterable, size: int) -> Iterator[list]:
+        """Splits an iterable into lists of at most `size` items."""
+        chunk = []
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _parse_sessions(self, results: list) -> List[Optional[dict]]:
+        """
+        Parses the replies of the (HGETALL, LRANGE) command pairs sent for each session into session dictionaries.
+
+        Args:
+            results (list): The pipeline replies, two per session.
+
+        Returns:
+            List[Optional[dict]]: For each session, the session dictionary (metadata + 'messages'),
+                                  or None if the session does not exist.
+        """
+        sessions = []
+        for raw_metadata, raw_messages in zip(results[::2], results[1::2]):
+            if not raw_metadata:
+                sessions.append(None)
+                continue
+            session_metadata = self._decode_metadata(raw_metadata)
+            session_metadata["messages"] = self._decode_messages(raw_messages)
+            sessions.append(session_metadata)
+        return sessions
+
+    @staticmethod
+    def _split_fields(fields: List[str]) -> Tuple[List[str], bool]:
+        """
+        Returns the metadata fields to read for a field projection (with `session_id` first, used to detect
+        the missing sessions) and whether the messages are read.
+        """
+        metadata_fields = ["session_id"] + [field for field in fields if field not in ("session_id", "messages")]
+        return metadata_fields, "messages" in fields
+
+    def _parse_projected_sessions(self, results: list, fields: List[str]) -> List[Optional[dict]]:
+        """
+        Parses the replies of the (HMGET[, LRANGE]) commands sent for each session into projected session dictionaries.
+
+        Args:
+            results (list): The pipeline replies, one or two per session (see `_split_fields`).
+            fields (List[str]): The projected fields ('messages' included, if the messages are read).
+
+        Returns:
+            List[Optional[dict]]: For each session, the session dictionary holding only the projected fields,
+                                  or None if the session does not exist.
+        """
+        metadata_fields, with_messages = self._split_fields(fields)
+        step = 2 if with_messages else 1
+
+        sessions = []
+        for i in range(0, len(results), step):
+            values = results[i]
+            if values[0] is None:
+                sessions.append(None)
+                continue
+            session = {
+                field: json.loads(value)
+                for field, value in zip(metadata_fields, values)
+                if value is not None and field in fields
+            }
+            if with_messages:
+                session["messages"] = self._decode_messages(results[i + 1])
+            sessions.append(session)
+        return sessions
+
+    @staticmethod
+    def _parse_session_summary(values: list, score: float) -> ChatbotSessionSummary:
+        """
+        Builds the summary of a session from the values of its SESSION_SUMMARY_FIELDS (as returned by HMGET)
+        and its score in the user index (the last activity, for sessions written before it was stored).
+        """
+        metadata = {
+            field: json.loads(value) for field, value in zip(SESSION_SUMMARY_FIELDS, values) if value is not None
+        }
+        metadata.setdefault("last_activity", int(score))
+        return ChatbotSessionSummary(**metadata)
+
+    @staticmethod
+    def _encode_cursor(session_id: bytes, score: float) -> str:
+        """Returns the pagination cursor pointing after the given entry of the user index."""
+        return f"{score!r}:{session_id.decode()}"
+
+    @staticmethod
+    def _decode_cursor(cursor: Optional[str], desc: bool = False) -> Tuple[Union[float, str], Optional[bytes]]:
+        """
+        Returns the score to start reading the user index from (inclusive) and the session id of the entry
+        the cursor points after.
+        """
+        if not cursor:
+            return ("+inf" if desc else "-inf"), None
+        score, session_id = cursor.split(":", 1)
+        return float(score), session_id.encode()
+
+    @staticmethod
+    def _is_after_cursor(
+        entry: Tuple[bytes, float],
+        start_score: Union[float, str],
+        after: Optional[bytes],
+        desc: bool = False,
+    ) -> bool:
+        """Returns True if the user index entry comes after the cursor (index order: score, then session id)."""
+        session_id, score = entry
+        if after is None:
+            return True
+        if desc:
+            return score < start_score or (score == start_score and session_id < after)
+        return score > start_score or (score == start_score and session_id > after)
+
+    def _add_message_request(
+        self,
+        message: ChatbotHistoryItem,
+        session_id: str,
+        user_id: Optional[str],
+    ) -> Tuple[List[str], list]:
+        """
+        Builds the keys and the arguments of the ADD_MESSAGE_SCRIPT call that adds the message to the session.
+
+        Args:
+            message (ChatbotHistoryItem): The message to be added to the session.
+            session_id (str): The unique identifier for the session in Redis.
+            user_id (Optional[str]): An optional user identifier to be included in the session.
+
+        Returns:
+            Tuple[List[str], list]: The keys and the arguments of the script.
+        """
+        session_key = self._session_key(user_id, session_id)
+        start = time.perf_counter()
+        message_data = message.model_dump()
+        encoded_message = self.codec.encode(message_data)
+        if self.metrics is not None:
+            record_serialization(self.metrics, "encode", time.perf_counter() - start)
+
+        # Metadata used only if the session does not exist yet (the first message sets the topic)
+        session_metadata = self._encode_metadata({
+            "session_id": session_id,
+            "user_id": user_id,
+            "topic": message_data.get("content", ""),
+            "deleted": False,
+        })
+        metadata_args = [item for field_value in session_metadata.items() for item in field_value]
+
+        keys = [session_key, self._messages_key(session_key), self._user_index_key(user_id)]
+        args = [
+            encoded_message,
+            str(session_id),
+            message_data.get("timestamp") or 0,
+            self.ttl or 0,
+            self.max_messages_per_session or 0,
+            *metadata_args,
+        ]
+        return keys, args
+
+    def _update_field_request(
+        self,
+        key: str,
+        value,
+        user_id: Optional[str],
+        session_id: Union[UUID, str],
+    ) -> Tuple[List[str], list]:
+        """Builds the keys and the arguments of the UPDATE_FIELD_SCRIPT call that sets the field of the session."""
+        session_key = self._session_key(user_id, session_id)
+        keys = [session_key, self._messages_key(session_key), self._user_index_key(user_id)]
+        return keys, [key, json.dumps(value), self.ttl or 0]
+
+    @staticmethod
+    def _window_start(num_conversation_pairs: Optional[int]) -> int:
+        """
+        Returns the LRANGE start index that selects the last `num_conversation_pairs` conversation pairs
+        (2 messages per pair), or 0 (all messages) if it is not provided.
+        """
+        if num_conversation_pairs is not None and num_conversation_pairs > 0:
+            return -num_conversation_pairs * 2
+        return 0
+
+    def _build_history(
+        self,
+        session_id: Union[UUID, str],
+        raw_messages: List[bytes],
+        lazy: bool = False,
+    ) -> Union[ChatbotHistory, LazyChatbotHistory]:
+        """Converts the raw messages read from Redis to ChatbotHistory format (or to a lazy view of it)."""
+        return build_chatbot_history(
+            session_id=session_id,
+            items=self._decode_messages(raw_messages),
+            trusted=self.trusted_reads,
+            lazy=lazy,
         )
 
+    def compression_stats(self) -> dict:
+        """
+        Returns the compression work done so far by the helper, to tune the compression threshold.
+
+        Returns:
+            dict: The compression ratio, the number and size of the (de)compressed messages,
+                  and the CPU time spent (see `CompressionStats`).
+        """
+        return self.codec.stats.as_dict()
+
+
+class RedisChatHistoryHelper(RedisChatHistoryBase):
+    """
+    Synchronous Redis chat history helper.
+
+    Optionally keeps a near-cache of the session reads in the process memory (client-side caching, Redis >= 7.4).
+    The connections use RESP3 and CLIENT TRACKING, so the server pushes an invalidation as soon as a tracked key
+    is modified by any client (e.g. another worker appending a message), and the stale entry is dropped before
+    the next read. The near-cache is shared by all the connections of the pool. As an EXPIRE invalidates the keys
+    too, the reads served by the near-cache do not restart the expiration of the sessions (only the writes do).
+
+    The near-cache is not supported in cluster mode. In cluster mode, the transactions (MULTI/EXEC, WATCH) are run on
+    the node holding the slot of their keys, and the collection-wide operations run on the primary nodes in parallel
+    (one thread per node).
+
+    Args:
+        client_cache_max_size (Optional[int]): The max number of cached replies. None or 0 disables the near-cache.
+        client_tracking_mode (str): "default" (the server tracks the keys read by each connection) or
+                                    "bcast" (the server broadcasts the invalidations of every key of the collection).
+    """
+    def __init__(
+        self,
+        host,
+        port,
+        db,
+        collection,
+        scan_count: int = DEFAULT_SCAN_COUNT,
+        delete_batch_size: int = DEFAULT_DELETE_BATCH_SIZE,
+        codec: str = DEFAULT_CODEC,
+        compression: Optional[str] = None,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+        trusted_reads: bool = False,
+        ttl: Optional[int] = None,
+        max_messages_per_session: Optional[int] = None,
+        metrics: Optional[MetricsSink] = None,
+        max_connections: Optional[int] = None,
+        pool_blocking: bool = False,
+        pool_timeout: Optional[float] = DEFAULT_POOL_TIMEOUT,
+        socket_timeout: Optional[float] = None,
+        socket_connect_timeout: Optional[float] = None,
+        socket_keepalive: bool = False,
+        health_check_interval: int = 0,
+        retries: int = 0,
+        retry_backoff_base: float = DEFAULT_RETRY_BACKOFF_BASE,
+        retry_backoff_cap: float = DEFAULT_RETRY_BACKOFF_CAP,
+        cluster: bool = False,
+        client_cache_max_size: Optional[int] = None,
+        client_tracking_mode: str = "default",
+    ):
+        super().__init__(
+            host=host,
+            port=port,
+            db=db,
+            collection=collection,
+            scan_count=scan_count,
+            delete_batch_size=delete_batch_size,
+            codec=codec,
+            compression=compression,
+            compression_threshold=compression_threshold,
+            trusted_reads=trusted_reads,
+            ttl=ttl,
+            max_messages_per_session=max_messages_per_session,
+            metrics=metrics,
+            max_connections=max_connections,
+            pool_blocking=pool_blocking,
+            pool_timeout=pool_timeout,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_connect_timeout,
+            socket_keepalive=socket_keepalive,
+            health_check_interval=health_check_interval,
+            retries=retries,
+            retry_backoff_base=retry_backoff_base,
+            retry_backoff_cap=retry_backoff_cap,
+            cluster=cluster,
+        )
+        if client_tracking_mode not in CLIENT_TRACKING_MODES:
+            raise ValueError(
+                f"Unsupported client tracking mode: {client_tracking_mode}. Supported values: {CLIENT_TRACKING_MODES}"
+            )
+        if cluster and client_cache_max_size:
+            raise ValueError("The near-cache (client-side caching) is not supported in cluster mode.")
+        self.client_cache_enabled = bool(client_cache_max_size)
+        self.client_tracking_mode = client_tracking_mode
+
+        pool_kwargs = self._connection_pool_kwargs(InstrumentedConnection, Retry)
+        pool_class = redis.BlockingConnectionPool if self.pool_blocking else redis.ConnectionPool
+        if self.cluster:
+            # One connection pool per node, created by the cluster client
+            connection_pool = None
+        elif not self.client_cache_enabled:
+            connection_pool = pool_class(**pool_kwargs)
+        elif client_tracking_mode == "bcast":
+            bcast_pool_class = (
+                BlockingBroadcastTrackingConnectionPool if self.pool_blocking else BroadcastTrackingConnectionPool
+            )
+            connection_pool = bcast_pool_class(
+                **pool_kwargs,
+                protocol=3,
+                cache_config=CacheConfig(max_size=client_cache_max_size),
+                tracking_prefixes=[f"{self.collection}/"],
+            )
+        else:
+            connection_pool = pool_class(
+                **pool_kwargs,
+                protocol=3,
+                cache_config=CacheConfig(max_size=client_cache_max_size),
+            )
+        if self.cluster:
+            self.history_store = RedisCluster(**self._cluster_kwargs(Retry))
+        else:
+            self.history_store = redis.Redis(connection_pool=connection_pool)
+        # Registered once; executed with EVALSHA (falls back to EVAL if the script is not cached by the server)
+        self._add_message_script = self.history_store.register_script(ADD_MESSAGE_SCRIPT)
+        self._update_field_script = self.history_store.register_script(UPDATE_FIELD_SCRIPT)
+
+        if self.metrics is not None:
+            instrument_operations(self, self.metrics)
+            if connection_pool is not None:
+                instrument_connection_pool(connection_pool, self.metrics, "sync")
+
+    def _primary_nodes(self) -> list:
+        """Returns the primary nodes of the cluster, or [None] (the single node) outside cluster mode."""
+        return self.history_store.get_primaries() if self.cluster else [None]
+
+    def _fan_out(self, fn: Callable[[object], T]) -> List[T]:
+        """
+        Runs `fn(node)` on every primary node of the cluster in parallel (one thread per node), or once with None
+        outside cluster mode.
+
+        Args:
+            fn (Callable[[object], T]): The function run for each node (a `ClusterNode`, or None).
+
+        Returns:
+            List[T]: The result of each call.
+        """
+        nodes = self._primary_nodes()
+        if len(nodes) == 1:
+            return [fn(nodes[0])]
+        with ThreadPoolExecutor(max_workers=len(nodes)) as executor:
+            return list(executor.map(fn, nodes))
+
+    def _transaction(self, key: Union[bytes, str]):
+        """
+        Returns a transactional pipeline (MULTI/EXEC, WATCH) for the given key. In cluster mode, it is run on the
+        node holding the slot of the key, so every key of the transaction must be in this slot (e.g. the keys of
+        a single user).
+        """
+        if self.cluster:
+            return self.history_store.get_node_from_key(key).redis_connection.pipeline(transaction=True)
+        return self.history_store.pipeline(transaction=True)
+
+    def _scan_pages(self, pattern: str, _type: Optional[str] = None, node=None) -> Iterator[List[bytes]]:
+        """
+        Iterates over the keys matching the pattern, one SCAN page at a time.
+
+        Args:
+            pattern (str): The glob-style pattern of the keys.
+            _type (Optional[str]): If provided, only the keys of this Redis type are returned.
+            node (Optional[ClusterNode]): In cluster mode, the node to scan. If not provided, every primary node
+                                          is scanned, one after the other.
+
+        Yields:
+            List[bytes]: The (non-empty) list of keys returned by each SCAN call.
+        """
+        if self.cluster and node is None:
+            for primary in self._primary_nodes():
+                yield from self._scan_pages(pattern, _type, node=primary)
+            return
+
+        cursor = 0
+        while True:
+            if node is None:
+                cursor, keys = self.history_store.scan(cursor=cursor, match=pattern, count=self.scan_count, _type=_type)
+            else:
+                cursors, keys = self.history_store.scan(
+                    cursor=cursor, match=pattern, count=self.scan_count, _type=_type, target_nodes=node
+                )
+                cursor = cursors[node.name]
+            if keys:
+                yield keys
+            if cursor == 0:
+                break
+
+    def _unlink_sessions(self, session_keys: Iterable[Union[bytes, str]]) -> int:
+        """
+        Removes sessions (metadata and messages) with UNLINK, in pipelined batches of `delete_batch_size` sessions.
+
+        UNLINK reclaims the memory in a background thread, so large sessions do not block Redis,
+        and each batch costs a single round trip.
+
+        Args:
+            session_keys (Iterable[Union[bytes, str]]): The keys of the session metadata hashes.
+
+        Returns:
+            int: The number of sessions that existed and were removed.
+        """
+        deleted_count = 0
+        for batch in self._chunks(session_keys, self.delete_batch_size):
+            pipeline = self.history_store.pipeline(transaction=False)
+            if self.cluster:
+                # The cluster pipelines send each command to the node of its key: one UNLINK per key
+                for key in batch:
+                    pipeline.unlink(key)
+                    pipeline.unlink(self._messages_key(key))
+                deleted_count += sum(pipeline.execute()[::2])
+                continue
+            pipeline.unlink(*batch)
+            pipeline.unlink(*[self._messages_key(key) for key in batch])
+            deleted_sessions, _ = pipeline.execute()
+            deleted_count += deleted_sessions
+        return deleted_count
+
+    def _load_sessions(
+        self,
+        session_keys: List[Union[bytes, str]],
+        fields: Optional[List[str]] = None,
+    ) -> List[Optional[dict]]:
+        """
+        Loads the metadata and all the messages of multiple sessions in a single round trip.
+
+        Args:
+            session_keys (List[Union[bytes, str]]): The keys of the session metadata hashes.
+            fields (Optional[List[str]]): If provided, only these fields are read ('messages' for the messages).
+
+        Returns:
+            List[Optional[dict]]: For each key, the session dictionary (metadata + 'messages'),
+                                  or None if the session does not exist.
+        """
+        pipeline = self.history_store.pipeline(transaction=False)
+        if fields is None:
+            for session_key in session_keys:
+                pipeline.hgetall(session_key)
+                pipeline.lrange(self._messages_key(session_key), 0, -1)
+            return self._parse_sessions(pipeline.execute())
+
+        metadata_fields, with_messages = self._split_fields(fields)
+        for session_key in session_keys:
+            pipeline.hmget(session_key, metadata_fields)
+            if with_messages:
+                pipeline.lrange(self._messages_key(session_key), 0, -1)
+        return self._parse_projected_sessions(pipeline.execute(), fields)
+
+    def _index_page(
+        self,
+        index_key: str,
+        cursor: Optional[str],
+        count: int,
+        desc: bool = False,
+    ) -> Tuple[List[Tuple[bytes, float]], bool]:
+        """
+        Reads the entries of the user index that follow the cursor.
+
+        Args:
+            index_key (str): The key of the user index.
+            cursor (Optional[str]): The cursor to resume from, or None to start from the beginning.
+            count (int): The max number of entries to return.
+            desc (bool): If True, the index is read from the most recently active session.
+
+        Returns:
+            Tuple[List[Tuple[bytes, float]], bool]: The (session id, score) entries, and whether more entries follow.
+        """
+        start_score, after = self._decode_cursor(cursor, desc=desc)
+        end_score = "-inf" if desc else "+inf"
+        page = []
+        offset = 0
+        while True:
+            # The cursor score is inclusive: the entries sharing it are filtered by session id
+            entries = self.history_store.zrange(
+                index_key,
+                start_score,
+                end_score,
+                desc=desc,
+                byscore=True,
+                offset=offset,
+                num=count + 1,
+                withscores=True,
+            )
+            page.extend(entry for entry in entries if self._is_after_cursor(entry, start_score, after, desc))
+            if len(page) > count or len(entries) < count + 1:
+                return page[:count], len(page) > count
+            offset += len(entries)
+
+    def _load_session(self, session_key: Union[bytes, str]) -> Optional[dict]:
+        """
+        Loads the session metadata and all of its messages in a single round trip.
+
+        Args:
+            session_key (Union[bytes, str]): The key of the session metadata hash.
+
+        Returns:
+            Optional[dict]: The session dictionary (metadata + 'messages'), or None if the session does not exist.
+        """
+        return self._load_sessions([session_key])[0]
+
     def add(
         self,
         message: ChatbotHistoryItem,
@@ -33,6 +921,12 @@ class RedisChatHistoryHelper:
         of the first message. If the first message contains a request to "summarize the uploaded file",
         the topic is set to "File Uploaded"; otherwise, the topic is set to the message content.
 
+        The session creation, the append of the message and the update of the user index are performed
+        atomically by a server-side Lua script (EVALSHA), so concurrent writers to the same session never
+        lose each other's messages and each call costs a single round trip. The existing history is never
+        read nor rewritten. The same script trims the session to `max_messages_per_session` messages and
+        restarts its expiration.
+
         Args:
             message (ChatbotHistoryItem): The message to be added to the session. Must be
                                         serializable to a dictionary.
@@ -42,33 +936,21 @@ class RedisChatHistoryHelper:
         Returns:
             None: The function does not return a value but logs the action performed.
         """
-        key = f"{self.collection}/{user_id}/{session_id}"
-
-        # Check if the session exists in Redis
-        session_data = self.history_store.get(key)
-
-
-        if not session_data:
-            # If session does not exist, create new history with metadata
-            content = message.dict().get("content", "")
-            session_metadata = {
-                "session_id": session_id,
-                "user_id": user_id,
-                "topic": content,
-                "deleted": False,
-                "messages": [message.dict()],  # Initialize with the first message
-            }
-            # Save the new session as a serialized JSON string
-            self.history_store.set(key, json.dumps(session_metadata))
-            logger.info(f"Inserted new session for session_id: {session_id}.")
+        keys, args = self._add_message_request(message=message, session_id=session_id, user_id=user_id)
+        try:
+            created, _ = self._add_message_script(keys=keys, args=args)
+        except redis.ResponseError as e:
+            if LEGACY_SESSION_ERROR not in str(e):
+                raise
+            # Nothing was written: the legacy session is migrated, then the message is added
+            logger.warning(f"Migrating the legacy session {session_id} before adding a message to it.")
+            self._migrate_legacy_session(keys[0])
+            created, _ = self._add_message_script(keys=keys, args=args)
+
+        if created:
+            sampled_logger.info(f"Inserted new session for session_id: {session_id}.")
         else:
-            # If session exists, update the messages list
-            session_metadata = json.loads(session_data)
-            session_metadata["messages"].append(message.dict())
-            
-            # Save the updated session back to Redis
-            self.history_store.set(key, json.dumps(session_metadata))
-            logger.info(f"Updated existing session for session_id: {session_id}.")
+            sampled_logger.info(f"Updated existing session for session_id: {session_id}.")
 
 
     def get_history_by_session_id(
@@ -76,49 +958,59 @@ class RedisChatHistoryHelper:
         user_id: str,
         session_id: Union[UUID, str],
         num_conversation_pairs: Optional[int] = None,  # Allow None as default
-    ) -> Optional[ChatbotHistory]:
+        lazy: bool = False,
+    ) -> Optional[Union[ChatbotHistory, LazyChatbotHistory]]:
         """
         Retrieves the chatbot history for a specific session ID from Redis.
 
         This function fetches either all messages or a specified number of recent conversation pairs from the chatbot history.
+        Only the requested tail of the messages list is read from Redis.
 
         Args:
             session_id (Union[UUID, str]): The unique identifier of the chatbot session.
             num_conversation_pairs (Optional[int]): The number of conversation pairs to retrieve. Defaults to None (all messages).
+            lazy (bool): If True, returns a LazyChatbotHistory view that builds the messages when they are accessed.
 
         Returns:
-            Optional[ChatbotHistory]: The chatbot history for the given session ID, if available.
+            Optional[Union[ChatbotHistory, LazyChatbotHistory]]: The chatbot history for the given session ID, if available.
         """
-        key = f"{self.collection}/{user_id}/{session_id}"
-        session_data = self.history_store.get(key)
-
-        if not session_data:
-            logger.info(f"No history found for session_id: {session_id}.")
+        session_key = self._session_key(user_id, session_id)
+
+        if self.client_cache_enabled:
+            # Pipelined commands bypass the near-cache: send them one by one, so that repeated reads are served
+            # from memory. The near-cache keys replies by command and key only (not by arguments), so the whole
+            # list is always read and the window is applied locally.
+            session_exists = self.history_store.exists(session_key)
+            raw_messages = self.history_store.lrange(self._messages_key(session_key), 0, -1)
+            raw_messages = raw_messages[self._window_start(num_conversation_pairs):]
+        else:
+            # If num_conversation_pairs is provided, fetch only the last N conversation pairs (2 messages per pair).
+            # The window is applied by Redis (LRANGE with negative indices), so only the requested messages are transferred.
+            # The expiration of the session is restarted in the same round trip
+            pipeline = self.history_store.pipeline(transaction=False)
+            pipeline.exists(session_key)
+            pipeline.lrange(self._messages_key(session_key), self._window_start(num_conversation_pairs), -1)
+            self._refresh_ttl(pipeline, user_id, session_id)
+            session_exists, raw_messages = pipeline.execute()[:2]
+
+        if not session_exists:
+            sampled_logger.info(f"No history found for session_id: {session_id}.")
             return None
 
-        # Deserialize the session data
-        session_metadata = json.loads(session_data)
-
-        # Retrieve the messages
-        messages = session_metadata.get("messages", [])
-
-        # If num_conversation_pairs is provided, slice the last N conversation pairs (2 messages per pair)
-        if num_conversation_pairs is not None and num_conversation_pairs > 0:
-            num_last_entries = num_conversation_pairs * 2
-            messages = messages[-num_last_entries:]
+        # A session without messages may be stored with the legacy layout: it is migrated, then read again
+        if not raw_messages and self._migrate_legacy_session(session_key):
+            return self.get_history_by_session_id(user_id, session_id, num_conversation_pairs, lazy=lazy)
 
         # Convert messages to ChatbotHistory format
-        return ChatbotHistory(
-            session_id=session_id,
-            history=[ChatbotHistoryItem(**item) for item in messages],
-        )
+        return self._build_history(session_id, raw_messages, lazy=lazy)
 
 
     def get_history_by_user_id(self, user_id: str) -> Optional[List[dict]]:
         """
         Retrieves the full chatbot history for a specific user ID from Redis.
 
-        This function fetches all session data from all sessions for the given user.
+        This function fetches all session data from all sessions for the given user, ordered by last activity.
+        The sessions are listed from the user index, so the cost depends only on the sessions of the user.
 
         Args:
             user_id (str): The unique identifier of the user.
@@ -126,22 +1018,28 @@ class RedisChatHistoryHelper:
         Returns:
             Optional[List[dict]]: A list of session dictionaries for the given user ID, if available.
         """
-        # Scan all keys to find those belonging to this user
-        pattern = f"{self.collection}/{user_id}/*"
-        keys = self.history_store.scan_iter(match=pattern)
+        # Read the session ids of the user from the index (no keyspace scan), and fetch the sessions
+        # in chunks of `scan_count` keys, each with a single pipelined round trip
+        index_key = self._user_index_key(user_id)
+        session_ids = self.history_store.zrange(index_key, 0, -1)
 
         user_sessions = []
-
-        for key in keys:
-            session_data = self.history_store.get(key)
-            if not session_data:
-                continue
-            
-            session_metadata = json.loads(session_data)
-            if session_metadata.get("user_id") == user_id:
+        stale_session_ids = []
+
+        for start in range(0, len(session_ids), self.scan_count):
+            page = session_ids[start:start + self.scan_count]
+            keys = [self._session_key(user_id, session_id.decode()) for session_id in page]
+            for session_id, session_metadata in zip(page, self._load_sessions(keys)):
+                if not session_metadata:
+                    stale_session_ids.append(session_id)
+                    continue
                 # Add the entire session dictionary, not just the messages
                 user_sessions.append(session_metadata)
 
+        # Sessions removed without updating the index are dropped from it
+        if stale_session_ids:
+            self.history_store.zrem(index_key, *stale_session_ids)
+
         if not user_sessions:
             logger.info(f"No history found for user_id: {user_id}.")
             return None
@@ -149,6 +1047,112 @@ class RedisChatHistoryHelper:
         return user_sessions
 
 
+    def iter_history_by_user_id(
+        self,
+        user_id: str,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+    ) -> Iterator[Tuple[List[dict], Optional[str]]]:
+        """
+        Iterates over the sessions of a user, page by page, ordered by last activity, so that only one page
+        of sessions is held in memory at a time.
+
+        Each page comes with the cursor of the next page (None after the last page), which can be passed
+        back later (e.g. by an API client) to resume the iteration. A session that is active while the user
+        is paginated moves to the end of the order, and may then be returned twice (but is never skipped).
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            page_size (int): The max number of sessions per page.
+            fields (Optional[List[str]]): If provided, only these fields of the sessions are read
+                                          (e.g. ["session_id", "topic"] for the metadata only; "messages" for the messages).
+            cursor (Optional[str]): The cursor returned with a previous page, to resume after it.
+
+        Yields:
+            Tuple[List[dict], Optional[str]]: A page of session dictionaries, and the cursor of the next page.
+        """
+        index_key = self._user_index_key(user_id)
+
+        while True:
+            entries, has_more = self._index_page(index_key, cursor, page_size)
+            if not entries:
+                return
+
+            keys = [self._session_key(user_id, session_id.decode()) for session_id, _ in entries]
+            sessions = self._load_sessions(keys, fields)
+
+            # Sessions removed without updating the index are dropped from it
+            stale_session_ids = [session_id for (session_id, _), session in zip(entries, sessions) if not session]
+            if stale_session_ids:
+                self.history_store.zrem(index_key, *stale_session_ids)
+
+            cursor = self._encode_cursor(*entries[-1])
+            page = [session for session in sessions if session]
+            if page:
+                yield page, cursor if has_more else None
+            if not has_more:
+                return
+
+
+    def list_sessions(
+        self,
+        user_id: str,
+        include_deleted: bool = False,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> ChatbotSessionPage:
+        """
+        Lists the sessions of a user, most recently active first, without reading their messages.
+
+        The summaries are served from the session metadata (topic, deleted, message count and last activity,
+        kept up to date by `add` and `update_field`) and the user index, so the cost depends only on the page size
+        (plus the skipped deleted sessions).
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            include_deleted (bool): If True, the sessions flagged as deleted are listed too.
+            limit (int): The max number of sessions of the page.
+            cursor (Optional[str]): The cursor returned with a previous page, to resume after it.
+
+        Returns:
+            ChatbotSessionPage: The session summaries, and the cursor of the next page (None after the last page).
+        """
+        index_key = self._user_index_key(user_id)
+        sessions = []
+        stale_session_ids = []
+
+        while len(sessions) < limit:
+            entries, has_more = self._index_page(index_key, cursor, limit - len(sessions), desc=True)
+            if not entries:
+                cursor = None
+                break
+
+            pipeline = self.history_store.pipeline(transaction=False)
+            for session_id, _ in entries:
+                pipeline.hmget(self._session_key(user_id, session_id.decode()), SESSION_SUMMARY_FIELDS)
+            results = pipeline.execute()
+
+            for (session_id, score), values in zip(entries, results):
+                if values[0] is None:
+                    stale_session_ids.append(session_id)
+                    continue
+                summary = self._parse_session_summary(values, score)
+                if summary.deleted and not include_deleted:
+                    continue
+                sessions.append(summary)
+
+            cursor = self._encode_cursor(*entries[-1]) if has_more else None
+            if not has_more:
+                break
+
+        # Sessions removed without updating the index are dropped from it
+        if stale_session_ids:
+            self.history_store.zrem(index_key, *stale_session_ids)
+
+        return ChatbotSessionPage(sessions=sessions, next_cursor=cursor)
+
+
     def update_field(self, key: str, value: str, user_id: str, session_id: str) -> None:
         """
         Updates a specific field of an existing session identified by session_id in Redis.
@@ -163,24 +1167,13 @@ class RedisChatHistoryHelper:
         Returns:
             None: The function does not return a value, but logs a message indicating whether the session was updated.
         """
-        redis_key = f"{self.collection}/{user_id}/{session_id}"
-        
-        # Retrieve the session data
-        session_data = self.history_store.get(redis_key)
-
-        if not session_data:
+        # Update the specified field only, the messages list is left untouched. The existence check and the update
+        # are atomic (Lua script), so a session deleted or expired meanwhile is not recreated as a partial hash
+        keys, args = self._update_field_request(key, value, user_id, session_id)
+        if not self._update_field_script(keys=keys, args=args):
             logger.warning(f"No session found for session_id: {session_id}.")
             return
-
-        # Deserialize session data
-        session_metadata = json.loads(session_data)
-
-        # Update the specified field
-        session_metadata[key] = value
-
-        # Save updated session back to Redis
-        self.history_store.set(redis_key, json.dumps(session_metadata))
-        logger.info(f"Updated {key} for session_id {session_id} to '{value}'.")
+        sampled_logger.info(f"Updated {key} for session_id {session_id} to '{value}'.")
 
 
     def delete_chat_history_by_session_id(self, user_id: str, session_id: str) -> Optional[bool]:
@@ -191,15 +1184,18 @@ class RedisChatHistoryHelper:
             session_id (str): The unique identifier of the session to be deleted.
 
         Returns:
-            Optional[bool]: True if the session was deleted successfully, 
-                            False if the session was not found, 
+            Optional[bool]: True if the session was deleted successfully,
+                            False if the session was not found,
                             None if an error occurred during deletion.
         """
-        key = f"{self.collection}/{user_id}/{session_id}"
+        key = self._session_key(user_id, session_id)
 
         try:
-            # Attempt to delete the session from Redis
-            result = self.history_store.delete(key)
+            # Attempt to delete the session (metadata and messages) from Redis and from the user index
+            pipeline = self._transaction(key)
+            pipeline.delete(key, self._messages_key(key))
+            pipeline.zrem(self._user_index_key(user_id), str(session_id))
+            result, _ = pipeline.execute()
 
             if result > 0:
                 logger.info(f"Session with session_id {session_id} deleted successfully.")
@@ -223,22 +1219,25 @@ class RedisChatHistoryHelper:
         Returns:
             Optional[int]: The number of sessions deleted, or None if an error occurred during deletion.
         """
-        pattern = f"{self.collection}/{user_id}/*"  # Pattern matches all sessions for the given user_id
+        index_key = self._user_index_key(user_id)
 
         try:
-            # Scan all keys in Redis that match the user_id pattern
-            keys = self.history_store.scan_iter(match=pattern)
+            start_time = time.perf_counter()
 
-            deleted_count = 0  # Counter for the number of sessions deleted
+            # Read the session ids of the user from the index
+            session_ids = self.history_store.zrange(index_key, 0, -1)
 
-            for key in keys:
-                # Delete the key (session) for the given user_id
-                self.history_store.delete(key)
-                deleted_count += 1  # Increment the deleted session count
+            # Unlink every session (metadata and messages) in batches, then the index itself
+            deleted_count = self._unlink_sessions(
+                self._session_key(user_id, session_id.decode()) for session_id in session_ids
+            )
+            self.history_store.unlink(index_key)
+
+            elapsed = time.perf_counter() - start_time
 
             # Log and return the number of deleted sessions
             if deleted_count > 0:
-                logger.info(f"Deleted {deleted_count} sessions for user_id {user_id}.")
+                logger.info(f"Deleted {deleted_count} sessions for user_id {user_id} in {elapsed:.3f}s.")
                 return deleted_count  # Return the number of deleted sessions
             else:
                 logger.info(f"No sessions found for user_id {user_id}.")
@@ -260,22 +1259,17 @@ class RedisChatHistoryHelper:
         Returns:
             Optional[int]: The number of sessions deleted, or None if an error occurred during deletion.
         """
-        pattern = f"{self.collection}/*"  # Adjust the pattern based on your Redis key structure
-
         try:
-            # Scan all keys in Redis
-            keys = self.history_store.scan_iter(match=pattern)
-            
-            deleted_count = 0  # Counter for the number of sessions deleted
+            start_time = time.perf_counter()
 
-            for key in keys:
-                # Delete each key (session)
-                self.history_store.delete(key)
-                deleted_count += 1  # Increment the deleted session count
+            # Unlink the sessions and the user indexes (in cluster mode, on every primary node in parallel)
+            deleted_count = sum(self._fan_out(self._delete_node_chats))
+
+            elapsed = time.perf_counter() - start_time
 
             # Log and return the number of deleted sessions
             if deleted_count > 0:
-                logger.info(f"Deleted {deleted_count} chat sessions.")
+                logger.info(f"Deleted {deleted_count} chat sessions in {elapsed:.3f}s.")
                 return deleted_count  # Return the number of deleted sessions
             else:
                 logger.info("No chat sessions found.")
@@ -285,29 +1279,51 @@ class RedisChatHistoryHelper:
             # Log the exception or handle it as needed
             logger.error(f"An error occurred while deleting all chat sessions: {e}")
             return None  # Return None if an error occurred
-        
-    def drop_all_entries(self) -> Optional[int]:
+
+    def _delete_node_chats(self, node) -> int:
+        """
+        Unlinks the sessions (metadata and messages, in batches) and the user indexes of the collection stored on
+        the node (None: the single node), and returns the number of deleted sessions.
+        """
+        pattern = f"{self.collection}/*"  # Adjust the pattern based on your Redis key structure
+
+        # Scan all session metadata keys in Redis and unlink the sessions (metadata and messages) in batches
+        deleted_count = 0  # Counter for the number of sessions deleted
+        for keys in self._scan_pages(pattern, _type="hash", node=node):
+            deleted_count += self._unlink_sessions(keys)
+
+        # Unlink the user indexes (in cluster mode, the client splits the keys by slot)
+        for keys in self._scan_pages(pattern, _type="zset", node=node):
+            self.history_store.unlink(*keys)
+        return deleted_count
+
+    def drop_all_entries(self, flush_async: bool = False) -> Optional[int]:
         """
         Drop all entries from the store.
 
         Args:
-            None
+            flush_async (bool): If True, the whole database is dropped with FLUSHDB ASYNC (the memory is reclaimed
+                                in background by Redis). Otherwise the keys are scanned and unlinked in batches.
 
         Returns:
             Optional[int]: The number of entries deleted, or None if an error occurred during deletion.
         """
         try:
-            # Initialize the counter for deleted entries
-            deleted_count = 0
+            start_time = time.perf_counter()
 
-            # Iterate through all keys in the store and delete them
-            for key in self.history_store.scan_iter():
-                self.history_store.delete(key)
-                deleted_count += 1  # Increment the counter for each deleted entry
+            if flush_async:
+                # Count the entries before dropping the database (in cluster mode, on every primary node)
+                deleted_count = self.history_store.dbsize()
+                self.history_store.flushdb(asynchronous=True)
+            else:
+                # Unlink all keys in the store (in cluster mode, on every primary node in parallel)
+                deleted_count = sum(self._fan_out(self._drop_node_entries))
+
+            elapsed = time.perf_counter() - start_time
 
             # Log and return the number of entries deleted
             if deleted_count > 0:
-                logger.info(f"Dropped {deleted_count} entries from the store.")
+                logger.info(f"Dropped {deleted_count} entries from the store in {elapsed:.3f}s.")
                 return deleted_count  # Return the number of deleted entries
             else:
                 logger.info("No entries found to drop.")
@@ -316,4 +1332,179 @@ class RedisChatHistoryHelper:
         except Exception as e:
             # Log the exception and return None if an error occurs
             logger.error(f"An error occurred while dropping entries from the store: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def _drop_node_entries(self, node) -> int:
+        """Iterates through all keys of the node (None: the single node) and unlinks them, one round trip per batch."""
+        deleted_count = 0
+        for keys in self._scan_pages("*", node=node):
+            for batch in self._chunks(keys, self.delete_batch_size):
+                deleted_count += self.history_store.unlink(*batch)
+        return deleted_count
+
+    def migrate_legacy_sessions(self) -> int:
+        """
+        Migrates sessions stored with the legacy layout (a single JSON string holding the metadata and
+        all the messages) to the hash + list layout.
+
+        Args:
+            None
+
+        Returns:
+            int: The number of migrated sessions.
+
+        Raises:
+            ValueError: In cluster mode (the legacy sessions were written in single-node mode).
+        """
+        if self.cluster:
+            raise ValueError("The legacy sessions cannot be migrated in cluster mode.")
+
+        migrated_count = 0
+
+        for key in self.history_store.scan_iter(match=f"{self.collection}/*", _type="string"):
+            if self._migrate_legacy_session(key):
+                migrated_count += 1
+
+        logger.info(f"Migrated {migrated_count} legacy sessions to the hash + list layout.")
+        return migrated_count
+
+    def _migrate_legacy_session(self, key: Union[bytes, str]) -> bool:
+        """
+        Migrates a single session stored with the legacy layout to the hash + list layout (see `migrate_legacy_sessions`).
+
+        The key is watched while the session is rewritten, so that concurrent migrations of the same session
+        (e.g. by two writers adding a message to it) rewrite it only once.
+
+        Args:
+            key (Union[bytes, str]): The key of the session.
+
+        Returns:
+            bool: True if the session was migrated, False if it is not stored with the legacy layout
+                  (or was migrated concurrently).
+        """
+        # The legacy sessions were written in single-node mode only
+        if self.cluster or self.history_store.type(key) not in (b"string", "string"):
+            return False
+
+        with self.history_store.pipeline(transaction=True) as pipeline:
+            try:
+                pipeline.watch(key)
+                session_data = pipeline.get(key) if pipeline.type(key) in (b"string", "string") else None
+                if not session_data:
+                    pipeline.unwatch()
+                    return False
+                pipeline.multi()
+                self._queue_legacy_migration(pipeline, key, session_data)
+                pipeline.execute()
+            except redis.WatchError:
+                return False
+        return True
+
+    def rebuild_session_index(self) -> int:
+        """
+        Rebuilds the per user session indexes from the sessions stored in Redis.
+
+        This is a one-off maintenance operation (e.g. for sessions written before the index existed):
+        it scans the whole collection, while the regular operations keep the indexes up to date.
+        The message count and the last activity of the sessions written before they were stored in
+        the session metadata are filled in too.
+
+        Args:
+            None
+
+        Returns:
+            int: The number of indexed sessions.
+        """
+        # Drop the existing indexes, then index the sessions (in cluster mode, on every primary node in parallel)
+        self._fan_out(self._drop_node_indexes)
+        indexed_count = sum(self._fan_out(self._index_node_sessions))
+
+        logger.info(f"Rebuilt the session index with {indexed_count} sessions.")
+        return indexed_count
+
+    def _drop_node_indexes(self, node) -> None:
+        """Deletes the user indexes stored on the node (None: the single node)."""
+        for keys in self._scan_pages(f"{self.collection}/*", _type="zset", node=node):
+            self.history_store.delete(*keys)
+
+    def _index_node_sessions(self, node) -> int:
+        """Adds the sessions stored on the node (None: the single node) to the user indexes, returns their number."""
+        indexed_count = 0
+
+        for keys in self._scan_pages(f"{self.collection}/*", _type="hash", node=node):
+            # Read the owner of each session, its last message and its number of messages
+            pipeline = self.history_store.pipeline(transaction=False)
+            for key in keys:
+                pipeline.hmget(key, "user_id", "session_id")
+                pipeline.lindex(self._messages_key(key), -1)
+                pipeline.llen(self._messages_key(key))
+            results = pipeline.execute()
+
+            pipeline = self.history_store.pipeline(transaction=False)
+            for key, (raw_user_id, raw_session_id), last_message, message_count in zip(
+                keys, results[::3], results[1::3], results[2::3]
+            ):
+                if raw_session_id is None:
+                    continue
+                score = (decode_value(last_message).get("timestamp") or 0) if last_message else 0
+                pipeline.zadd(
+                    self._user_index_key(json.loads(raw_user_id) if raw_user_id else None),
+                    {str(json.loads(raw_session_id)): score},
+                )
+                # Only if missing: a message added meanwhile has already set them
+                pipeline.hsetnx(key, "message_count", json.dumps(message_count))
+                pipeline.hsetnx(key, "last_activity", json.dumps(score))
+                indexed_count += 1
+            pipeline.execute()
+        return indexed_count
+
+    def reencode_sessions(self) -> int:
+        """
+        Rewrites the messages that are not encoded with the configured codec (legacy JSON messages, or messages
+        written with another codec), e.g. after changing the codec.
+
+        Reads never need it (every format is decoded), it only makes the stored data uniform. Each messages list
+        is rewritten in a transaction that is retried if the list is modified meanwhile, so concurrent writes
+        are never lost.
+
+        Args:
+            None
+
+        Returns:
+            int: The number of rewritten sessions.
+        """
+        # In cluster mode, on every primary node in parallel
+        reencoded_count = sum(self._fan_out(self._reencode_node_sessions))
+
+        logger.info(f"Re-encoded {reencoded_count} sessions with the {self.codec.name} codec.")
+        return reencoded_count
+
+    def _reencode_node_sessions(self, node) -> int:
+        """Rewrites the messages of the sessions stored on the node (None: the single node), returns their number."""
+        reencoded_count = 0
+
+        for keys in self._scan_pages(f"{self.collection}/*", _type="hash", node=node):
+            for key in keys:
+                messages_key = self._messages_key(key)
+                with self._transaction(messages_key) as pipeline:
+                    while True:
+                        try:
+                            pipeline.watch(messages_key)
+                            raw_messages = pipeline.lrange(messages_key, 0, -1)
+                            if all(self.codec.is_encoded(raw) for raw in raw_messages):
+                                pipeline.unwatch()
+                                break
+
+                            messages = self._decode_messages(raw_messages)
+                            ttl_ms = pipeline.pttl(messages_key)
+                            pipeline.multi()
+                            pipeline.delete(messages_key)
+                            pipeline.rpush(messages_key, *[self.codec.encode(message) for message in messages])
+                            if ttl_ms > 0:
+                                pipeline.pexpire(messages_key, ttl_ms)  # Keep the remaining time to live
+                            pipeline.execute()
+                            reencoded_count += 1
+                            break
+                        except redis.WatchError:
+                            continue  # The session was modified meanwhile: read it again
+        return reencoded_count
@@ -0,0 +1,714 @@
+"""
+This script is used to create asynchronous Redis helpers for db (built on `redis.asyncio`).
+
+The helpers share the key scheme and the (de)serialization with `RedisChatHistoryHelper`
+(see `RedisChatHistoryBase`), so both can be used on the same data.
+
+In cluster mode (`redis.asyncio.cluster.RedisCluster`), the collection-wide operations scan the primary nodes
+concurrently. The cluster pipelines are not transactional: the session deletes are pipelined on the node of the user
+(its keys share a slot) without MULTI/EXEC.
+"""
+
+import asyncio
+import time
+import redis.asyncio as aioredis
+from redis.asyncio.cluster import RedisCluster
+from redis.asyncio.retry import Retry
+from uuid import UUID
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional, Tuple, TypeVar, Union, List
+
+from src.logging.logger import logger, sampled_logger
+from src.infra.metrics import AsyncInstrumentedConnection, MetricsSink, instrument_connection_pool, instrument_operations
+from src.chatbot.chatbot_entities import ChatbotHistory, ChatbotHistoryItem, ChatbotSessionPage, LazyChatbotHistory
+from src.infra.dbs.codecs import DEFAULT_CODEC, DEFAULT_COMPRESSION_THRESHOLD
+from src.infra.dbs.redisdb import (
+    ADD_MESSAGE_SCRIPT,
+    DEFAULT_DELETE_BATCH_SIZE,
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_POOL_TIMEOUT,
+    DEFAULT_RETRY_BACKOFF_BASE,
+    DEFAULT_RETRY_BACKOFF_CAP,
+    SESSION_SUMMARY_FIELDS,
+    DEFAULT_SCAN_COUNT,
+    LEGACY_SESSION_ERROR,
+    UPDATE_FIELD_SCRIPT,
+    RedisChatHistoryBase,
+)
+
+T = TypeVar("T")
+
+DEFAULT_DELETE_CONCURRENCY = 8  # Max number of delete batches in flight at once
+
+
+class AsyncRedisChatHistoryHelper(RedisChatHistoryBase):
+    def __init__(
+        self,
+        host,
+        port,
+        db,
+        collection,
+        scan_count: int = DEFAULT_SCAN_COUNT,
+        delete_batch_size: int = DEFAULT_DELETE_BATCH_SIZE,
+        codec: str = DEFAULT_CODEC,
+        compression: Optional[str] = None,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+        trusted_reads: bool = False,
+        ttl: Optional[int] = None,
+        max_messages_per_session: Optional[int] = None,
+        metrics: Optional[MetricsSink] = None,
+        max_connections: Optional[int] = None,
+        pool_blocking: bool = False,
+        pool_timeout: Optional[float] = DEFAULT_POOL_TIMEOUT,
+        socket_timeout: Optional[float] = None,
+        socket_connect_timeout: Optional[float] = None,
+        socket_keepalive: bool = False,
+        health_check_interval: int = 0,
+        retries: int = 0,
+        retry_backoff_base: float = DEFAULT_RETRY_BACKOFF_BASE,
+        retry_backoff_cap: float = DEFAULT_RETRY_BACKOFF_CAP,
+        cluster: bool = False,
+        delete_concurrency: int = DEFAULT_DELETE_CONCURRENCY,
+    ):
+        super().__init__(
+            host=host,
+            port=port,
+            db=db,
+            collection=collection,
+            scan_count=scan_count,
+            delete_batch_size=delete_batch_size,
+            codec=codec,
+            compression=compression,
+            compression_threshold=compression_threshold,
+            trusted_reads=trusted_reads,
+            ttl=ttl,
+            max_messages_per_session=max_messages_per_session,
+            metrics=metrics,
+            max_connections=max_connections,
+            pool_blocking=pool_blocking,
+            pool_timeout=pool_timeout,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_connect_timeout,
+            socket_keepalive=socket_keepalive,
+            health_check_interval=health_check_interval,
+            retries=retries,
+            retry_backoff_base=retry_backoff_base,
+            retry_backoff_cap=retry_backoff_cap,
+            cluster=cluster,
+        )
+        self.delete_concurrency = delete_concurrency  # Max number of delete batches sent concurrently
+        # Dedicated pool: asyncio connections cannot be shared with the synchronous helper
+        if self.cluster:
+            # One connection pool per node, created by the cluster client
+            connection_pool = None
+            self.history_store = RedisCluster(
+                **self._cluster_kwargs(Retry),
+                health_check_interval=self.health_check_interval,
+                retry_on_error=[aioredis.ConnectionError] if self.retries else None,
+            )
+        else:
+            pool_class = aioredis.BlockingConnectionPool if self.pool_blocking else aioredis.ConnectionPool
+            connection_pool = pool_class(**self._connection_pool_kwargs(AsyncInstrumentedConnection, Retry))
+            self.history_store = aioredis.Redis(connection_pool=connection_pool)
+        # Registered once; executed with EVALSHA (falls back to EVAL if the script is not cached by the server)
+        self._add_message_script = self.history_store.register_script(ADD_MESSAGE_SCRIPT)
+        self._update_field_script = self.history_store.register_script(UPDATE_FIELD_SCRIPT)
+
+        if self.metrics is not None:
+            instrument_operations(self, self.metrics)
+            if connection_pool is not None:
+                instrument_connection_pool(connection_pool, self.metrics, "async")
+
+    async def _primary_nodes(self) -> list:
+        """Returns the primary nodes of the cluster, or [None] (the single node) outside cluster mode."""
+        if not self.cluster:
+            return [None]
+        await self.history_store.initialize()  # Loads the cluster topology on first use
+        return self.history_store.get_primaries()
+
+    async def _fan_out(self, fn: Callable[[object], Awaitable[T]]) -> List[T]:
+        """
+        Runs `fn(node)` on every primary node of the cluster concurrently, or once with None outside cluster mode.
+
+        Args:
+            fn (Callable[[object], Awaitable[T]]): The coroutine function run for each node (a `ClusterNode`, or None).
+
+        Returns:
+            List[T]: The result of each call.
+        """
+        return list(await asyncio.gather(*[fn(node) for node in await self._primary_nodes()]))
+
+    async def _scan_pages(self, pattern: str, _type: Optional[str] = None, node=None) -> AsyncIterator[List[bytes]]:
+        """
+        Iterates over the keys matching the pattern, one SCAN page at a time.
+
+        Args:
+            pattern (str): The glob-style pattern of the keys.
+            _type (Optional[str]): If provided, only the keys of this Redis type are returned.
+            node (Optional[ClusterNode]): In cluster mode, the node to scan. If not provided, every primary node
+                                          is scanned, one after the other.
+
+        Yields:
+            List[bytes]: The (non-empty) list of keys returned by each SCAN call.
+        """
+        if self.cluster and node is None:
+            for primary in await self._primary_nodes():
+                async for keys in self._scan_pages(pattern, _type, node=primary):
+                    yield keys
+            return
+
+        cursor = 0
+        while True:
+            if node is None:
+                cursor, keys = await self.history_store.scan(
+                    cursor=cursor, match=pattern, count=self.scan_count, _type=_type
+                )
+            else:
+                cursors, keys = await self.history_store.scan(
+                    cursor=cursor, match=pattern, count=self.scan_count, _type=_type, target_nodes=node
+                )
+                cursor = cursors[node.name]
+            if keys:
+                yield keys
+            if cursor == 0:
+                break
+
+    async def _gather_bounded(self, calls: List[Awaitable[T]]) -> List[T]:
+        """Awaits the calls concurrently, at most `delete_concurrency` at a time (so a bulk delete does not hold every connection)."""
+        semaphore = asyncio.Semaphore(self.delete_concurrency)
+
+        async def _bounded(call: Awaitable[T]) -> T:
+            async with semaphore:
+                return await call
+
+        return list(await asyncio.gather(*[_bounded(call) for call in calls]))
+
+    async def _unlink_session_batch(self, batch: List[Union[bytes, str]]) -> int:
+        """Removes a batch of sessions (metadata and messages) with UNLINK in a single round trip."""
+        async with self.history_store.pipeline(transaction=False) as pipeline:
+            if self.cluster:
+                # The cluster pipelines send each command to the node of its key: one UNLINK per key
+                for key in batch:
+                    pipeline.unlink(key)
+                    pipeline.unlink(self._messages_key(key))
+                return sum((await pipeline.execute())[::2])
+            pipeline.unlink(*batch)
+            pipeline.unlink(*[self._messages_key(key) for key in batch])
+            deleted_sessions, _ = await pipeline.execute()
+        return deleted_sessions
+
+    async def _unlink_sessions(self, session_keys: Iterable[Union[bytes, str]]) -> int:
+        """
+        Removes sessions (metadata and messages) with UNLINK, sending the batches of `delete_batch_size`
+        sessions concurrently (at most `delete_concurrency` at a time).
+
+        Args:
+            session_keys (Iterable[Union[bytes, str]]): The keys of the session metadata hashes.
+
+        Returns:
+            int: The number of sessions that existed and were removed.
+        """
+        results = await self._gather_bounded(
+            [self._unlink_session_batch(batch) for batch in self._chunks(session_keys, self.delete_batch_size)]
+        )
+        return sum(results)
+
+    async def _load_sessions(
+        self,
+        session_keys: List[Union[bytes, str]],
+        fields: Optional[List[str]] = None,
+    ) -> List[Optional[dict]]:
+        """
+        Loads the metadata and all the messages of multiple sessions in a single round trip.
+
+        Args:
+            session_keys (List[Union[bytes, str]]): The keys of the session metadata hashes.
+            fields (Optional[List[str]]): If provided, only these fields are read ('messages' for the messages).
+
+        Returns:
+            List[Optional[dict]]: For each key, the session dictionary (metadata + 'messages'),
+                                  or None if the session does not exist.
+        """
+        async with self.history_store.pipeline(transaction=False) as pipeline:
+            if fields is None:
+                for session_key in session_keys:
+                    pipeline.hgetall(session_key)
+                    pipeline.lrange(self._messages_key(session_key), 0, -1)
+                return self._parse_sessions(await pipeline.execute())
+
+            metadata_fields, with_messages = self._split_fields(fields)
+            for session_key in session_keys:
+                pipeline.hmget(session_key, metadata_fields)
+                if with_messages:
+                    pipeline.lrange(self._messages_key(session_key), 0, -1)
+            return self._parse_projected_sessions(await pipeline.execute(), fields)
+
+    async def _index_page(
+        self,
+        index_key: str,
+        cursor: Optional[str],
+        count: int,
+        desc: bool = False,
+    ) -> Tuple[List[Tuple[bytes, float]], bool]:
+        """
+        Reads the entries of the user index that follow the cursor.
+
+        Args:
+            index_key (str): The key of the user index.
+            cursor (Optional[str]): The cursor to resume from, or None to start from the beginning.
+            count (int): The max number of entries to return.
+            desc (bool): If True, the index is read from the most recently active session.
+
+        Returns:
+            Tuple[List[Tuple[bytes, float]], bool]: The (session id, score) entries, and whether more entries follow.
+        """
+        start_score, after = self._decode_cursor(cursor, desc=desc)
+        end_score = "-inf" if desc else "+inf"
+        page = []
+        offset = 0
+        while True:
+            # The cursor score is inclusive: the entries sharing it are filtered by session id
+            entries = await self.history_store.zrange(
+                index_key,
+                start_score,
+                end_score,
+                desc=desc,
+                byscore=True,
+                offset=offset,
+                num=count + 1,
+                withscores=True,
+            )
+            page.extend(entry for entry in entries if self._is_after_cursor(entry, start_score, after, desc))
+            if len(page) > count or len(entries) < count + 1:
+                return page[:count], len(page) > count
+            offset += len(entries)
+
+    async def add(
+        self,
+        message: ChatbotHistoryItem,
+        session_id: str,
+        user_id: Optional[str] = None,
+    ) -> None:
+        """
+        Adds a new message to a Redis entry identified by session_id. If the entry does not
+        exist, it is created with the given session_id, user_id, and topic based on the content
+        of the first message.
+
+        The session creation, the append of the message and the update of the user index are performed
+        atomically by a server-side Lua script (EVALSHA) in a single round trip.
+
+        Args:
+            message (ChatbotHistoryItem): The message to be added to the session.
+            session_id (str): The unique identifier for the session in Redis.
+            user_id (Optional[str]): An optional user identifier to be included in the session.
+
+        Returns:
+            None: The function does not return a value but logs the action performed.
+        """
+        keys, args = self._add_message_request(message=message, session_id=session_id, user_id=user_id)
+        try:
+            created, _ = await self._add_message_script(keys=keys, args=args)
+        except aioredis.ResponseError as e:
+            if LEGACY_SESSION_ERROR not in str(e):
+                raise
+            # Nothing was written: the legacy session is migrated, then the message is added
+            logger.warning(f"Migrating the legacy session {session_id} before adding a message to it.")
+            await self._migrate_legacy_session(keys[0])
+            created, _ = await self._add_message_script(keys=keys, args=args)
+
+        if created:
+            sampled_logger.info(f"Inserted new session for session_id: {session_id}.")
+        else:
+            sampled_logger.info(f"Updated existing session for session_id: {session_id}.")
+
+    async def get_history_by_session_id(
+        self,
+        user_id: str,
+        session_id: Union[UUID, str],
+        num_conversation_pairs: Optional[int] = None,
+        lazy: bool = False,
+    ) -> Optional[Union[ChatbotHistory, LazyChatbotHistory]]:
+        """
+        Retrieves the chatbot history for a specific session ID from Redis.
+
+        Only the requested tail of the messages list is read from Redis.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            session_id (Union[UUID, str]): The unique identifier of the chatbot session.
+            num_conversation_pairs (Optional[int]): The number of conversation pairs to retrieve. Defaults to None (all messages).
+            lazy (bool): If True, returns a LazyChatbotHistory view that builds the messages when they are accessed.
+
+        Returns:
+            Optional[Union[ChatbotHistory, LazyChatbotHistory]]: The chatbot history for the given session ID, if available.
+        """
+        session_key = self._session_key(user_id, session_id)
+
+        # The expiration of the session is restarted in the same round trip
+        async with self.history_store.pipeline(transaction=False) as pipeline:
+            pipeline.exists(session_key)
+            pipeline.lrange(self._messages_key(session_key), self._window_start(num_conversation_pairs), -1)
+            self._refresh_ttl(pipeline, user_id, session_id)
+            session_exists, raw_messages = (await pipeline.execute())[:2]
+
+        if not session_exists:
+            sampled_logger.info(f"No history found for session_id: {session_id}.")
+            return None
+
+        # A session without messages may be stored with the legacy layout: it is migrated, then read again
+        if not raw_messages and await self._migrate_legacy_session(session_key):
+            return await self.get_history_by_session_id(user_id, session_id, num_conversation_pairs, lazy=lazy)
+
+        return self._build_history(session_id, raw_messages, lazy=lazy)
+
+    async def _migrate_legacy_session(self, key: Union[bytes, str]) -> bool:
+        """
+        Migrates a single session stored with the legacy layout to the hash + list layout
+        (see `RedisChatHistoryHelper._migrate_legacy_session`).
+
+        Args:
+            key (Union[bytes, str]): The key of the session.
+
+        Returns:
+            bool: True if the session was migrated, False if it is not stored with the legacy layout
+                  (or was migrated concurrently).
+        """
+        # The legacy sessions were written in single-node mode only
+        if self.cluster or await self.history_store.type(key) not in (b"string", "string"):
+            return False
+
+        async with self.history_store.pipeline(transaction=True) as pipeline:
+            try:
+                await pipeline.watch(key)
+                session_data = await pipeline.get(key) if await pipeline.type(key) in (b"string", "string") else None
+                if not session_data:
+                    await pipeline.unwatch()
+                    return False
+                pipeline.multi()
+                self._queue_legacy_migration(pipeline, key, session_data)
+                await pipeline.execute()
+            except aioredis.WatchError:
+                return False
+        return True
+
+    async def get_history_by_user_id(self, user_id: str) -> Optional[List[dict]]:
+        """
+        Retrieves the full chatbot history for a specific user ID from Redis.
+
+        The session ids are read from the user index and the chunks of `scan_count` sessions are fetched concurrently.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+
+        Returns:
+            Optional[List[dict]]: A list of session dictionaries for the given user ID, if available.
+        """
+        index_key = self._user_index_key(user_id)
+        session_ids = await self.history_store.zrange(index_key, 0, -1)
+
+        pages = list(self._chunks(session_ids, self.scan_count))
+        results = await asyncio.gather(*[
+            self._load_sessions([self._session_key(user_id, session_id.decode()) for session_id in page])
+            for page in pages
+        ])
+
+        user_sessions = []
+        stale_session_ids = []
+
+        for page, sessions in zip(pages, results):
+            for session_id, session_metadata in zip(page, sessions):
+                if not session_metadata:
+                    stale_session_ids.append(session_id)
+                    continue
+                user_sessions.append(session_metadata)
+
+        # Sessions removed without updating the index are dropped from it
+        if stale_session_ids:
+            await self.history_store.zrem(index_key, *stale_session_ids)
+
+        if not user_sessions:
+            logger.info(f"No history found for user_id: {user_id}.")
+            return None
+
+        return user_sessions
+
+    async def iter_history_by_user_id(
+        self,
+        user_id: str,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[List[dict], Optional[str]]]:
+        """
+        Iterates over the sessions of a user, page by page, ordered by last activity, so that only one page
+        of sessions is held in memory at a time.
+
+        Each page comes with the cursor of the next page (None after the last page), which can be passed
+        back later (e.g. by an API client) to resume the iteration. A session that is active while the user
+        is paginated moves to the end of the order, and may then be returned twice (but is never skipped).
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            page_size (int): The max number of sessions per page.
+            fields (Optional[List[str]]): If provided, only these fields of the sessions are read
+                                          (e.g. ["session_id", "topic"] for the metadata only; "messages" for the messages).
+            cursor (Optional[str]): The cursor returned with a previous page, to resume after it.
+
+        Yields:
+            Tuple[List[dict], Optional[str]]: A page of session dictionaries, and the cursor of the next page.
+        """
+        index_key = self._user_index_key(user_id)
+
+        while True:
+            entries, has_more = await self._index_page(index_key, cursor, page_size)
+            if not entries:
+                return
+
+            keys = [self._session_key(user_id, session_id.decode()) for session_id, _ in entries]
+            sessions = await self._load_sessions(keys, fields)
+
+            # Sessions removed without updating the index are dropped from it
+            stale_session_ids = [session_id for (session_id, _), session in zip(entries, sessions) if not session]
+            if stale_session_ids:
+                await self.history_store.zrem(index_key, *stale_session_ids)
+
+            cursor = self._encode_cursor(*entries[-1])
+            page = [session for session in sessions if session]
+            if page:
+                yield page, cursor if has_more else None
+            if not has_more:
+                return
+
+    async def list_sessions(
+        self,
+        user_id: str,
+        include_deleted: bool = False,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> ChatbotSessionPage:
+        """
+        Lists the sessions of a user, most recently active first, without reading their messages.
+
+        The summaries are served from the session metadata (topic, deleted, message count and last activity,
+        kept up to date by `add` and `update_field`) and the user index, so the cost depends only on the page size
+        (plus the skipped deleted sessions).
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            include_deleted (bool): If True, the sessions flagged as deleted are listed too.
+            limit (int): The max number of sessions of the page.
+            cursor (Optional[str]): The cursor returned with a previous page, to resume after it.
+
+        Returns:
+            ChatbotSessionPage: The session summaries, and the cursor of the next page (None after the last page).
+        """
+        index_key = self._user_index_key(user_id)
+        sessions = []
+        stale_session_ids = []
+
+        while len(sessions) < limit:
+            entries, has_more = await self._index_page(index_key, cursor, limit - len(sessions), desc=True)
+            if not entries:
+                cursor = None
+                break
+
+            async with self.history_store.pipeline(transaction=False) as pipeline:
+                for session_id, _ in entries:
+                    pipeline.hmget(self._session_key(user_id, session_id.decode()), SESSION_SUMMARY_FIELDS)
+                results = await pipeline.execute()
+
+            for (session_id, score), values in zip(entries, results):
+                if values[0] is None:
+                    stale_session_ids.append(session_id)
+                    continue
+                summary = self._parse_session_summary(values, score)
+                if summary.deleted and not include_deleted:
+                    continue
+                sessions.append(summary)
+
+            cursor = self._encode_cursor(*entries[-1]) if has_more else None
+            if not has_more:
+                break
+
+        # Sessions removed without updating the index are dropped from it
+        if stale_session_ids:
+            await self.history_store.zrem(index_key, *stale_session_ids)
+
+        return ChatbotSessionPage(sessions=sessions, next_cursor=cursor)
+
+    async def update_field(self, key: str, value: str, user_id: str, session_id: str) -> None:
+        """
+        Updates a specific field (not part of the 'messages' list) of an existing session identified by session_id.
+
+        Args:
+            key (str): The field name to be updated.
+            value (str): The new value to set for the specified field.
+            user_id (str): The unique identifier of the user.
+            session_id (str): The unique identifier for the session in Redis.
+
+        Returns:
+            None: The function does not return a value, but logs a message indicating whether the session was updated.
+        """
+        # The existence check and the update are atomic (Lua script): a session deleted meanwhile is not recreated
+        keys, args = self._update_field_request(key, value, user_id, session_id)
+        if not await self._update_field_script(keys=keys, args=args):
+            logger.warning(f"No session found for session_id: {session_id}.")
+            return
+        sampled_logger.info(f"Updated {key} for session_id {session_id} to '{value}'.")
+
+    async def delete_chat_history_by_session_id(self, user_id: str, session_id: str) -> Optional[bool]:
+        """
+        Deletes a specific session from Redis using the session ID.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            session_id (str): The unique identifier of the session to be deleted.
+
+        Returns:
+            Optional[bool]: True if the session was deleted successfully,
+                            False if the session was not found,
+                            None if an error occurred during deletion.
+        """
+        key = self._session_key(user_id, session_id)
+
+        try:
+            # The cluster pipelines are not transactional: the keys share the slot of the user, and are deleted in order
+            async with self.history_store.pipeline(transaction=not self.cluster) as pipeline:
+                pipeline.delete(key, self._messages_key(key))
+                pipeline.zrem(self._user_index_key(user_id), str(session_id))
+                result, _ = await pipeline.execute()
+
+            if result > 0:
+                logger.info(f"Session with session_id {session_id} deleted successfully.")
+                return True
+            else:
+                logger.info(f"No session found with session_id {session_id}.")
+                return False
+        except Exception as e:
+            logger.error(f"An error occurred while deleting the session: {e}")
+            return None
+
+    async def delete_chat_history_by_user_id(self, user_id: str) -> Optional[int]:
+        """
+        Deletes all sessions associated with a specific user_id in Redis.
+
+        Args:
+            user_id (str): The unique identifier of the user whose sessions are to be deleted.
+
+        Returns:
+            Optional[int]: The number of sessions deleted, or None if an error occurred during deletion.
+        """
+        index_key = self._user_index_key(user_id)
+
+        try:
+            start_time = time.perf_counter()
+
+            session_ids = await self.history_store.zrange(index_key, 0, -1)
+            deleted_count = await self._unlink_sessions(
+                self._session_key(user_id, session_id.decode()) for session_id in session_ids
+            )
+            await self.history_store.unlink(index_key)
+
+            elapsed = time.perf_counter() - start_time
+
+            if deleted_count > 0:
+                logger.info(f"Deleted {deleted_count} sessions for user_id {user_id} in {elapsed:.3f}s.")
+                return deleted_count
+            else:
+                logger.info(f"No sessions found for user_id {user_id}.")
+                return 0
+        except Exception as e:
+            logger.error(f"An error occurred while deleting sessions for user_id {user_id}: {e}")
+            return None
+
+    async def delete_all_chats(self) -> Optional[int]:
+        """
+        Deletes all chat sessions from Redis.
+
+        Args:
+            None
+
+        Returns:
+            Optional[int]: The number of sessions deleted, or None if an error occurred during deletion.
+        """
+        try:
+            start_time = time.perf_counter()
+
+            # In cluster mode, on every primary node concurrently
+            deleted_count = sum(await self._fan_out(self._delete_node_chats))
+
+            elapsed = time.perf_counter() - start_time
+
+            if deleted_count > 0:
+                logger.info(f"Deleted {deleted_count} chat sessions in {elapsed:.3f}s.")
+                return deleted_count
+            else:
+                logger.info("No chat sessions found.")
+                return 0
+        except Exception as e:
+            logger.error(f"An error occurred while deleting all chat sessions: {e}")
+            return None
+
+    async def _delete_node_chats(self, node) -> int:
+        """
+        Unlinks the sessions and the user indexes of the collection stored on the node (None: the single node),
+        and returns the number of deleted sessions.
+        """
+        pattern = f"{self.collection}/*"
+
+        deleted_count = 0
+        async for keys in self._scan_pages(pattern, _type="hash", node=node):
+            deleted_count += await self._unlink_sessions(keys)
+
+        async for keys in self._scan_pages(pattern, _type="zset", node=node):
+            await self.history_store.unlink(*keys)
+        return deleted_count
+
+    async def drop_all_entries(self, flush_async: bool = False) -> Optional[int]:
+        """
+        Drop all entries from the store.
+
+        Args:
+            flush_async (bool): If True, the whole database is dropped with FLUSHDB ASYNC.
+                                Otherwise the keys are scanned and unlinked in batches.
+
+        Returns:
+            Optional[int]: The number of entries deleted, or None if an error occurred during deletion.
+        """
+        try:
+            start_time = time.perf_counter()
+
+            if flush_async:
+                deleted_count = await self.history_store.dbsize()
+                await self.history_store.flushdb(asynchronous=True)
+            else:
+                # In cluster mode, on every primary node concurrently
+                deleted_count = sum(await self._fan_out(self._drop_node_entries))
+
+            elapsed = time.perf_counter() - start_time
+
+            if deleted_count > 0:
+                logger.info(f"Dropped {deleted_count} entries from the store in {elapsed:.3f}s.")
+                return deleted_count
+            else:
+                logger.info("No entries found to drop.")
+                return 0
+        except Exception as e:
+            logger.error(f"An error occurred while dropping entries from the store: {e}")
+            return None
+
+    async def _drop_node_entries(self, node) -> int:
+        """Unlinks all keys of the node (None: the single node), the batches of each SCAN page concurrently."""
+        deleted_count = 0
+        async for keys in self._scan_pages("*", node=node):
+            results = await self._gather_bounded(
+                [self.history_store.unlink(*batch) for batch in self._chunks(keys, self.delete_batch_size)]
+            )
+            deleted_count += sum(results)
+        return deleted_count
+
+    async def aclose(self) -> None:
+        """Closes the client and disconnects the connections of its pool (of every node, in cluster mode)."""
+        if self.cluster:
+            await self.history_store.aclose()
+        else:
+            await self.history_store.aclose(close_connection_pool=True)
@@ -0,0 +1,603 @@
+"""
+This script is used to create the hot/cold tiering of the Redis chat histories.
+
+The sessions idle for more than `idle_seconds` are demoted: their messages list (the bulk of their memory) is moved
+from Redis to a cold store, a compressed SQLite archive on local disk, and the session metadata hash stays in Redis
+flagged as archived. So the session still appears in the user index and in `list_sessions`, and new messages can be
+added to it meanwhile.
+
+Reading an archived session recalls it: the archived messages are pushed back in front of the messages list, in a
+single atomic Lua script, and removed from the cold store.
+
+Cold store layout (one row per archived session):
+    sessions(session_key TEXT PRIMARY KEY, version INTEGER, archived_at REAL, message_count INTEGER, messages BLOB)
+where `messages` is the zlib compressed concatenation of the encoded messages, each prefixed by its length.
+"""
+
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from uuid import UUID
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import redis
+
+from src.logging.logger import logger, sampled_logger
+from src.infra.dbs.redisdb import ARCHIVED_FIELD, USER_INDEX_KEY_SUFFIX, RedisChatHistoryHelper
+from src.chatbot.chatbot_entities import ChatbotHistory, LazyChatbotHistory
+
+
+# -------------------------------
+# Constants
+# -------------------------------
+DEFAULT_IDLE_SECONDS = 86400
+DEFAULT_DEMOTION_RATE = 50.0  # Sessions demoted per second
+DEFAULT_COMPRESSION_LEVEL = 6
+_LENGTH_PREFIX = struct.Struct(">I")
+
+# Atomically pushes the archived messages back in front of the messages list of an archived session,
+# clears the archived flag, trims the list, updates the message count and restarts the expiration of the keys.
+# KEYS[1]: session metadata hash, KEYS[2]: messages list
+# ARGV[1]: max number of messages (0: unbounded), ARGV[2]: TTL in seconds (0: no expiration),
+# ARGV[3..n]: the archived messages, oldest first
+# Returns: the length of the messages list, or -1 if the session is not archived (anymore)
+RECALL_SESSION_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'archived') ~= 'true' then
+    return -1
+end
+for i = #ARGV, 3, -1 do
+    redis.call('LPUSH', KEYS[2], ARGV[i])
+end
+redis.call('HDEL', KEYS[1], 'archived')
+local length = redis.call('LLEN', KEYS[2])
+local max_messages = tonumber(ARGV[1])
+if max_messages > 0 and length > max_messages then
+    redis.call('LTRIM', KEYS[2], -max_messages, -1)
+    length = max_messages
+end
+redis.call('HSET', KEYS[1], 'message_count', length)
+local ttl = tonumber(ARGV[2])
+if ttl > 0 then
+    redis.call('EXPIRE', KEYS[1], ttl)
+    redis.call('EXPIRE', KEYS[2], ttl)
+end
+return length
+"""
+
+
+class SqliteColdStore:
+    """
+    Cold store of the archived chat sessions: a single SQLite file holding the compressed messages of each session.
+
+    The messages are stored as encoded by the Redis helper (codec header included), so they are recalled without
+    being decoded. Each archive has a version, so that a recall only deletes the archive it has read.
+
+    Args:
+        path (str): The path of the SQLite file (created if missing).
+        compression_level (int): The zlib compression level of the archives.
+    """
+    def __init__(self, path: str, compression_level: int = DEFAULT_COMPRESSION_LEVEL):
+        self.path = path
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_key TEXT PRIMARY KEY, version INTEGER NOT NULL, archived_at REAL NOT NULL, "
+                "message_count INTEGER NOT NULL, messages BLOB NOT NULL)"
+            )
+
+    def _pack(self, raw_messages: List[bytes]) -> bytes:
+        """Concatenates the messages, each prefixed by its length, and compresses them."""
+        payload = b"".join(_LENGTH_PREFIX.pack(len(raw)) + raw for raw in raw_messages)
+        return zlib.compress(payload, self.compression_level)
+
+    @staticmethod
+    def _unpack(blob: bytes) -> List[bytes]:
+        """Decompresses an archive and splits it into the encoded messages."""
+        payload = zlib.decompress(blob)
+        raw_messages = []
+        offset = 0
+        while offset < len(payload):
+            (length,) = _LENGTH_PREFIX.unpack_from(payload, offset)
+            offset += _LENGTH_PREFIX.size
+            raw_messages.append(payload[offset:offset + length])
+            offset += length
+        return raw_messages
+
+    def put(self, session_key: str, raw_messages: List[bytes]) -> Tuple[int, int]:
+        """
+        Archives the messages of a session, replacing its previous archive if any.
+
+        Args:
+            session_key (str): The key of the session metadata hash in Redis.
+            raw_messages (List[bytes]): The encoded messages, oldest first.
+
+        Returns:
+            Tuple[int, int]: The version of the archive, and its size in bytes.
+        """
+        blob = self._pack(raw_messages)
+        version = time.time_ns()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?)",
+                (session_key, version, time.time(), len(raw_messages), blob),
+            )
+        return version, len(blob)
+
+    def get(self, session_key: str) -> Optional[Tuple[int, List[bytes]]]:
+        """
+        Returns the archive of a session.
+
+        Args:
+            session_key (str): The key of the session metadata hash in Redis.
+
+        Returns:
+            Optional[Tuple[int, List[bytes]]]: The version of the archive and the encoded messages (oldest first),
+                                               or None if the session is not archived.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT version, messages FROM sessions WHERE session_key = ?", (session_key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], self._unpack(row[1])
+
+    def delete(self, session_key: str, version: Optional[int] = None) -> bool:
+        """
+        Deletes the archive of a session.
+
+        Args:
+            session_key (str): The key of the session metadata hash in Redis.
+            version (Optional[int]): If provided, the archive is deleted only if it still has this version.
+
+        Returns:
+            bool: True if an archive was deleted.
+        """
+        with self._lock, self._connection:
+            if version is None:
+                cursor = self._connection.execute("DELETE FROM sessions WHERE session_key = ?", (session_key,))
+            else:
+                cursor = self._connection.execute(
+                    "DELETE FROM sessions WHERE session_key = ? AND version = ?", (session_key, version)
+                )
+        return cursor.rowcount > 0
+
+    def delete_prefix(self, prefix: str) -> int:
+        """
+        Deletes the archives of every session whose key starts with the prefix (e.g. all the sessions of a user).
+
+        Args:
+            prefix (str): The prefix of the session keys.
+
+        Returns:
+            int: The number of deleted archives.
+        """
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM sessions WHERE substr(session_key, 1, ?) = ?", (len(prefix), prefix)
+            )
+        return cursor.rowcount
+
+    def keys_archived_before(self, timestamp: float) -> List[str]:
+        """Returns the keys of the sessions archived before the given UNIX timestamp (seconds)."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT session_key FROM sessions WHERE archived_at < ?", (timestamp,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self) -> dict:
+        """
+        Returns the content of the cold store.
+
+        Returns:
+            dict: The number of archived sessions and messages, and the size of the archives in bytes.
+        """
+        with self._lock:
+            sessions, messages, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(message_count), 0), COALESCE(SUM(LENGTH(messages)), 0) FROM sessions"
+            ).fetchone()
+        return {"sessions": sessions, "messages": messages, "bytes": size}
+
+    def close(self) -> None:
+        """Closes the SQLite connection."""
+        with self._lock:
+            self._connection.close()
+
+
+class TieredRedisChatHistoryHelper(RedisChatHistoryHelper):
+    """
+    Synchronous Redis chat history helper that demotes the idle sessions to a cold store and recalls them when read.
+
+    A session is idle when its last message is older than `idle_seconds` and (when Redis reports it, i.e. with an LRU
+    eviction policy) its messages were not read for `idle_seconds` either. The demotion runs in batches paced to
+    `demotion_rate` sessions per second, on demand (`demote_idle_sessions`) or in a background thread
+    (`start_demotion`), and reports the Redis memory it freed.
+
+    Note: the recall is performed by this helper only; the asynchronous helper must not be used on the same
+    collection while the tiering is enabled.
+
+    Args:
+        cold_store (SqliteColdStore): The cold store of the archived sessions.
+        idle_seconds (float): The inactivity after which a session is demoted.
+        demotion_rate (Optional[float]): The max number of sessions demoted per second (None: unpaced).
+        **kwargs: The arguments of `RedisChatHistoryHelper`.
+    """
+    def __init__(
+        self,
+        host,
+        port,
+        db,
+        collection,
+        cold_store: SqliteColdStore,
+        idle_seconds: float = DEFAULT_IDLE_SECONDS,
+        demotion_rate: Optional[float] = DEFAULT_DEMOTION_RATE,
+        **kwargs,
+    ):
+        super().__init__(host=host, port=port, db=db, collection=collection, **kwargs)
+        # Note: with a metrics sink, the operations were instrumented by the parent constructor
+        self.cold_store = cold_store
+        self.idle_seconds = idle_seconds
+        self.demotion_rate = demotion_rate
+        self._recall_session_script = self.history_store.register_script(RECALL_SESSION_SCRIPT)
+
+        self._stats_lock = threading.Lock()
+        self.tiering_counters: Dict[str, int] = {
+            "demoted_sessions": 0,
+            "demoted_messages": 0,
+            "redis_bytes_freed": 0,
+            "cold_bytes_written": 0,
+            "recalled_sessions": 0,
+        }
+        self._demotion_thread: Optional[threading.Thread] = None
+        self._demotion_stop = threading.Event()
+
+    def _count(self, **increments: int) -> None:
+        """Adds the increments to the tiering counters."""
+        with self._stats_lock:
+            for name, value in increments.items():
+                self.tiering_counters[name] += value
+
+    # -------------------------------
+    # Demotion
+    # -------------------------------
+    def _memory_usage(self, pipeline, key: str, raw_messages: List[bytes]) -> int:
+        """
+        Returns the memory used by a key (MEMORY USAGE), or the size of the messages if the server does not report it.
+        """
+        try:
+            usage = pipeline.memory_usage(key)
+            if usage:
+                return int(usage)
+        except redis.ResponseError:
+            pass
+        return sum(len(raw) for raw in raw_messages)
+
+    def _idle_time(self, pipeline, key: str) -> Optional[int]:
+        """Returns the seconds since the key was last read or written, or None if not reported (LFU eviction policy)."""
+        try:
+            return pipeline.object("idletime", key)
+        except redis.ResponseError:
+            return None
+
+    def demote_session(self, user_id: Optional[str], session_id: Union[UUID, str]) -> int:
+        """
+        Moves the messages of a session to the cold store.
+
+        The messages list is watched while it is archived: if a message is added meanwhile, the session is read again,
+        and the archive written by the aborted attempt is deleted if the session is not demoted in the end.
+
+        Args:
+            user_id (Optional[str]): The unique identifier of the user.
+            session_id (Union[UUID, str]): The unique identifier of the session.
+
+        Returns:
+            int: The Redis memory freed, in bytes (0 if the session does not exist, is empty, already archived
+                 or was read recently).
+        """
+        session_key = self._session_key(user_id, session_id)
+        messages_key = self._messages_key(session_key)
+
+        # Version of the archive written by the last attempt, if it was aborted by a concurrent write
+        aborted_version = archive_version = None
+        with self._transaction(session_key) as pipeline:
+            while True:
+                try:
+                    pipeline.watch(session_key, messages_key)
+                    if pipeline.hexists(session_key, ARCHIVED_FIELD):
+                        # Archived meanwhile by another demotion, maybe with the archive written here: it is kept
+                        pipeline.unwatch()
+                        return 0
+                    if not pipeline.exists(session_key):
+                        pipeline.unwatch()
+                        self._discard_archive(session_key, aborted_version)
+                        return 0
+                    idle_time = self._idle_time(pipeline, messages_key)
+                    if idle_time is not None and idle_time < self.idle_seconds:
+                        pipeline.unwatch()
+                        self._discard_archive(session_key, aborted_version)
+                        return 0
+                    raw_messages = pipeline.lrange(messages_key, 0, -1)
+                    if not raw_messages:
+                        pipeline.unwatch()
+                        self._discard_archive(session_key, aborted_version)
+                        return 0
+                    freed_bytes = self._memory_usage(pipeline, messages_key, raw_messages)
+
+                    # The archive is written first: if the transaction is aborted, it is replaced on the next attempt,
+                    # or deleted if the next attempt does not demote the session
+                    archive_version, archive_size = self.cold_store.put(session_key, raw_messages)
+                    pipeline.multi()
+                    pipeline.delete(messages_key)
+                    pipeline.hset(session_key, ARCHIVED_FIELD, "true")
+                    pipeline.execute()
+                except redis.WatchError:
+                    aborted_version = archive_version
+                    continue  # The session was modified meanwhile: read it again
+
+                self._count(
+                    demoted_sessions=1,
+                    demoted_messages=len(raw_messages),
+                    redis_bytes_freed=freed_bytes,
+                    cold_bytes_written=archive_size,
+                )
+                return freed_bytes
+
+    def _discard_archive(self, session_key: str, version: Optional[int]) -> None:
+        """
+        Deletes the archive written by an aborted demotion of the session (if any), unless it was replaced since,
+        so that no archive is left without an archived session pointing to it.
+        """
+        if version is not None:
+            self.cold_store.delete(session_key, version=version)
+
+    def _purge_expired_archives(self) -> int:
+        """
+        Deletes the archives of the sessions expired from Redis (TTL). Only the archives older than the TTL are
+        checked, as the metadata of a session cannot expire before.
+        """
+        deleted_count = 0
+        session_keys = self.cold_store.keys_archived_before(time.time() - self.ttl)
+        for batch in self._chunks(session_keys, self.scan_count):
+            pipeline = self.history_store.pipeline(transaction=False)
+            for session_key in batch:
+                pipeline.exists(session_key)
+            for session_key, exists in zip(batch, pipeline.execute()):
+                if not exists:
+                    deleted_count += self.cold_store.delete(session_key)
+        return deleted_count
+
+    def _idle_candidates(self, cutoff: float) -> Iterator[Tuple[str, str]]:
+        """Yields the (user_id, session_id) of the sessions whose last message is older than the cutoff (ms timestamp)."""
+        for index_keys in self._scan_pages(f"{self.collection}/*{USER_INDEX_KEY_SUFFIX}", _type="zset"):
+            for index_key in index_keys:
+                user_id = index_key.decode()[len(self.collection) + 1:-len(USER_INDEX_KEY_SUFFIX)]
+                if self.cluster:
+                    user_id = user_id[1:-1]  # Hash tag
+                for session_id in self.history_store.zrangebyscore(index_key, "-inf", cutoff):
+                    yield user_id, session_id.decode()
+
+    def demote_idle_sessions(self, max_sessions: Optional[int] = None) -> dict:
+        """
+        Demotes the sessions idle for more than `idle_seconds` to the cold store, paced to `demotion_rate` sessions
+        per second.
+
+        The candidates are read from the user indexes (scored by the timestamp of the last message), so only the
+        sessions without a recent message are examined.
+
+        Args:
+            max_sessions (Optional[int]): The max number of sessions demoted by this run (None: all the idle sessions).
+
+        Returns:
+            dict: The number of demoted sessions, the Redis memory freed and the size of the archives written (bytes),
+                  the number of archives purged (expired sessions), and the duration of the run (seconds).
+        """
+        start_time = time.monotonic()
+        cutoff = (time.time() - self.idle_seconds) * 1000  # The index scores are millisecond timestamps
+        report = {"demoted_sessions": 0, "redis_bytes_freed": 0, "cold_bytes_written": 0, "purged_archives": 0}
+        cold_bytes_before = self.tiering_counters["cold_bytes_written"]
+        examined = 0
+
+        for user_id, session_id in self._idle_candidates(cutoff):
+            if max_sessions is not None and report["demoted_sessions"] >= max_sessions:
+                break
+            freed_bytes = self.demote_session(user_id, session_id)
+            examined += 1
+            if freed_bytes:
+                report["demoted_sessions"] += 1
+                report["redis_bytes_freed"] += freed_bytes
+
+            # Stay within the demotion rate
+            if self.demotion_rate:
+                remaining = examined / self.demotion_rate - (time.monotonic() - start_time)
+                if remaining > 0:
+                    time.sleep(remaining)
+
+        if self.ttl:
+            report["purged_archives"] = self._purge_expired_archives()
+
+        report["cold_bytes_written"] = self.tiering_counters["cold_bytes_written"] - cold_bytes_before
+        report["elapsed_seconds"] = round(time.monotonic() - start_time, 3)
+        logger.info(
+            f"Demoted {report['demoted_sessions']} idle sessions to the cold store: "
+            f"{report['redis_bytes_freed']} bytes freed in Redis, {report['cold_bytes_written']} bytes archived "
+            f"in {report['elapsed_seconds']}s."
+        )
+        return report
+
+    def start_demotion(self, interval_seconds: float) -> None:
+        """
+        Starts a background thread that demotes the idle sessions every `interval_seconds`.
+
+        Args:
+            interval_seconds (float): The delay between two demotion runs.
+        """
+        if self._demotion_thread is not None and self._demotion_thread.is_alive():
+            return
+
+        def _run() -> None:
+            while not self._demotion_stop.wait(interval_seconds):
+                try:
+                    self.demote_idle_sessions()
+                except Exception as e:
+                    logger.error(f"An error occurred while demoting the idle sessions: {e}")
+
+        self._demotion_stop.clear()
+        self._demotion_thread = threading.Thread(target=_run, name="history-demotion", daemon=True)
+        self._demotion_thread.start()
+        logger.info(f"Started the demotion of the idle sessions every {interval_seconds}s.")
+
+    def stop_demotion(self) -> None:
+        """Stops the background demotion thread (after the current run, if any)."""
+        self._demotion_stop.set()
+        if self._demotion_thread is not None:
+            self._demotion_thread.join()
+            self._demotion_thread = None
+
+    # -------------------------------
+    # Recall
+    # -------------------------------
+    def recall_session(self, user_id: Optional[str], session_id: Union[UUID, str]) -> bool:
+        """
+        Moves the archived messages of a session back to Redis, in front of the messages added since its demotion.
+
+        Args:
+            user_id (Optional[str]): The unique identifier of the user.
+            session_id (Union[UUID, str]): The unique identifier of the session.
+
+        Returns:
+            bool: True if the session was recalled, False if it was not archived.
+        """
+        session_key = self._session_key(user_id, session_id)
+        archive = self.cold_store.get(session_key)
+        if archive is None:
+            return False
+
+        version, raw_messages = archive
+        length = self._recall_session_script(
+            keys=[session_key, self._messages_key(session_key)],
+            args=[self.max_messages_per_session or 0, self.ttl or 0, *raw_messages],
+        )
+        # Recalled, or not archived anymore (recalled by another reader, or expired): the archive is not needed
+        self.cold_store.delete(session_key, version=version)
+        if length < 0:
+            return False
+
+        self._count(recalled_sessions=1)
+        logger.info(f"Recalled session {session_id} from the cold store ({len(raw_messages)} messages).")
+        return True
+
+    def _load_sessions(
+        self,
+        session_keys: List[Union[bytes, str]],
+        fields: Optional[List[str]] = None,
+    ) -> List[Optional[dict]]:
+        """
+        Loads multiple sessions (see `RedisChatHistoryHelper._load_sessions`), reading the messages of the archived
+        sessions from the cold store, without recalling them.
+        """
+        with_messages = fields is None or "messages" in fields
+        if not with_messages:
+            return super()._load_sessions(session_keys, fields)
+
+        read_fields = fields if fields is None or ARCHIVED_FIELD in fields else fields + [ARCHIVED_FIELD]
+        sessions = super()._load_sessions(session_keys, read_fields)
+        for session_key, session in zip(session_keys, sessions):
+            if session is None or not session.get(ARCHIVED_FIELD):
+                continue
+            if isinstance(session_key, bytes):
+                session_key = session_key.decode()
+            archive = self.cold_store.get(session_key)
+            if archive is not None:
+                session["messages"] = self._decode_messages(archive[1]) + session["messages"]
+            if fields is not None and ARCHIVED_FIELD not in fields:
+                del session[ARCHIVED_FIELD]
+        return sessions
+
+    def get_history_by_session_id(
+        self,
+        user_id: str,
+        session_id: Union[UUID, str],
+        num_conversation_pairs: Optional[int] = None,
+        lazy: bool = False,
+    ) -> Optional[Union[ChatbotHistory, LazyChatbotHistory]]:
+        """
+        Retrieves the chatbot history for a specific session ID (see `RedisChatHistoryHelper.get_history_by_session_id`),
+        recalling the session from the cold store if it is archived.
+
+        The archived flag is read in the same round trip as the messages, so reading a hot session costs nothing more.
+        """
+        session_key = self._session_key(user_id, session_id)
+
+        if self.client_cache_enabled:
+            # The flag is served by the near-cache too (invalidated when the session is demoted or recalled)
+            if self.history_store.hexists(session_key, ARCHIVED_FIELD):
+                self.recall_session(user_id, session_id)
+            return super().get_history_by_session_id(user_id, session_id, num_conversation_pairs, lazy=lazy)
+
+        pipeline = self.history_store.pipeline(transaction=False)
+        pipeline.hexists(session_key, ARCHIVED_FIELD)
+        pipeline.exists(session_key)
+        pipeline.lrange(self._messages_key(session_key), self._window_start(num_conversation_pairs), -1)
+        self._refresh_ttl(pipeline, user_id, session_id)
+        archived, session_exists, raw_messages = pipeline.execute()[:3]
+
+        if not session_exists:
+            sampled_logger.info(f"No history found for session_id: {session_id}.")
+            return None
+
+        if archived:
+            self.recall_session(user_id, session_id)
+            return super().get_history_by_session_id(user_id, session_id, num_conversation_pairs, lazy=lazy)
+
+        return self._build_history(session_id, raw_messages, lazy=lazy)
+
+    # -------------------------------
+    # Deletion (the archives are deleted with the sessions)
+    # -------------------------------
+    def delete_chat_history_by_session_id(self, user_id: str, session_id: str) -> Optional[bool]:
+        """Deletes a specific session (see `RedisChatHistoryHelper.delete_chat_history_by_session_id`) and its archive."""
+        result = super().delete_chat_history_by_session_id(user_id, session_id)
+        if result is not None:
+            self.cold_store.delete(self._session_key(user_id, session_id))
+        return result
+
+    def delete_chat_history_by_user_id(self, user_id: str) -> Optional[int]:
+        """Deletes all the sessions of a user (see `RedisChatHistoryHelper.delete_chat_history_by_user_id`) and their archives."""
+        deleted_count = super().delete_chat_history_by_user_id(user_id)
+        if deleted_count is not None:
+            self.cold_store.delete_prefix(self._session_key(user_id, ""))
+        return deleted_count
+
+    def delete_all_chats(self) -> Optional[int]:
+        """Deletes all chat sessions (see `RedisChatHistoryHelper.delete_all_chats`) and their archives."""
+        deleted_count = super().delete_all_chats()
+        if deleted_count is not None:
+            self.cold_store.delete_prefix(f"{self.collection}/")
+        return deleted_count
+
+    def drop_all_entries(self, flush_async: bool = False) -> Optional[int]:
+        """Drops all entries (see `RedisChatHistoryHelper.drop_all_entries`) and the archives of the collection."""
+        deleted_count = super().drop_all_entries(flush_async=flush_async)
+        if deleted_count is not None:
+            self.cold_store.delete_prefix(f"{self.collection}/")
+        return deleted_count
+
+    def tiering_stats(self) -> dict:
+        """
+        Returns the tiering work done so far by the helper, and the content of the cold store.
+
+        Returns:
+            dict: The number of demoted sessions and messages, the Redis memory freed and the size of the archives
+                  written (bytes), the number of recalled sessions, and the content of the cold store.
+        """
+        with self._stats_lock:
+            stats = dict(self.tiering_counters)
+        stats["cold_store"] = self.cold_store.stats()
+        return stats
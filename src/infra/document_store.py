@@ -1,16 +1,49 @@
 """Module containing chatbot history related methods"""
 
 from uuid import UUID
-from typing import List, Optional, Union
-
-from src.chatbot.chatbot_entities import ChatbotHistory, ChatbotHistoryItem, MessageRole
+from typing import AsyncIterator, Iterator, List, Optional, Tuple, Union
+
+from src.chatbot.chatbot_entities import (
+    ChatbotHistory,
+    ChatbotHistoryItem,
+    ChatbotSessionPage,
+    LazyChatbotHistory,
+    MessageRole,
+)
 from src.intent.intent_entities import Intent
 from src.utils.utils import generate_utc0_millisecond_timestamp
-from src.infra.initializations import init_chatbot_history_store
+from src.infra.cache import HistoryCache
+from src.infra.initializations import (
+    init_async_chatbot_history_store,
+    init_chatbot_history_store,
+    init_history_cache,
+    init_metrics_sink,
+)
 from src.config.config import CHATBOT_HISTORY_COLLECTION_NAME
 from src.logging.logger import logger
 
 
+def _build_history_item(
+    message_id: str,
+    role: MessageRole,
+    content: str,
+    question_id: Optional[str] = None,
+    intent: Optional[Intent] = None,
+    reference: dict | None = None,
+) -> ChatbotHistoryItem:
+    """Creates the ChatbotHistoryItem of a new message to be added to the chatbot history."""
+    return ChatbotHistoryItem(
+        role=role,
+        message_id=message_id,
+        question_id=question_id,
+        intent=intent,
+        content=content,
+        reference=reference,
+        timestamp=generate_utc0_millisecond_timestamp(),  # TODO: should not be generated here!
+        feedback_rating=None,  # NOTE: When we send the message, we need to populate this field with null value to then update from UI when user scores the response
+    )
+
+
 class DocumentStore:
     """
     A dynamic and extensible document store for managing data.
@@ -26,18 +59,27 @@ class DocumentStore:
       Facilitates operations such as storing, retrieving, and updating data across different use cases.
     - **Extensibility**: 
       Built with a modular design to accommodate additional features or custom behaviors as required.
+    - **Read-Through Cache**: 
+      Optionally serves repeated reads of the same session history from an in-process cache,
+      shared by the stores of the process and kept consistent with the writes performed through them.
 
     Args:
         collection (str): The name of the collection, table, or resource being managed. 
                           Defaults to `CHATBOT_HISTORY_COLLECTION_NAME`.
+        cache (Optional[HistoryCache]): The in-process history cache. Defaults to the cache of the process,
+                                        configured in `history_cache.*` (None if disabled).
 
     Attributes:
         collection (str): The collection or resource name managed by the store.
         history_store (object): The backend-specific store initialized based on the provided configuration.
+        cache (Optional[HistoryCache]): The in-process history cache, if enabled.
+        metrics (Optional[InMemoryMetricsSink]): The metrics of the history store, if enabled in `metrics.*`.
     """
-    def __init__(self, collection: str = CHATBOT_HISTORY_COLLECTION_NAME):
+    def __init__(self, collection: str = CHATBOT_HISTORY_COLLECTION_NAME, cache: Optional[HistoryCache] = None):
         self.collection = collection
         self.history_store = init_chatbot_history_store(collection=self.collection)
+        self.cache = cache if cache is not None else init_history_cache()
+        self.metrics = init_metrics_sink()
 
 
     def add_message_to_history(
@@ -65,26 +107,26 @@ class DocumentStore:
             reference (Optional[dict]): Any additional reference data for the message.
 
         """
-        message: ChatbotHistoryItem = ChatbotHistoryItem(
-            role=role,
+        message: ChatbotHistoryItem = _build_history_item(
             message_id=message_id,
-            session_id=session_id,
+            role=role,
+            content=content,
             question_id=question_id,
             intent=intent,
-            content=content,
             reference=reference,
-            timestamp=generate_utc0_millisecond_timestamp(),  # TODO: should not be generated here!
-            feedback_rating=None,  # NOTE: When we send the message, we need to populate this field with null value to then update from UI when user scores the response
         )
         self.history_store.add(message=message, session_id=session_id, user_id=user_id)
+        if self.cache is not None:
+            self.cache.invalidate_session(user_id, session_id)
 
 
     def get_chat_history(
         self,
         user_id: str,
         session_id: Union[UUID, str],
-        num_conversation_pairs: Optional[int] = None
-    ) -> Optional[ChatbotHistory]:
+        num_conversation_pairs: Optional[int] = None,
+        lazy: bool = False,
+    ) -> Optional[Union[ChatbotHistory, LazyChatbotHistory]]:
         """
         Retrieves the chatbot history for a specific session ID from the document store.
 
@@ -94,11 +136,27 @@ class DocumentStore:
             user_id (str): The unique identifier of the user.
             session_id (Union[UUID, str]): The unique identifier of the chatbot session.
             num_conversation_pairs (Optional[int]): The number of conversation pairs to retrieve. Defaults to 3.
+            lazy (bool): If True, returns a LazyChatbotHistory view that builds the messages when they are accessed.
+                         Lazy views are read from the history store, never from the in-process cache.
 
         Returns:
-            Optional[ChatbotHistory]: The chatbot history for the given session ID, if available.
+            Optional[Union[ChatbotHistory, LazyChatbotHistory]]: The chatbot history for the given session ID, if available.
         """
-        return self.history_store.get_history_by_session_id(session_id=session_id, user_id=user_id, num_conversation_pairs=num_conversation_pairs)
+        if self.cache is None or lazy:
+            return self.history_store.get_history_by_session_id(session_id=session_id, user_id=user_id, num_conversation_pairs=num_conversation_pairs, lazy=lazy)
+
+        cache_key = (user_id, str(session_id), num_conversation_pairs)
+        chat_history = self.cache.get(cache_key)
+        if chat_history is None:
+            # Captured before the read: a write invalidating the session meanwhile prevents caching a stale history
+            generation = self.cache.generation(cache_key)
+            chat_history = self.history_store.get_history_by_session_id(session_id=session_id, user_id=user_id, num_conversation_pairs=num_conversation_pairs)
+            if chat_history is None:
+                return None
+            self.cache.set(cache_key, chat_history, generation=generation)
+
+        # The cached instance is shared: callers get their own copy of the messages, which they may modify
+        return chat_history.model_copy(deep=True)
 
 
     def get_history_by_user_id(self, user_id: str) -> List[ChatbotHistoryItem]:
@@ -116,6 +174,54 @@ class DocumentStore:
         return self.history_store.get_history_by_user_id(user_id=user_id)
 
 
+    def iter_history_by_user_id(
+        self,
+        user_id: str,
+        page_size: int = 100,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+    ) -> Iterator[Tuple[List[dict], Optional[str]]]:
+        """
+        Iterates over the sessions of a user, page by page, holding only one page of sessions in memory at a time.
+
+        Each page comes with the cursor of the next page (None after the last page): passing it back resumes
+        the iteration after that page, e.g. to paginate an API.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            page_size (int): The max number of sessions per page. Defaults to 100.
+            fields (Optional[List[str]]): If provided, only these fields of the sessions are returned
+                                          (e.g. ["session_id", "topic"] for the metadata only; "messages" for the messages).
+            cursor (Optional[str]): The cursor returned with a previous page, to resume after it.
+
+        Yields:
+            Tuple[List[dict], Optional[str]]: A page of session dictionaries, and the cursor of the next page.
+        """
+        return self.history_store.iter_history_by_user_id(user_id=user_id, page_size=page_size, fields=fields, cursor=cursor)
+
+
+    def list_sessions(
+        self,
+        user_id: str,
+        include_deleted: bool = False,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> ChatbotSessionPage:
+        """
+        Lists the sessions of a user, most recently active first, without reading their messages.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            include_deleted (bool): If True, the sessions flagged as deleted are listed too. Defaults to False.
+            limit (int): The max number of sessions of the page. Defaults to 100.
+            cursor (Optional[str]): The cursor returned with a previous page, to resume after it.
+
+        Returns:
+            ChatbotSessionPage: The session summaries, and the cursor of the next page (None after the last page).
+        """
+        return self.history_store.list_sessions(user_id=user_id, include_deleted=include_deleted, limit=limit, cursor=cursor)
+
+
     def update_field(
             self,
             key: str,
@@ -135,6 +241,8 @@ class DocumentStore:
             session_id (str): The unique identifier of the chatbot session.
         """
         self.history_store.update_field(key=key, value=value, user_id=user_id, session_id=session_id)
+        if self.cache is not None:
+            self.cache.invalidate_session(user_id, session_id)
 
 
     def delete_chat_history_by_session_id(self, user_id :str, session_id: str) -> Optional[bool]:
@@ -154,7 +262,11 @@ class DocumentStore:
                             None if an error occurred during deletion.
         """       
         # Now call the original delete function on the initialized history store
-        return self.history_store.delete_chat_history_by_session_id(user_id=user_id, session_id=session_id)
+        deleted = self.history_store.delete_chat_history_by_session_id(user_id=user_id, session_id=session_id)
+        # Invalidated after the delete, so that a read racing with it cannot cache the deleted session
+        if self.cache is not None:
+            self.cache.invalidate_session(user_id, session_id)
+        return deleted
 
 
     def delete_chat_history_by_user_id(self, user_id: str) -> Optional[int]:
@@ -170,7 +282,10 @@ class DocumentStore:
         Returns:
             Optional[int]: The number of sessions deleted, or None if an error occurred during deletion.
         """        
-        return self.history_store.delete_chat_history_by_user_id(user_id)
+        deleted = self.history_store.delete_chat_history_by_user_id(user_id)
+        if self.cache is not None:
+            self.cache.invalidate_user(user_id)
+        return deleted
 
 
     def delete_all_chats(self) -> Optional[int]:
@@ -183,18 +298,243 @@ class DocumentStore:
         Returns:
             Optional[int]: The number of sessions deleted, or None if an error occurred during deletion.
         """
-        return self.history_store.delete_all_chats()
+        deleted = self.history_store.delete_all_chats()
+        if self.cache is not None:
+            self.cache.clear()
+        return deleted
 
-    def drop_all_entries(self) -> Optional[int]:
+    def drop_all_entries(self, flush_async: bool = False) -> Optional[int]:
         """
         Drops all entries from the chat history store in Redis.
 
         This function drops all entries from the chat history store in Redis.
 
         Args:
-            None
-        
+            flush_async (bool): If True, the whole database is dropped asynchronously (FLUSHDB ASYNC). Defaults to False.
+
+        Returns:
+            Optional[int]: The number of entries deleted, or None if an error occurred during deletion.
+        """
+        deleted = self.history_store.drop_all_entries(flush_async=flush_async)
+        if self.cache is not None:
+            self.cache.clear()
+        return deleted
+
+    def cache_stats(self) -> Optional[dict]:
+        """
+        Returns the hit/miss statistics of the in-process history cache.
+
+        Returns:
+            Optional[dict]: The cache statistics (see `HistoryCache.stats`), or None if the cache is disabled.
+        """
+        return self.cache.stats() if self.cache is not None else None
+
+
+class AsyncDocumentStore:
+    """
+    Asynchronous counterpart of `DocumentStore`, to be used from asyncio code (e.g. async web workers).
+
+    It exposes the same methods as `DocumentStore` as coroutines, backed by an asynchronous history store
+    with its own connection pool, so that history reads and writes never block the event loop.
+
+    Args:
+        collection (str): The name of the collection, table, or resource being managed.
+                          Defaults to `CHATBOT_HISTORY_COLLECTION_NAME`.
+
+    Attributes:
+        collection (str): The collection or resource name managed by the store.
+        history_store (object): The backend-specific asynchronous store initialized based on the provided configuration.
+    """
+    def __init__(self, collection: str = CHATBOT_HISTORY_COLLECTION_NAME):
+        self.collection = collection
+        self.history_store = init_async_chatbot_history_store(collection=self.collection)
+
+
+    async def add_message_to_history(
+        self,
+        session_id: str,
+        message_id: str,
+        role: MessageRole,
+        content: str,
+        question_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        intent: Optional[Intent] = None,
+        reference: dict | None = None,
+    ) -> None:
+        """
+        Adds a single message to the chatbot history.
+
+        Args:
+            session_id (str): The unique identifier of the chatbot session.
+            message_id (str): A unique identifier for the message.
+            role (MessageRole): The role of the sender (user or assistant).
+            content (str): The content of the message.
+            question_id (Optional[str]): The identifier of the question the message answers, if any.
+            user_id (Optional[str]): The unique identifier of the user.
+            intent (Optional[Intent]): The detected intent of the message, if any.
+            reference (Optional[dict]): Any additional reference data for the message.
+        """
+        message: ChatbotHistoryItem = _build_history_item(
+            message_id=message_id,
+            role=role,
+            content=content,
+            question_id=question_id,
+            intent=intent,
+            reference=reference,
+        )
+        await self.history_store.add(message=message, session_id=session_id, user_id=user_id)
+
+
+    async def get_chat_history(
+        self,
+        user_id: str,
+        session_id: Union[UUID, str],
+        num_conversation_pairs: Optional[int] = None,
+        lazy: bool = False,
+    ) -> Optional[Union[ChatbotHistory, LazyChatbotHistory]]:
+        """
+        Retrieves the chatbot history for a specific session ID from the document store.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            session_id (Union[UUID, str]): The unique identifier of the chatbot session.
+            num_conversation_pairs (Optional[int]): The number of conversation pairs to retrieve. Defaults to None (all messages).
+            lazy (bool): If True, returns a LazyChatbotHistory view that builds the messages when they are accessed.
+
+        Returns:
+            Optional[Union[ChatbotHistory, LazyChatbotHistory]]: The chatbot history for the given session ID, if available.
+        """
+        return await self.history_store.get_history_by_session_id(session_id=session_id, user_id=user_id, num_conversation_pairs=num_conversation_pairs, lazy=lazy)
+
+
+    async def get_history_by_user_id(self, user_id: str) -> Optional[List[dict]]:
+        """
+        Retrieves the full chatbot history for a specific user ID from the document store.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+
+        Returns:
+            Optional[List[dict]]: A list of session dictionaries for the given user ID, if available.
+        """
+        return await self.history_store.get_history_by_user_id(user_id=user_id)
+
+
+    async def iter_history_by_user_id(
+        self,
+        user_id: str,
+        page_size: int = 100,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[List[dict], Optional[str]]]:
+        """
+        Iterates over the sessions of a user, page by page, holding only one page of sessions in memory at a time.
+
+        Each page comes with the cursor of the next page (None after the last page): passing it back resumes
+        the iteration after that page, e.g. to paginate an API.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            page_size (int): The max number of sessions per page. Defaults to 100.
+            fields (Optional[List[str]]): If provided, only these fields of the sessions are returned
+                                          (e.g. ["session_id", "topic"] for the metadata only; "messages" for the messages).
+            cursor (Optional[str]): The cursor returned with a previous page, to resume after it.
+
+        Yields:
+            Tuple[List[dict], Optional[str]]: A page of session dictionaries, and the cursor of the next page.
+        """
+        async for page in self.history_store.iter_history_by_user_id(user_id=user_id, page_size=page_size, fields=fields, cursor=cursor):
+            yield page
+
+
+    async def list_sessions(
+        self,
+        user_id: str,
+        include_deleted: bool = False,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> ChatbotSessionPage:
+        """
+        Lists the sessions of a user, most recently active first, without reading their messages.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            include_deleted (bool): If True, the sessions flagged as deleted are listed too. Defaults to False.
+            limit (int): The max number of sessions of the page. Defaults to 100.
+            cursor (Optional[str]): The cursor returned with a previous page, to resume after it.
+
+        Returns:
+            ChatbotSessionPage: The session summaries, and the cursor of the next page (None after the last page).
+        """
+        return await self.history_store.list_sessions(user_id=user_id, include_deleted=include_deleted, limit=limit, cursor=cursor)
+
+
+    async def update_field(
+            self,
+            key: str,
+            value: str,
+            user_id: str,
+            session_id: str,
+        ) -> None:
+        """
+        Updates a field in the chat history for a specific session ID.
+
+        Args:
+            key (str): The field to update.
+            value (str): The new value for the field.
+            user_id (str): The unique identifier of the user.
+            session_id (str): The unique identifier of the chatbot session.
+        """
+        await self.history_store.update_field(key=key, value=value, user_id=user_id, session_id=session_id)
+
+
+    async def delete_chat_history_by_session_id(self, user_id: str, session_id: str) -> Optional[bool]:
+        """
+        Deletes a specific session using the session ID.
+
+        Args:
+            user_id (str): The unique identifier of the user.
+            session_id (str): The unique identifier of the session to be deleted.
+
+        Returns:
+            Optional[bool]: True if the session was deleted successfully,
+                            False if the session was not found,
+                            None if an error occurred during deletion.
+        """
+        return await self.history_store.delete_chat_history_by_session_id(user_id=user_id, session_id=session_id)
+
+
+    async def delete_chat_history_by_user_id(self, user_id: str) -> Optional[int]:
+        """
+        Deletes all sessions associated with a specific user_id.
+
+        Args:
+            user_id (str): The unique identifier of the user whose sessions are to be deleted.
+
+        Returns:
+            Optional[int]: The number of sessions deleted, or None if an error occurred during deletion.
+        """
+        return await self.history_store.delete_chat_history_by_user_id(user_id)
+
+
+    async def delete_all_chats(self) -> Optional[int]:
+        """
+        Deletes all chat histories within the collection.
+
+        Returns:
+            Optional[int]: The number of sessions deleted, or None if an error occurred during deletion.
+        """
+        return await self.history_store.delete_all_chats()
+
+
+    async def drop_all_entries(self, flush_async: bool = False) -> Optional[int]:
+        """
+        Drops all entries from the chat history store.
+
+        Args:
+            flush_async (bool): If True, the whole database is dropped asynchronously (FLUSHDB ASYNC). Defaults to False.
+
         Returns:
             Optional[int]: The number of entries deleted, or None if an error occurred during deletion.
         """
-        return self.history_store.drop_all_entries()
+        return await self.history_store.drop_all_entries(flush_async=flush_async)
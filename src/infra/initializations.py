@@ -1,22 +1,106 @@
+from typing import Optional, Union
+
 from src.logging.logger import logger
 from src.infra.dbs.redisdb import RedisChatHistoryHelper
+from src.infra.dbs.redisdb_async import AsyncRedisChatHistoryHelper
+from src.infra.dbs.mongodb import MongoChatHistoryHelper
+from src.infra.dbs.cosmosdb_by_mongodb import CosmosMongoChatHistoryHelper
+from src.infra.dbs.tiering import SqliteColdStore, TieredRedisChatHistoryHelper
+from src.infra.cache import HistoryCache
+from src.infra.metrics import InMemoryMetricsSink
 from src.config.config import (
     CHATBOT_HISTORY_DB_TYPE,
+    CHATBOT_HISTORY_TRUSTED_READS,
+    COSMOS_CONNECTION_STRING,
+    COSMOS_DATABASE_NAME,
+    COSMOS_DELETE_BATCH_SIZE,
+    COSMOS_MAX_RETRIES,
+    COSMOS_MAX_RETRY_WAIT_MS,
+    COSMOS_RU_BUDGET_PER_SECOND,
+    COSMOS_TRACK_REQUEST_CHARGE,
+    HISTORY_CACHE_ENABLED,
+    HISTORY_CACHE_MAX_BYTES,
+    HISTORY_CACHE_MAX_ENTRIES,
+    HISTORY_CACHE_TTL_SECONDS,
+    METRICS_ENABLED,
+    MONGODB_CONNECTION_STRING,
+    MONGODB_DATABASE_NAME,
+    REDIS_CLIENT_CACHE_ENABLED,
+    REDIS_CLIENT_CACHE_MAX_SIZE,
+    REDIS_CLIENT_TRACKING_MODE,
+    REDIS_CLUSTER_ENABLED,
+    REDIS_CODEC,
+    REDIS_COMPRESSION,
+    REDIS_COMPRESSION_THRESHOLD,
     REDIS_DB,
     REDIS_HOST,
-    REDIS_PORT
+    REDIS_HEALTH_CHECK_INTERVAL,
+    REDIS_MAX_CONNECTIONS,
+    REDIS_MAX_MESSAGES_PER_SESSION,
+    REDIS_POOL_BLOCKING,
+    REDIS_POOL_TIMEOUT,
+    REDIS_PORT,
+    REDIS_RETRIES,
+    REDIS_RETRY_BACKOFF_BASE,
+    REDIS_RETRY_BACKOFF_CAP,
+    REDIS_SCAN_COUNT,
+    REDIS_SOCKET_CONNECT_TIMEOUT,
+    REDIS_SOCKET_KEEPALIVE,
+    REDIS_SOCKET_TIMEOUT,
+    REDIS_DELETE_BATCH_SIZE,
+    REDIS_TTL,
+    TIERING_COLD_STORE_PATH,
+    TIERING_DEMOTION_INTERVAL_SECONDS,
+    TIERING_DEMOTION_RATE,
+    TIERING_ENABLED,
+    TIERING_IDLE_SECONDS,
 )
 
 # ----------------------------------------
 # Constants
 # ----------------------------------------
 _HISTORY_STORE = None
+_ASYNC_HISTORY_STORE = None
+_METRICS_SINK = None
+_HISTORY_CACHE = None
 
 
 # ----------------------------------------
 # Chatbot Initialization Functions
 # ----------------------------------------
-def _init_history_store(collection: str) -> RedisChatHistoryHelper:
+def init_metrics_sink() -> Optional[InMemoryMetricsSink]:
+    """
+    Initializes (once) and returns the metrics sink shared by the history stores, if enabled in the configuration.
+
+    Returns:
+        Optional[InMemoryMetricsSink]: The metrics sink, or None if the metrics are disabled.
+    """
+    global _METRICS_SINK
+
+    if METRICS_ENABLED and _METRICS_SINK is None:
+        logger.info("Initializing history store metrics...")
+        _METRICS_SINK = InMemoryMetricsSink()
+    return _METRICS_SINK
+
+
+def _redis_connection_kwargs() -> dict:
+    """Returns the connection settings (cluster mode, pools, retries) of the (sync and async) Redis history stores."""
+    return dict(
+        cluster=REDIS_CLUSTER_ENABLED,
+        max_connections=REDIS_MAX_CONNECTIONS or None,
+        pool_blocking=REDIS_POOL_BLOCKING,
+        pool_timeout=REDIS_POOL_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT or None,
+        socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT or None,
+        socket_keepalive=REDIS_SOCKET_KEEPALIVE,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL or 0,
+        retries=REDIS_RETRIES or 0,
+        retry_backoff_base=REDIS_RETRY_BACKOFF_BASE,
+        retry_backoff_cap=REDIS_RETRY_BACKOFF_CAP,
+    )
+
+
+def _init_history_store(collection: str) -> Union[RedisChatHistoryHelper, MongoChatHistoryHelper]:
     """
     Initializes and returns the chatbot history store based on the runtime environment.
 
@@ -31,7 +115,7 @@ def _init_history_store(collection: str) -> RedisChatHistoryHelper:
         session_id (str): The session identifier to be used as the collection name in the database.
 
     Returns:
-        RedisChatHistoryHelper: The initialized history store instance.
+        Union[RedisChatHistoryHelper, MongoChatHistoryHelper]: The initialized history store instance.
 
     Raises:
         ValueError: If the runtime environment is neither 'cloud' nor 'local'.
@@ -39,22 +123,67 @@ def _init_history_store(collection: str) -> RedisChatHistoryHelper:
 
     if CHATBOT_HISTORY_DB_TYPE == "redis":
         logger.info("Initializing Redis history store...")
-        history_store = RedisChatHistoryHelper(
+        redis_kwargs = dict(
             host=REDIS_HOST,
             port=REDIS_PORT,
             db=REDIS_DB,
             collection=collection,
+            scan_count=REDIS_SCAN_COUNT,
+            delete_batch_size=REDIS_DELETE_BATCH_SIZE,
+            codec=REDIS_CODEC,
+            compression=None if REDIS_COMPRESSION == "none" else REDIS_COMPRESSION,
+            compression_threshold=REDIS_COMPRESSION_THRESHOLD,
+            trusted_reads=CHATBOT_HISTORY_TRUSTED_READS,
+            ttl=REDIS_TTL or None,
+            max_messages_per_session=REDIS_MAX_MESSAGES_PER_SESSION or None,
+            client_cache_max_size=REDIS_CLIENT_CACHE_MAX_SIZE if REDIS_CLIENT_CACHE_ENABLED else None,
+            client_tracking_mode=REDIS_CLIENT_TRACKING_MODE,
+            metrics=init_metrics_sink(),
+            **_redis_connection_kwargs(),
         )
+        if TIERING_ENABLED:
+            # An idle session is demoted by the first demotion run after TIERING_IDLE_SECONDS
+            if REDIS_TTL and TIERING_IDLE_SECONDS + TIERING_DEMOTION_INTERVAL_SECONDS >= REDIS_TTL:
+                logger.warning(
+                    f"TIERING_IDLE_SECONDS ({TIERING_IDLE_SECONDS}) + TIERING_DEMOTION_INTERVAL_SECONDS "
+                    f"({TIERING_DEMOTION_INTERVAL_SECONDS}) is not below REDIS_TTL ({REDIS_TTL}): "
+                    "the idle sessions may expire before they are demoted to the cold store."
+                )
+            history_store = TieredRedisChatHistoryHelper(
+                cold_store=SqliteColdStore(TIERING_COLD_STORE_PATH),
+                idle_seconds=TIERING_IDLE_SECONDS,
+                demotion_rate=TIERING_DEMOTION_RATE,
+                **redis_kwargs,
+            )
+            history_store.start_demotion(TIERING_DEMOTION_INTERVAL_SECONDS)
+        else:
+            history_store = RedisChatHistoryHelper(**redis_kwargs)
         logger.info("Initialized Redis history store.")
-    # TODO: currently, it is not supported
-    # elif CHATBOT_HISTORY_DB_TYPE == "cosmos":
-    #     logger.info("Initializing Azure Cosmos history store...")
-    #     history_store = AzureCosmosLangchainHelper(
-    #         connection_string=DOCUMENT_STORE_CONNECTION_STRING,
-    #         database=CHATBOT_HISTORY_DATABASE_NAME,
-    #         collection=collection,
-    #     )
-    #     logger.info("Initialized Azure Cosmos history store.")
+    elif CHATBOT_HISTORY_DB_TYPE == "mongodb":
+        logger.info("Initializing MongoDB history store...")
+        history_store = MongoChatHistoryHelper(
+            connection_string=MONGODB_CONNECTION_STRING,
+            database=MONGODB_DATABASE_NAME,
+            collection=collection,
+            trusted_reads=CHATBOT_HISTORY_TRUSTED_READS,
+            metrics=init_metrics_sink(),
+        )
+        logger.info("Initialized MongoDB history store.")
+    elif CHATBOT_HISTORY_DB_TYPE == "cosmos":
+        logger.info("Initializing Azure Cosmos history store...")
+        history_store = CosmosMongoChatHistoryHelper(
+            connection_string=COSMOS_CONNECTION_STRING,
+            database=COSMOS_DATABASE_NAME,
+            collection=collection,
+            max_retries=COSMOS_MAX_RETRIES,
+            max_retry_wait_ms=COSMOS_MAX_RETRY_WAIT_MS,
+            ru_budget_per_second=COSMOS_RU_BUDGET_PER_SECOND,
+            delete_batch_size=COSMOS_DELETE_BATCH_SIZE,
+            track_request_charge=COSMOS_TRACK_REQUEST_CHARGE,
+            trusted_reads=CHATBOT_HISTORY_TRUSTED_READS,
+            metrics=init_metrics_sink(),
+        )
+        logger.info("Initialized Azure Cosmos history store.")
     else:
         raise ValueError(
             f"Unsupported CHATBOT_HISTORY_DB_TYPE environment value. CHATBOT_HISTORY_DB_TYPE value: {CHATBOT_HISTORY_DB_TYPE}"
@@ -109,7 +238,7 @@ def _init_history_store(collection: str) -> RedisChatHistoryHelper:
 #         return _HISTORY_STORE  # Return the existing history store if no conditions are met
 
 
-def init_chatbot_history_store(collection: str) -> RedisChatHistoryHelper:
+def init_chatbot_history_store(collection: str) -> Union[RedisChatHistoryHelper, MongoChatHistoryHelper]:
     """
     Initializes or updates and returns the chatbot history store based on the runtime environment.
 
@@ -127,7 +256,7 @@ def init_chatbot_history_store(collection: str) -> RedisChatHistoryHelper:
         session_id (str): The session identifier used as the collection name in the database.
 
     Returns:
-        RedisChatHistoryHelper: The initialized or updated/existing history store instance.
+        Union[RedisChatHistoryHelper, MongoChatHistoryHelper]: The initialized or updated/existing history store instance.
     """
     global _HISTORY_STORE
 
@@ -136,4 +265,94 @@ def init_chatbot_history_store(collection: str) -> RedisChatHistoryHelper:
     # NOTE: with current configuration, we do not change the collection name
     # else:
     #     _HISTORY_STORE = _update_history_store(collection)
-    return _HISTORY_STORE
\ No newline at end of file
+    return _HISTORY_STORE
+
+
+def _init_async_history_store(collection: str) -> AsyncRedisChatHistoryHelper:
+    """
+    Initializes and returns the asynchronous chatbot history store based on the configured DB type.
+
+    Args:
+        collection (str): The name of the collection holding the chat histories.
+
+    Returns:
+        AsyncRedisChatHistoryHelper: The initialized asynchronous history store instance.
+
+    Raises:
+        ValueError: If the configured DB type does not have an asynchronous history store, or if the tiering
+                    is enabled (the asynchronous store does not recall the sessions demoted to the cold store,
+                    it would return them without their messages).
+    """
+    if CHATBOT_HISTORY_DB_TYPE == "redis":
+        if TIERING_ENABLED:
+            raise ValueError(
+                "The async Redis history store does not recall the sessions demoted to the cold store: "
+                "it cannot be used with TIERING_ENABLED=true."
+            )
+        logger.info("Initializing async Redis history store...")
+        history_store = AsyncRedisChatHistoryHelper(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=REDIS_DB,
+            collection=collection,
+            scan_count=REDIS_SCAN_COUNT,
+            delete_batch_size=REDIS_DELETE_BATCH_SIZE,
+            codec=REDIS_CODEC,
+            compression=None if REDIS_COMPRESSION == "none" else REDIS_COMPRESSION,
+            compression_threshold=REDIS_COMPRESSION_THRESHOLD,
+            trusted_reads=CHATBOT_HISTORY_TRUSTED_READS,
+            ttl=REDIS_TTL or None,
+            max_messages_per_session=REDIS_MAX_MESSAGES_PER_SESSION or None,
+            metrics=init_metrics_sink(),
+            **_redis_connection_kwargs(),
+        )
+        logger.info("Initialized async Redis history store.")
+    else:
+        raise ValueError(
+            f"Unsupported CHATBOT_HISTORY_DB_TYPE environment value for the async history store. CHATBOT_HISTORY_DB_TYPE value: {CHATBOT_HISTORY_DB_TYPE}"
+        )
+    return history_store
+
+
+def init_async_chatbot_history_store(collection: str) -> AsyncRedisChatHistoryHelper:
+    """
+    Initializes (once) and returns the asynchronous chatbot history store.
+
+    The store owns its own asyncio connection pool, separate from the one of the synchronous store.
+
+    Args:
+        collection (str): The name of the collection holding the chat histories.
+
+    Returns:
+        AsyncRedisChatHistoryHelper: The initialized or existing asynchronous history store instance.
+    """
+    global _ASYNC_HISTORY_STORE
+
+    if not _ASYNC_HISTORY_STORE:
+        _ASYNC_HISTORY_STORE = _init_async_history_store(collection)
+    return _ASYNC_HISTORY_STORE
+
+
+def init_history_cache() -> Optional[HistoryCache]:
+    """
+    Initializes (once) and returns the in-process cache of the chat histories, if enabled in the configuration.
+
+    The cache is shared by every `DocumentStore` of the process (like the history store underneath it), so that
+    a write through any of them invalidates the histories cached by all of them.
+
+    Returns:
+        Optional[HistoryCache]: The history cache of the process, or None if the cache is disabled.
+    """
+    global _HISTORY_CACHE
+
+    if not HISTORY_CACHE_ENABLED:
+        return None
+
+    if _HISTORY_CACHE is None:
+        logger.info("Initializing in-process history cache...")
+        _HISTORY_CACHE = HistoryCache(
+            max_entries=HISTORY_CACHE_MAX_ENTRIES,
+            max_bytes=HISTORY_CACHE_MAX_BYTES,
+            ttl_seconds=HISTORY_CACHE_TTL_SECONDS,
+        )
+    return _HISTORY_CACHE
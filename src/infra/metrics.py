@@ -0,0 +1,492 @@
+"""
+Module containing the instrumentation of the history stores: latency, Redis round trips, commands, bytes and keys
+of every operation, and the time spent (de)serializing the messages.
+
+The measurements are sent to a pluggable `MetricsSink`. The default `InMemoryMetricsSink` aggregates them in the
+process memory (counters and latency histograms), and can be exported in the Prometheus text format
+(`render_prometheus_text`), e.g. from a `/metrics` endpoint.
+
+When no sink is configured, nothing is wrapped: the history stores run exactly as without instrumentation.
+
+Metrics (every one labelled by `operation`, the public method of the history store being executed):
+    - history_store_operation_seconds      (histogram) latency of the operations
+    - history_store_operation_errors_total (counter)   operations that raised an exception
+    - history_store_serialization_seconds  (histogram) time spent encoding / decoding messages (label `direction`)
+    - redis_round_trips_total              (counter)   requests sent to Redis (a pipeline is a single round trip)
+    - redis_commands_total                 (counter)   Redis commands issued (label `command`)
+    - redis_keys_touched_total             (counter)   keys named by the Redis commands
+    - redis_bytes_written_total            (counter)   bytes sent to Redis
+    - redis_bytes_read_total               (counter)   bytes of the Redis replies (size of the decoded payload)
+
+Metrics of the Redis connection pools (labelled by `pool`, "sync" or "async"):
+    - redis_pool_max_connections           (gauge)     max number of connections of the pool
+    - redis_pool_connections_in_use        (gauge)     connections currently checked out of the pool
+    - redis_pool_connections_created_total (counter)   connections opened by the pool (a storm shows up here)
+    - redis_pool_wait_seconds              (histogram) time to get a connection (waiting for a free one and connecting)
+    - redis_pool_errors_total              (counter)   connections that could not be obtained (pool exhausted, connect failure)
+"""
+
+import functools
+import inspect
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import redis
+import redis.asyncio as aioredis
+
+# -------------------------------
+# Constants
+# -------------------------------
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+_MULTI_KEY_COMMANDS = {"DEL", "UNLINK", "EXISTS", "MGET", "TOUCH", "WATCH"}
+_KEYLESS_COMMANDS = {
+    "PING", "MULTI", "EXEC", "DISCARD", "UNWATCH", "SCAN", "INFO", "DBSIZE", "FLUSHDB", "FLUSHALL",
+    "CLIENT", "HELLO", "SELECT", "SCRIPT", "AUTH", "CONFIG",
+}
+_SCRIPT_COMMANDS = {"EVAL", "EVALSHA", "EVAL_RO", "EVALSHA_RO"}
+
+# Public method of the history store being executed (label of the Redis metrics)
+_current_operation: ContextVar[str] = ContextVar("history_store_operation", default="other")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class MetricsSink(ABC):
+    """
+    Interface of the destinations of the metrics (e.g. the in-memory sink, a StatsD or OpenTelemetry client).
+    A sink that does not implement `increment` and `observe` cannot be instantiated.
+    """
+    @abstractmethod
+    def increment(self, name: str, value: float = 1, labels: Optional[Dict[str, str]] = None) -> None:
+        """Adds the value to the counter."""
+
+    @abstractmethod
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        """Records a measurement in the histogram."""
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        """Sets the current value of the gauge. Ignored by the sinks without gauges."""
+
+
+class InMemoryMetricsSink(MetricsSink):
+    """
+    Thread-safe sink aggregating the metrics in the process memory: counters, gauges, and histograms with fixed buckets.
+
+    Args:
+        buckets (Iterable[float]): The upper bounds of the histogram buckets (the +Inf bucket is implicit).
+    """
+    def __init__(self, buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], list] = {}  # [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+        return tuple(sorted(labels.items())) if labels else ()
+
+    def increment(self, name: str, value: float = 1, labels: Optional[Dict[str, str]] = None) -> None:
+        key = (name, self._labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        key = (name, self._labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[bisect_left(self.buckets, value)] += 1
+            histogram[-1] += value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        key = (name, self._labels(labels))
+        with self._lock:
+            self._gauges[key] = value
+
+    def snapshot(self) -> dict:
+        """
+        Returns a copy of the metrics.
+
+        Returns:
+            dict: "counters" and "gauges": {(name, labels): value}, and "histograms": {(name, labels): {"buckets", "count", "sum"}},
+                  where labels is a sorted tuple of (label, value) pairs and the bucket counts are not cumulative.
+        """
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "histograms": {
+                    key: {"buckets": list(histogram[:-1]), "count": sum(histogram[:-1]), "sum": histogram[-1]}
+                    for key, histogram in self._histograms.items()
+                },
+            }
+
+    def reset(self) -> None:
+        """Drops every metric."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    """Formats the labels of a sample in the Prometheus text format."""
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def render_prometheus_text(sink: InMemoryMetricsSink) -> str:
+    """
+    Exports the metrics of the in-memory sink in the Prometheus text exposition format (version 0.0.4).
+
+    Args:
+        sink (InMemoryMetricsSink): The sink holding the metrics.
+
+    Returns:
+        str: The metrics, e.g. to be returned by a `/metrics` endpoint (content type `text/plain; version=0.0.4`).
+    """
+    snapshot = sink.snapshot()
+    lines = []
+
+    for kind in ("counter", "gauge"):
+        samples = snapshot[f"{kind}s"]
+        for name in sorted({name for name, _ in samples}):
+            lines.append(f"# TYPE {name} {kind}")
+            for (sample_name, labels), value in sorted(samples.items()):
+                if sample_name == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    histogram_names = sorted({name for name, _ in snapshot["histograms"]})
+    for name in histogram_names:
+        lines.append(f"# TYPE {name} histogram")
+        for (sample_name, labels), histogram in sorted(snapshot["histograms"].items()):
+            if sample_name != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(sink.buckets + (float("inf"),), histogram["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', le))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------
+# History store operations
+# -------------------------------
+def _instrument_function(fn, name: str, sink: MetricsSink):
+    """Wraps a method (plain function, coroutine function, generator or async generator) to time it."""
+    labels = {"operation": name}
+
+    def _record(elapsed: float, failed: bool) -> None:
+        sink.observe("history_store_operation_seconds", elapsed, labels)
+        if failed:
+            sink.increment("history_store_operation_errors_total", 1, labels)
+
+    if inspect.isasyncgenfunction(fn):
+        @functools.wraps(fn)
+        async def async_generator_wrapper(*args, **kwargs):
+            # Only the time spent producing the items is measured (not the time of the consumer between them)
+            generator = fn(*args, **kwargs)
+            elapsed, failed = 0.0, False
+            try:
+                while True:
+                    token = _current_operation.set(name)
+                    start = time.perf_counter()
+                    try:
+                        item = await generator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    except BaseException:
+                        failed = True
+                        raise
+                    finally:
+                        elapsed += time.perf_counter() - start
+                        _current_operation.reset(token)
+                    yield item
+            finally:
+                await generator.aclose()
+                _record(elapsed, failed)
+        return async_generator_wrapper
+
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def generator_wrapper(*args, **kwargs):
+            generator = fn(*args, **kwargs)
+            elapsed, failed = 0.0, False
+            try:
+                while True:
+                    token = _current_operation.set(name)
+                    start = time.perf_counter()
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        return
+                    except BaseException:
+                        failed = True
+                        raise
+                    finally:
+                        elapsed += time.perf_counter() - start
+                        _current_operation.reset(token)
+                    yield item
+            finally:
+                generator.close()
+                _record(elapsed, failed)
+        return generator_wrapper
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def coroutine_wrapper(*args, **kwargs):
+            token = _current_operation.set(name)
+            start = time.perf_counter()
+            failed = False
+            try:
+                return await fn(*args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                _record(time.perf_counter() - start, failed)
+                _current_operation.reset(token)
+        return coroutine_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _current_operation.set(name)
+        start = time.perf_counter()
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            _record(time.perf_counter() - start, failed)
+            _current_operation.reset(token)
+    return wrapper
+
+
+def instrument_operations(history_store: Any, sink: MetricsSink) -> None:
+    """
+    Times every public method of a history store (e.g. `add`, `get_history_by_session_id`), and labels the Redis
+    metrics of the commands they issue with their name.
+
+    The bound methods are replaced on the instance itself, so the store keeps its type and its other attributes.
+
+    Args:
+        history_store (Any): The history store helper.
+        sink (MetricsSink): The destination of the metrics.
+    """
+    for name, fn in inspect.getmembers(type(history_store), inspect.isfunction):
+        if name.startswith("_") or isinstance(inspect.getattr_static(history_store, name), (staticmethod, classmethod)):
+            continue
+        setattr(history_store, name, _instrument_function(fn, name, sink).__get__(history_store))
+
+
+def record_serialization(sink: MetricsSink, direction: str, elapsed: float) -> None:
+    """Records the time spent encoding ("encode") or decoding ("decode") messages by the current operation."""
+    sink.observe(
+        "history_store_serialization_seconds",
+        elapsed,
+        {"operation": _current_operation.get(), "direction": direction},
+    )
+
+
+# -------------------------------
+# Redis connections
+# -------------------------------
+def _command_keys(args: tuple) -> int:
+    """Returns the number of keys named by a Redis command."""
+    command = str(args[0]).upper() if args else ""
+    if command in _KEYLESS_COMMANDS:
+        return 0
+    if command in _SCRIPT_COMMANDS:
+        return int(args[2]) if len(args) > 2 else 0
+    if command in ("MEMORY", "OBJECT"):
+        return 1 if len(args) > 2 else 0
+    if command in _MULTI_KEY_COMMANDS:
+        return len(args) - 1
+    return 1 if len(args) > 1 else 0
+
+
+def _payload_size(response: Any) -> int:
+    """Returns the size in bytes of a (decoded) Redis reply."""
+    if isinstance(response, (bytes, bytearray, memoryview)):
+        return len(response)
+    if isinstance(response, str):
+        return len(response.encode())
+    if isinstance(response, (list, tuple, set)):
+        return sum(_payload_size(item) for item in response)
+    if isinstance(response, dict):
+        return sum(_payload_size(key) + _payload_size(value) for key, value in response.items())
+    if isinstance(response, (int, float)):
+        return 8
+    return 0
+
+
+class _ConnectionMetrics:
+    """Metrics of the commands sent and of the replies read on a Redis connection (shared by the sync and async connections)."""
+    def _init_metrics(self, metrics: Optional[MetricsSink]) -> None:
+        self.metrics = metrics
+
+    def _record_command(self, args: tuple) -> None:
+        if self.metrics is None:
+            return
+        labels = {"operation": _current_operation.get()}
+        self.metrics.increment("redis_commands_total", 1, {**labels, "command": str(args[0]).upper()})
+        keys = _command_keys(args)
+        if keys:
+            self.metrics.increment("redis_keys_touched_total", keys, labels)
+
+    def _record_sent(self, command) -> None:
+        if self.metrics is None:
+            return
+        chunks = [command] if isinstance(command, (bytes, str)) else command
+        labels = {"operation": _current_operation.get()}
+        self.metrics.increment("redis_round_trips_total", 1, labels)
+        self.metrics.increment("redis_bytes_written_total", sum(len(chunk) for chunk in chunks), labels)
+
+    def _record_read(self, response) -> None:
+        if self.metrics is not None:
+            self.metrics.increment(
+                "redis_bytes_read_total", _payload_size(response), {"operation": _current_operation.get()}
+            )
+
+
+class InstrumentedConnection(_ConnectionMetrics, redis.Connection):
+    """Redis connection recording the round trips, commands, keys and bytes of the history store operations."""
+    def __init__(self, *args, metrics: Optional[MetricsSink] = None, **kwargs):
+        self._init_metrics(metrics)
+        super().__init__(*args, **kwargs)
+
+    def send_command(self, *args, **kwargs):
+        self._record_command(args)
+        return super().send_command(*args, **kwargs)
+
+    def pack_commands(self, commands):
+        commands = list(commands)
+        for command in commands:
+            self._record_command(tuple(command))
+        return super().pack_commands(commands)
+
+    def send_packed_command(self, command, check_health=True):
+        self._record_sent(command)
+        return super().send_packed_command(command, check_health=check_health)
+
+    def read_response(self, *args, **kwargs):
+        response = super().read_response(*args, **kwargs)
+        self._record_read(response)
+        return response
+
+
+class AsyncInstrumentedConnection(_ConnectionMetrics, aioredis.Connection):
+    """asyncio counterpart of `InstrumentedConnection`."""
+    def __init__(self, *args, metrics: Optional[MetricsSink] = None, **kwargs):
+        self._init_metrics(metrics)
+        super().__init__(*args, **kwargs)
+
+    def pack_command(self, *args):
+        self._record_command(args)  # Used by both the single commands and the pipelines
+        return super().pack_command(*args)
+
+    async def send_packed_command(self, command, check_health=True):
+        self._record_sent(command)
+        return await super().send_packed_command(command, check_health=check_health)
+
+    async def read_response(self, *args, **kwargs):
+        response = await super().read_response(*args, **kwargs)
+        self._record_read(response)
+        return response
+
+
+# -------------------------------
+# Redis connection pools
+# -------------------------------
+def instrument_connection_pool(pool: Any, sink: MetricsSink, name: str) -> None:
+    """
+    Records the utilization of a Redis connection pool (sync or asyncio, blocking or not): the connections in use,
+    the connections created, the time to get a connection and the connections that could not be obtained.
+
+    As for `instrument_operations`, the methods are replaced on the pool instance itself.
+
+    Args:
+        pool (Any): The connection pool (`redis.ConnectionPool`, `redis.asyncio.ConnectionPool` or a subclass).
+        sink (MetricsSink): The destination of the metrics.
+        name (str): The value of the `pool` label.
+    """
+    labels = {"pool": name}
+    lock = threading.Lock()
+    # Ids of the checked out connections (the pools release the connections that fail to connect themselves)
+    in_use = set()
+
+    def _set_in_use(connection, checked_out: bool) -> None:
+        with lock:
+            if checked_out:
+                in_use.add(id(connection))
+            else:
+                in_use.discard(id(connection))
+            sink.set_gauge("redis_pool_connections_in_use", len(in_use), labels)
+
+    def _record_get(start: float, connection) -> None:
+        sink.observe("redis_pool_wait_seconds", time.perf_counter() - start, labels)
+        if connection is None:
+            sink.increment("redis_pool_errors_total", 1, labels)
+        else:
+            _set_in_use(connection, checked_out=True)
+
+    get_connection, release, make_connection = pool.get_connection, pool.release, pool.make_connection
+
+    @functools.wraps(make_connection)
+    def instrumented_make_connection(*args, **kwargs):
+        sink.increment("redis_pool_connections_created_total", 1, labels)
+        return make_connection(*args, **kwargs)
+
+    if inspect.iscoroutinefunction(get_connection):
+        @functools.wraps(get_connection)
+        async def instrumented_get_connection(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                connection = await get_connection(*args, **kwargs)
+            except Exception:
+                _record_get(start, None)
+                raise
+            _record_get(start, connection)
+            return connection
+
+        @functools.wraps(release)
+        async def instrumented_release(connection):
+            await release(connection)
+            _set_in_use(connection, checked_out=False)
+    else:
+        @functools.wraps(get_connection)
+        def instrumented_get_connection(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                connection = get_connection(*args, **kwargs)
+            except Exception:
+                _record_get(start, None)
+                raise
+            _record_get(start, connection)
+            return connection
+
+        @functools.wraps(release)
+        def instrumented_release(connection):
+            release(connection)
+            _set_in_use(connection, checked_out=False)
+
+    pool.get_connection = instrumented_get_connection
+    pool.release = instrumented_release
+    pool.make_connection = instrumented_make_connection
+    sink.set_gauge("redis_pool_max_connections", pool.max_connections, labels)
+    sink.set_gauge("redis_pool_connections_in_use", 0, labels)
@@ -1,8 +1,21 @@
+import atexit
 import logging
+import queue
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from logging.handlers import QueueHandler, QueueListener
 
 from langchain.globals import set_debug, set_verbose
 
-from src.config.config import LOGGER_LEVEL, LOGGER_LEVEL_PDFMINER, LOGGER_LEVEL_PYMONGO
+from src.config.config import (
+    LOGGER_LEVEL,
+    LOGGER_LEVEL_PDFMINER,
+    LOGGER_LEVEL_PYMONGO,
+    LOGGER_QUEUE_ENABLED,
+    LOGGER_SAMPLE_RATE_DEBUG,
+    LOGGER_SAMPLE_RATE_INFO,
+)
 
 # -------------------------------
 # Constants
@@ -18,23 +31,66 @@ LOGGING_LEVEL = LOGGING_LEVELS_ROUTER.get(LOGGER_LEVEL.lower() if LOGGER_LEVEL e
 LOGGING_LEVEL_PDFMINER = LOGGING_LEVELS_ROUTER.get(LOGGER_LEVEL_PDFMINER.lower() if LOGGER_LEVEL_PDFMINER else "info")
 LOGGING_LEVEL_PYMONGO = LOGGING_LEVELS_ROUTER.get(LOGGER_LEVEL_PYMONGO.lower() if LOGGER_LEVEL_PYMONGO else "info")
 
+# Share of the records kept per level by the sampled logger (the warnings and errors are always kept)
+SAMPLE_RATES = {
+    logging.DEBUG: float(LOGGER_SAMPLE_RATE_DEBUG),
+    logging.INFO: float(LOGGER_SAMPLE_RATE_INFO),
+}
+
+# User of the current request: each thread and each asyncio task sees its own value
+_current_user: ContextVar[str] = ContextVar("log_user", default="NotDefined")
+
 
 # -------------------------------
 # Definitions
 # -------------------------------
 class UserLoggerAdapter(logging.LoggerAdapter):
     def process(self, msg, kwargs):
-        # Use the user from the extra context, defaulting to 'Unknown' if no user is set
-        user = self.extra.get("user", "Unknown")
-        # Ensure the extra dictionary is updated correctly
-        kwargs["extra"] = {"user": user}
+        # Use the user of the current context (thread or asyncio task), not a shared mutable state
+        kwargs["extra"] = {**kwargs.get("extra", {}), "user": _current_user.get()}
         return msg, kwargs
 
 
-def assign_user(user_id):
-    """Assign a user to the logger"""
-    # Update the logger's user context dynamically
-    logger.extra["user"] = user_id
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a share of the records of each level (e.g. 1% of the info logs written for every message),
+    the levels without a sample rate are always kept.
+
+    Args:
+        sample_rates (dict): The share (0.0 to 1.0) of the records kept, per level.
+    """
+    def __init__(self, sample_rates: dict):
+        super().__init__()
+        self.sample_rates = sample_rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        sample_rate = self.sample_rates.get(record.levelno, 1.0)
+        return sample_rate >= 1.0 or random.random() < sample_rate
+
+
+def assign_user(user_id) -> Token:
+    """
+    Assign a user to the logs of the current context (thread or asyncio task).
+
+    Returns:
+        Token: The token restoring the previous user (`reset_user`).
+    """
+    return _current_user.set(user_id)
+
+
+def reset_user(token: Token) -> None:
+    """Restore the user of the logs assigned before the `assign_user` call that returned the token."""
+    _current_user.reset(token)
+
+
+@contextmanager
+def user_context(user_id):
+    """Assign a user to the logs written inside the `with` block."""
+    token = assign_user(user_id)
+    try:
+        yield
+    finally:
+        reset_user(token)
 
 
 # -------------------------------
@@ -50,12 +106,27 @@ stream_handler.setFormatter(formatter)
 
 def_logger = logging.getLogger("my_app_logger")
 def_logger.setLevel(LOGGING_LEVEL)
-def_logger.addHandler(stream_handler)
 def_logger.propagate = False  # Prevent propagation to the root logger. This is mandatory to not trigger issue with the root logger (of 3rd partiy libraries)
 
+if LOGGER_QUEUE_ENABLED:
+    # Non-blocking mode: the callers only enqueue the records, a background thread writes them to the stream
+    log_queue = queue.SimpleQueue()
+    def_logger.addHandler(QueueHandler(log_queue))
+    queue_listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    queue_listener.start()
+    atexit.register(queue_listener.stop)  # Flush the pending records on exit
+else:
+    def_logger.addHandler(stream_handler)
+
+# Child logger of the high-volume logs (e.g. one per stored message), sampled per level; its records are
+# written by the handlers of the custom logger
+sampled_def_logger = logging.getLogger("my_app_logger.sampled")
+sampled_def_logger.addFilter(SamplingFilter(SAMPLE_RATES))
+
 
-# Wrap the logger with user context
-logger = UserLoggerAdapter(def_logger, {"user": "NotDefined"})
+# Wrap the loggers with user context
+logger = UserLoggerAdapter(def_logger, {})
+sampled_logger = UserLoggerAdapter(sampled_def_logger, {})
 
 # PDFMiner and PyMongo logging levels
 logging.getLogger("pdfminer").setLevel(LOGGING_LEVEL_PDFMINER)
@@ -84,5 +155,6 @@ if __name__ == "__main__":
     assign_user("User123")
     logger.info("Step 2: User assigned - User123 is now logged.")
 
-    assign_user("User456")
-    logger.info("Step 3: Another user assigned - User456 is now logged.")
+    with user_context("User456"):
+        logger.info("Step 3: Another user assigned - User456 is now logged.")
+    logger.info("Step 4: Back to User123.")
@@ -1,14 +1,66 @@
 import base64
+import binascii
+from functools import lru_cache
+from typing import Iterable, List
 
 from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import padding
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
+# -------------------------------
+# Constants
+# -------------------------------
+BLOCK_SIZE = algorithms.AES.block_size // 8  # 16 bytes
+WORD_CACHE_SIZE = 10000  # Max number of word <-> encrypted word mappings memoized per direction
+CIPHER_CACHE_SIZE = 16  # Max number of keys with a cached cipher
 
+
+@lru_cache(maxsize=CIPHER_CACHE_SIZE)
+def _get_cipher(key: bytes) -> Cipher:
+    """
+    Returns the AES cipher (ECB mode) of the key, built once per key.
+
+    The cipher itself holds no state: each encryption or decryption creates its own (cheap) context from it,
+    so it can be shared by every thread.
+    """
+    # Ensure the key is of proper length
+    if len(key) not in [16, 24, 32]:
+        raise ValueError("Key must be 16, 24, or 32 bytes long")
+    return Cipher(algorithms.AES(key), modes.ECB(), backend=default_backend())
+
+
+def _pad(data: bytes) -> bytes:
+    """Pads the data to a multiple of the block size (PKCS7)."""
+    padding_length = BLOCK_SIZE - len(data) % BLOCK_SIZE
+    return data + bytes([padding_length]) * padding_length
+
+
+def _unpad(data: bytes) -> bytes:
+    """Removes the PKCS7 padding of the data."""
+    padding_length = data[-1] if data else 0
+    if not 1 <= padding_length <= BLOCK_SIZE or data[-padding_length:] != bytes([padding_length]) * padding_length:
+        raise ValueError("Invalid padding bytes.")
+    return data[:-padding_length]
+
+
+def _decode_encrypted_word(encrypted_word: str) -> bytes:
+    """Decodes a base64-encoded encrypted word, ensuring it is made of whole blocks."""
+    try:
+        encrypted_word_bytes = base64.b64decode(encrypted_word)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid base64-encoded encrypted word: {e}") from e
+    if not encrypted_word_bytes or len(encrypted_word_bytes) % BLOCK_SIZE:
+        raise ValueError("The length of the encrypted word must be a multiple of the block size.")
+    return encrypted_word_bytes
+
+
+@lru_cache(maxsize=WORD_CACHE_SIZE)
 def encrypt_word(word: str, key: bytes) -> str:
     """
     Encrypts a given word using AES in ECB mode.
 
+    ECB is deterministic (the same word always gives the same encrypted word), so the results are memoized
+    in a bounded LRU cache: repeated calls for the same user are served from memory.
+
     Args:
         word (str): The word to be encrypted.
         key (bytes): The AES encryption key (must be 16, 24, or 32 bytes long).
@@ -16,29 +68,22 @@ def encrypt_word(word: str, key: bytes) -> str:
     Returns:
         str: The encrypted word as a base64-encoded string.
     """
-    # Ensure the key is of proper length
-    if len(key) not in [16, 24, 32]:
-        raise ValueError("Key must be 16, 24, or 32 bytes long")
-
-    # Initialize the cipher
-    cipher = Cipher(algorithms.AES(key), modes.ECB(), backend=default_backend())
-    encryptor = cipher.encryptor()
-
-    # Pad the word to be a multiple of the block size (16 bytes)
-    padder = padding.PKCS7(algorithms.AES.block_size).padder()
-    padded_word = padder.update(word.encode()) + padder.finalize()
+    encryptor = _get_cipher(key).encryptor()
 
-    # Encrypt the padded word
-    encrypted_word = encryptor.update(padded_word) + encryptor.finalize()
+    # Pad the word to be a multiple of the block size (16 bytes), then encrypt it
+    encrypted_word = encryptor.update(_pad(word.encode())) + encryptor.finalize()
 
     # Return the encrypted word as a base64-encoded string
     return base64.b64encode(encrypted_word).decode()
 
 
+@lru_cache(maxsize=WORD_CACHE_SIZE)
 def decrypt_word(encrypted_word: str, key: bytes) -> str:
     """
     Decrypts a given word using AES in ECB mode.
 
+    The results are memoized in a bounded LRU cache, as for `encrypt_word`.
+
     Args:
         encrypted_word (str): The base64-encoded encrypted word to be decrypted.
         key (bytes): The AES encryption key (must be 16, 24, or 32 bytes long).
@@ -46,25 +91,59 @@ def decrypt_word(encrypted_word: str, key: bytes) -> str:
     Returns:
         str: The decrypted word.
     """
-    # Ensure the key is of proper length
-    if len(key) not in [16, 24, 32]:
-        raise ValueError("Key must be 16, 24, or 32 bytes long")
+    decryptor = _get_cipher(key).decryptor()
+
+    # Decode the base64-encoded encrypted word, decrypt it and unpad it
+    padded_word = decryptor.update(_decode_encrypted_word(encrypted_word)) + decryptor.finalize()
+    return _unpad(padded_word).decode()
 
-    # Initialize the cipher
-    cipher = Cipher(algorithms.AES(key), modes.ECB(), backend=default_backend())
-    decryptor = cipher.decryptor()
 
-    # Decode the base64-encoded encrypted word
-    encrypted_word_bytes = base64.b64decode(encrypted_word)
+def encrypt_many(words: Iterable[str], key: bytes) -> List[str]:
+    """
+    Encrypts many words using AES in ECB mode (e.g. for admin and export jobs processing thousands of users).
 
-    # Decrypt the word
-    padded_word = decryptor.update(encrypted_word_bytes) + decryptor.finalize()
+    A single cipher context encrypts every word: in ECB mode the blocks are encrypted independently, so each
+    (padded) word gives the same result as `encrypt_word`. The LRU cache of `encrypt_word` is bypassed,
+    so that a large batch does not evict the mappings of the active users.
+
+    Args:
+        words (Iterable[str]): The words to be encrypted.
+        key (bytes): The AES encryption key (must be 16, 24, or 32 bytes long).
+
+    Returns:
+        List[str]: The encrypted words as base64-encoded strings, in the same order.
+    """
+    encryptor = _get_cipher(key).encryptor()
+    encrypted_words = [base64.b64encode(encryptor.update(_pad(word.encode()))).decode() for word in words]
+    encryptor.finalize()
+    return encrypted_words
+
+
+def decrypt_many(encrypted_words: Iterable[str], key: bytes) -> List[str]:
+    """
+    Decrypts many words using AES in ECB mode, with a single cipher context (see `encrypt_many`).
+
+    Args:
+        encrypted_words (Iterable[str]): The base64-encoded encrypted words to be decrypted.
+        key (bytes): The AES encryption key (must be 16, 24, or 32 bytes long).
+
+    Returns:
+        List[str]: The decrypted words, in the same order.
+    """
+    decryptor = _get_cipher(key).decryptor()
+    words = [
+        _unpad(decryptor.update(_decode_encrypted_word(encrypted_word))).decode()
+        for encrypted_word in encrypted_words
+    ]
+    decryptor.finalize()
+    return words
 
-    # Unpad the word
-    unpadder = padding.PKCS7(algorithms.AES.block_size).unpadder()
-    word = unpadder.update(padded_word) + unpadder.finalize()
 
-    return word.decode()
+def clear_encryption_caches() -> None:
+    """Clears the cached ciphers and the memoized (encrypted) words, e.g. after a key rotation."""
+    _get_cipher.cache_clear()
+    encrypt_word.cache_clear()
+    decrypt_word.cache_clear()
 
 
 # Example of usage
@@ -74,3 +153,4 @@ if __name__ == "__main__":
     decrypted = decrypt_word(encrypted, key)
     print("Encryption:", encrypted)
     print("Decryption:", decrypted)
+    print("Batch:", decrypt_many(encrypt_many(["a@example.com", "b@example.com"], key), key))